@@ -1,18 +1,98 @@
 "use client"
 
-import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card"
+import * as React from "react"
+import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
-import { Terminal, ShieldAlert } from "lucide-react"
+import { Button } from "@/components/ui/button"
+import { Input } from "@/components/ui/input"
+import { Terminal } from "lucide-react"
+import api, { StreamEvent } from "@/lib/api"
 
-const MOCK_LOGS = [
-  { id: 1, time: "2026-03-10 10:05:22", level: "INFO", message: "Worker 1 acknowledged job batch #45", service: "worker" },
-  { id: 2, time: "2026-03-10 10:04:10", level: "ERROR", message: "Timeout waiting for Chromium to launch (chat_id: scalio_bot)", service: "playwright" },
-  { id: 3, time: "2026-03-10 10:01:45", level: "INFO", message: "Admin user 987654321 logged in via OTP", service: "auth" },
-  { id: 4, time: "2026-03-10 09:55:00", level: "WARN", message: "City Monterrey has no active proxy assigned", service: "scraper" },
-  { id: 5, time: "2026-03-10 09:00:00", level: "INFO", message: "Master Switch set to ON", service: "engine" },
-]
+interface LogEntry {
+  time: string
+  component: string
+  level: "DEBUG" | "INFO" | "WARNING" | "ERROR"
+  message: string
+  file: string
+  offset: number
+}
+
+interface LogPage {
+  entries: LogEntry[]
+  next_before: string | null
+}
+
+interface LogFile {
+  component: string
+}
+
+// Keeps the DOM bounded while following a busy worker
+const MAX_VISIBLE_ENTRIES = 2000
+
+const logKey = (log: LogEntry) => `${log.file}:${log.offset}`
 
 export default function AdminLogsPage() {
+  const [entries, setEntries] = React.useState<LogEntry[]>([])
+  const [nextBefore, setNextBefore] = React.useState<string | null>(null)
+  const [components, setComponents] = React.useState<string[]>([])
+  const [component, setComponent] = React.useState("")
+  const [level, setLevel] = React.useState("")
+  const [search, setSearch] = React.useState("")
+  const [query, setQuery] = React.useState("")
+  const [loading, setLoading] = React.useState(true)
+  const [error, setError] = React.useState<string | null>(null)
+
+  const filters = React.useMemo(() => {
+    const params = new URLSearchParams()
+    if (component) params.set("component", component)
+    if (level) params.set("level", level)
+    if (query) params.set("q", query)
+    return params
+  }, [component, level, query])
+
+  React.useEffect(() => {
+    api.get<LogFile[]>("/api/admin/logs/files")
+      .then((files) => setComponents(Array.from(new Set(files.map((f) => f.component))).sort()))
+      .catch(() => setComponents([]))
+  }, [])
+
+  // History (newest first, shown oldest first) and then live tail with the same filters
+  React.useEffect(() => {
+    const controller = new AbortController()
+    setLoading(true)
+    setError(null)
+    api.get<LogPage>(`/api/admin/logs?${filters}`)
+      .then((page) => {
+        if (controller.signal.aborted) return
+        setEntries([...page.entries].reverse())
+        setNextBefore(page.next_before)
+        api.stream(`/api/admin/logs/stream?${filters}`, (event: StreamEvent) => {
+          if (event.type !== "log") return
+          const entry = JSON.parse(event.data) as LogEntry
+          setEntries((current) => [...current, entry].slice(-MAX_VISIBLE_ENTRIES))
+        }, controller.signal)
+      })
+      .catch((e: Error) => setError(e.message))
+      .finally(() => setLoading(false))
+    return () => controller.abort()
+  }, [filters])
+
+  const loadOlder = async () => {
+    if (!nextBefore) return
+    const params = new URLSearchParams(filters)
+    params.set("before", nextBefore)
+    try {
+      const page = await api.get<LogPage>(`/api/admin/logs?${params}`)
+      setEntries((current) => {
+        const seen = new Set(current.map(logKey))
+        return [...page.entries.filter((e) => !seen.has(logKey(e))).reverse(), ...current]
+      })
+      setNextBefore(page.next_before)
+    } catch (e: unknown) {
+      setError(e instanceof Error ? e.message : String(e))
+    }
+  }
+
   return (
     <div className="space-y-6 max-w-6xl mx-auto mt-6">
       <div className="flex flex-col sm:flex-row justify-between items-start sm:items-center gap-4">
@@ -23,6 +103,33 @@ export default function AdminLogsPage() {
           </h1>
           <p className="text-slate-400 mt-2">Live stream of all backend services, workers, and API events.</p>
         </div>
+        <div className="flex flex-wrap gap-2">
+          <select
+            value={component}
+            onChange={(e) => setComponent(e.target.value)}
+            className="h-9 rounded-md border border-slate-800 bg-slate-950 px-3 text-sm text-slate-200"
+          >
+            <option value="">All services</option>
+            {components.map((c) => <option key={c} value={c}>{c}</option>)}
+          </select>
+          <select
+            value={level}
+            onChange={(e) => setLevel(e.target.value)}
+            className="h-9 rounded-md border border-slate-800 bg-slate-950 px-3 text-sm text-slate-200"
+          >
+            <option value="">All levels</option>
+            <option value="WARNING">Warnings +</option>
+            <option value="ERROR">Errors</option>
+          </select>
+          <form onSubmit={(e) => { e.preventDefault(); setQuery(search.trim()) }}>
+            <Input
+              value={search}
+              onChange={(e) => setSearch(e.target.value)}
+              placeholder="Search…"
+              className="h-9 w-48 bg-slate-950 border-slate-800 text-slate-200"
+            />
+          </form>
+        </div>
       </div>
 
       <Card className="bg-slate-950 border-slate-800 overflow-hidden shadow-2xl">
@@ -33,20 +140,29 @@ export default function AdminLogsPage() {
         </CardHeader>
         <CardContent className="p-0">
           <div className="h-[600px] overflow-y-auto p-4 space-y-2 font-mono text-sm">
-            {MOCK_LOGS.map(log => (
-              <div key={log.id} className="flex items-start gap-4 hover:bg-slate-900/50 p-1 -mx-2 px-2 rounded">
+            {nextBefore && (
+              <Button variant="ghost" size="sm" onClick={loadOlder} className="text-slate-400 hover:text-white">
+                Load older entries
+              </Button>
+            )}
+            {error && <div className="text-red-400">{error}</div>}
+            {!loading && !error && entries.length === 0 && (
+              <div className="text-slate-500">No log entries match these filters.</div>
+            )}
+            {entries.map(log => (
+              <div key={logKey(log)} className="flex items-start gap-4 hover:bg-slate-900/50 p-1 -mx-2 px-2 rounded">
                 <span className="text-slate-500 shrink-0">{log.time}</span>
                 <span className={`shrink-0 font-bold w-14 ${
                   log.level === 'ERROR' ? 'text-red-500' :
-                  log.level === 'WARN' ? 'text-yellow-500' :
+                  log.level === 'WARNING' ? 'text-yellow-500' :
                   'text-blue-500'
                 }`}>
-                  [{log.level}]
+                  [{log.level === 'WARNING' ? 'WARN' : log.level}]
                 </span>
                 <span className="text-slate-400 shrink-0 font-bold w-20">
-                  {log.service}
+                  {log.component.toLowerCase()}
                 </span>
-                <span className={log.level === 'ERROR' ? 'text-red-400' : 'text-slate-300'}>
+                <span className={`whitespace-pre-wrap break-all ${log.level === 'ERROR' ? 'text-red-400' : 'text-slate-300'}`}>
                   {log.message}
                 </span>
               </div>
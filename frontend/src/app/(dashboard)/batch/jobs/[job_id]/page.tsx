@@ -6,6 +6,7 @@ import { Badge } from "@/components/ui/badge"
 import { MapPin, Briefcase, Clock, CheckCircle2, Loader2, Activity, AlertCircle } from "lucide-react"
 import { formatDistanceToNow } from 'date-fns'
 import api from '@/lib/api'
+import { JobProgress, mergeProgress, progressPercent, useJobEvents } from '@/hooks/use-job-events'
 
 // Replicating basic type layout
 interface JobDetail {
@@ -16,6 +17,7 @@ interface JobDetail {
   created_at: string;
   category_name: string;
   city_name: string;
+  progress?: JobProgress | null;
 }
 
 export default function JobDetailPage({ params }: { params: Promise<{ job_id: string }> }) {
@@ -40,13 +42,15 @@ export default function JobDetailPage({ params }: { params: Promise<{ job_id: st
   useEffect(() => {
     setIsMounted(true)
     fetchJob()
-    // Poll every 10 seconds if not completed/failed
-    const interval = setInterval(() => {
-      if (job && (job.status === 'completed' || job.status === 'failed')) return;
-      fetchJob();
-    }, 10000)
-    return () => clearInterval(interval)
-  }, [unwrappedParams.job_id, job?.status])
+  }, [unwrappedParams.job_id])
+
+  // Status changes are pushed by the API (reload); live counters are merged into the job without a request
+  useJobEvents((event) => {
+    if (event.type === 'status' || event.type === 'reset') fetchJob()
+    if (event.type === 'progress') {
+      setJob((current) => current && { ...current, progress: mergeProgress(current.progress, event) })
+    }
+  }, unwrappedParams.job_id)
 
   if (loading) {
     return <div className="p-8 text-center text-slate-400">Loading Job Data...</div>
@@ -60,6 +64,8 @@ export default function JobDetailPage({ params }: { params: Promise<{ job_id: st
   const isPending = job.status === 'pending'
   const isDone = job.status === 'completed'
   const isFailed = job.status === 'failed'
+  const percent = progressPercent(job.progress)
+  const runningWidth = percent === null ? 5 : Math.max(5, percent)
 
   let statusBadge
   if (isPending) statusBadge = <Badge variant="outline" className="px-3 py-1 text-sm border-yellow-500/50 text-yellow-400 bg-yellow-500/10"><Clock className="w-3 h-3 mr-2" /> PENDING</Badge>
@@ -130,12 +136,21 @@ export default function JobDetailPage({ params }: { params: Promise<{ job_id: st
                 <div className="flex justify-between text-sm">
                   <span className="text-slate-400">{isDone ? "Extraction Finished" : isFailed ? "Extraction Failed" : "Scraping in progress..."}</span>
                   <span className={isDone ? "text-green-500 font-bold" : isFailed ? "text-red-500 font-bold" : "text-blue-400 font-bold"}>
-                    {isDone ? "100%" : isPending ? "0%" : isFailed ? "Halted" : "75%"}
+                    {isDone ? "100%" : isPending ? "0%" : isFailed ? "Halted" : percent === null ? "Starting..." : `${percent}%`}
                   </span>
                 </div>
                 <div className="relative h-4 w-full overflow-hidden rounded-full bg-slate-800">
-                  <div className={`h-full transition-all ${isDone ? 'bg-green-500' : isFailed ? 'bg-red-500' : 'bg-blue-600'}`} style={{ width: isDone ? '100%' : isPending ? '5%' : isFailed ? '100%' : '75%' }} />
+                  <div className={`h-full transition-all ${isDone ? 'bg-green-500' : isFailed ? 'bg-red-500' : 'bg-blue-600'}`} style={{ width: isDone ? '100%' : isPending ? '5%' : isFailed ? '100%' : `${runningWidth}%` }} />
                 </div>
+                {job.progress && (
+                  <div className="flex flex-wrap gap-4 pt-2 text-xs text-slate-500 font-mono">
+                    <span className="uppercase">{job.progress.stage}</span>
+                    <span>discovered {job.progress.discovered}</span>
+                    <span>processed {job.progress.processed}</span>
+                    <span>cached {job.progress.cached}</span>
+                    <span>skipped {job.progress.skipped}</span>
+                  </div>
+                )}
               </div>
             </CardContent>
           </Card>
@@ -10,6 +10,7 @@ import { Eye, RotateCcw } from "lucide-react"
 import Link from "next/link"
 import { useEffect, useState } from "react"
 import api from "@/lib/api"
+import { mergeProgress, progressPercent, useJobEvents } from "@/hooks/use-job-events"
 import { formatDistanceToNow } from "date-fns"
 
 export default function JobsPage() {
@@ -49,10 +50,18 @@ export default function JobsPage() {
   useEffect(() => {
     setIsMounted(true)
     fetchJobs()
-    const interval = setInterval(fetchJobs, 5000) // Reduced to 5s
-    return () => clearInterval(interval)
   }, [page, limit]) // Refetch on page or limit change
 
+  // The API pushes status transitions (refetch the page) and live counters (merged in place, no request)
+  useJobEvents((event) => {
+    if (event.type === 'status' || event.type === 'reset') fetchJobs()
+    if (event.type === 'progress') {
+      setJobs((current) => current.map((job) =>
+        job.id === event.job_id ? { ...job, progress: mergeProgress(job.progress, event) } : job
+      ))
+    }
+  })
+
   const filteredJobs = jobs.filter(job => {
     const rawStatus = job.status === 'processing' ? 'running' : job.status;
     if (statusFilter !== "all" && rawStatus !== statusFilter) return false
@@ -160,10 +169,19 @@ export default function JobsPage() {
                   </TableCell>
                   <TableCell>
                     {uiStatus === 'running' ? (
-                      <div className="flex items-center gap-3">
+                      <div className="space-y-1">
                         <div className="relative h-2 w-full overflow-hidden rounded-full bg-slate-800">
-                          <div className="h-full bg-blue-500 w-full animate-pulse" />
+                          {progressPercent(job.progress) === null ? (
+                            <div className="h-full bg-blue-500 w-full animate-pulse" />
+                          ) : (
+                            <div className="h-full bg-blue-500 transition-all" style={{ width: `${progressPercent(job.progress)}%` }} />
+                          )}
                         </div>
+                        {job.progress && (
+                          <p className="text-[10px] text-slate-500 uppercase tracking-wider">
+                            {job.progress.stage} · {job.progress.processed}/{job.progress.discovered}
+                          </p>
+                        )}
                       </div>
                     ) : uiStatus === 'completed' ? (
                       <div className="relative h-2 w-full overflow-hidden rounded-full bg-slate-800">
@@ -11,6 +11,7 @@ import { formatDistanceToNow } from "date-fns"
 
 export default function DashboardPage() {
   const [jobs, setJobs] = useState<any[]>([])
+  const [jobsByStatus, setJobsByStatus] = useState<Record<string, number>>({})
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [masterSwitch, setMasterSwitch] = useState(true)
@@ -22,14 +23,16 @@ export default function DashboardPage() {
   const fetchDashboardData = async () => {
     try {
       const results = await Promise.allSettled([
-        api.get<any[]>('/api/jobs'),
+        api.get<any[]>('/api/jobs?limit=5'),
         api.get<{is_enabled: boolean}>('/api/admin/worker'),
-        api.get<{status: string, last_heartbeat: any}>('/api/admin/worker/health')
+        api.get<{status: string, last_heartbeat: any}>('/api/admin/worker/health'),
+        api.get<{jobs_by_status: Record<string, number>}>('/api/stats')
       ])
       
       if (results[0].status === 'fulfilled') setJobs(results[0].value || [])
       if (results[1].status === 'fulfilled') setMasterSwitch(results[1].value.is_enabled)
       if (results[2].status === 'fulfilled') setWorkerHealth(results[2].value)
+      if (results[3].status === 'fulfilled') setJobsByStatus(results[3].value.jobs_by_status || {})
       
       setLastSync(new Date())
       setError(null)
@@ -61,11 +64,12 @@ export default function DashboardPage() {
     return () => clearInterval(interval)
   }, [])
 
+  // Totals over the tenant's whole history, from the counters behind /api/stats
   const stats = {
-    pending: jobs.filter(j => j.status === 'pending').length,
-    running: jobs.filter(j => j.status === 'processing' || j.status === 'running').length,
-    completed: jobs.filter(j => j.status === 'completed').length,
-    errors: jobs.filter(j => j.status === 'failed').length
+    pending: jobsByStatus.pending || 0,
+    running: (jobsByStatus.processing || 0) + (jobsByStatus.running || 0),
+    completed: jobsByStatus.completed || 0,
+    errors: jobsByStatus.failed || 0
   }
 
   const recentJobs = [...jobs].sort((a, b) => {
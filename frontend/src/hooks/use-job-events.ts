@@ -0,0 +1,49 @@
+import * as React from "react"
+
+import api, { StreamEvent } from "@/lib/api"
+
+export interface JobEvent {
+  type: "status" | "progress" | "reset"
+  job_id?: number
+  status?: string
+  [key: string]: unknown
+}
+
+export interface JobProgress {
+  stage: string
+  discovered: number
+  processed: number
+  cached: number
+  skipped: number
+  updated_at?: string | null
+}
+
+/** Applies a `progress` event to a job's counters in place of refetching the job. */
+export function mergeProgress(progress: JobProgress | null | undefined, event: JobEvent): JobProgress {
+  const { type, job_id, status, at, ...counters } = event
+  return { ...progress, ...counters, updated_at: (at as string | undefined) ?? progress?.updated_at } as JobProgress
+}
+
+/** Share of discovered listings already processed (0-100), or null while nothing was discovered. */
+export function progressPercent(progress: JobProgress | null | undefined): number | null {
+  if (!progress || !progress.discovered) return null
+  return Math.min(100, Math.round((progress.processed + progress.cached + progress.skipped) * 100 / progress.discovered))
+}
+
+/**
+ * Live job updates pushed by GET /api/jobs/events (replaces polling).
+ * A `reset` event means the stream fell behind: reload the full state.
+ */
+export function useJobEvents(onEvent: (event: JobEvent) => void, jobId?: number | string) {
+  const handler = React.useRef(onEvent)
+  handler.current = onEvent
+
+  React.useEffect(() => {
+    const controller = new AbortController()
+    const endpoint = jobId === undefined ? "/api/jobs/events" : `/api/jobs/events?job_id=${jobId}`
+    api.stream(endpoint, (event: StreamEvent) => {
+      handler.current({ ...JSON.parse(event.data), type: event.type } as JobEvent)
+    }, controller.signal)
+    return () => controller.abort()
+  }, [jobId])
+}
@@ -73,6 +73,68 @@ class ApiClient {
   delete<T>(endpoint: string, options?: Omit<FetchOptions, "method">) {
     return this.request<T>(endpoint, { ...options, method: "DELETE" })
   }
+
+  /**
+   * Server-sent events over fetch (EventSource cannot send the Authorization header).
+   * Reconnects with Last-Event-ID until the signal is aborted.
+   */
+  async stream(endpoint: string, onEvent: (event: StreamEvent) => void, signal: AbortSignal) {
+    let lastEventId: string | null = null
+    let retryMs = 3000
+
+    while (!signal.aborted) {
+      try {
+        const { token } = useAuthStore.getState()
+        const headers = new Headers({ Accept: "text/event-stream" })
+        if (token) headers.set("Authorization", `Bearer ${token}`)
+        if (lastEventId) headers.set("Last-Event-ID", lastEventId)
+
+        const response = await fetch(`${API_BASE_URL}${endpoint}`, { headers, signal })
+        if (response.status === 401) {
+          useAuthStore.getState().logout()
+          window.location.href = "/login"
+          return
+        }
+        if (!response.ok || !response.body) throw new Error(`API error: ${response.status}`)
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+        let buffer = ""
+        while (true) {
+          const { value, done } = await reader.read()
+          if (done) break
+          buffer += value
+          const blocks = buffer.split("\n\n")
+          buffer = blocks.pop() ?? ""
+          for (const block of blocks) {
+            const event: StreamEvent = { id: null, type: "message", data: "" }
+            for (const line of block.split("\n")) {
+              const [field, ...rest] = line.split(":")
+              const value = rest.join(":").replace(/^ /, "")
+              if (field === "id") event.id = value
+              else if (field === "event") event.type = value
+              else if (field === "data") event.data += value
+              else if (field === "retry") retryMs = Number(value) || retryMs
+            }
+            if (!event.data) continue
+            if (event.id) lastEventId = event.id
+            // After a reset the client reloads everything: start again from the live tail
+            if (event.type === "reset") lastEventId = null
+            onEvent(event)
+          }
+        }
+      } catch (e: unknown) {
+        if (signal.aborted) return
+        console.error("Event stream interrupted:", e)
+      }
+      await new Promise((resolve) => setTimeout(resolve, retryMs))
+    }
+  }
+}
+
+export interface StreamEvent {
+  id: string | null
+  type: string
+  data: string
 }
 
 const api = new ApiClient()
@@ -1,11 +1,18 @@
 import json
+import time
 import logging
 from langchain_core.messages import HumanMessage
 from src.application.ai_agents.agent import agente_graph
 from src.core.config import AGENT_NAME, USER_TITLE, ALLOWED_CHAT_IDS
+from src.core.metrics import Counter, Histogram
+from src.core.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Latencia de una vuelta completa del grafo (LLM + tools) y tokens reportados por el proveedor
+AGENT_LATENCY = Histogram("agent_llm_request_duration_seconds", "LangGraph agent invocation time", ["outcome"])
+AGENT_TOKENS = Counter("agent_llm_tokens_total", "LLM tokens reported in usage_metadata", ["direction"])
+
 async def procesar_mensaje_agente(mensaje_usuario: str, thread_id: str) -> dict:
     """
     Envía el mensaje en texto puro al Agente y procesa la interacción de LangGraph.
@@ -24,10 +31,18 @@ async def procesar_mensaje_agente(mensaje_usuario: str, thread_id: str) -> dict:
         f"Mensaje del Usuario: {mensaje_usuario}"
     )
     
-    respuesta_grafo = agente_graph.invoke(
-        {"messages": [HumanMessage(content=texto_con_contexto)]},
-        config=config
-    )
+    inicio = time.perf_counter()
+    try:
+        # LLM + tools del grafo; las tools heredan el trace_id y lo guardan en los Jobs que encolan
+        with span("agent.invoke"):
+            respuesta_grafo = agente_graph.invoke(
+                {"messages": [HumanMessage(content=texto_con_contexto)]},
+                config=config
+            )
+    except Exception:
+        AGENT_LATENCY.observe(time.perf_counter() - inicio, outcome="error")
+        raise
+    AGENT_LATENCY.observe(time.perf_counter() - inicio, outcome="ok")
     
     ultimo_mensaje = respuesta_grafo["messages"][-1]
     respuesta_cruda = ultimo_mensaje.content
@@ -37,6 +52,8 @@ async def procesar_mensaje_agente(mensaje_usuario: str, thread_id: str) -> dict:
     if hasattr(ultimo_mensaje, 'usage_metadata') and ultimo_mensaje.usage_metadata:
         tokens = ultimo_mensaje.usage_metadata
         logger.info(f"   [🪙 TOKENS] Entrada: {tokens.get('input_tokens',0)} | Salida: {tokens.get('output_tokens',0)}")
+        AGENT_TOKENS.inc(tokens.get('input_tokens', 0), direction="input")
+        AGENT_TOKENS.inc(tokens.get('output_tokens', 0), direction="output")
     
     # Limpieza de la respuesta (manejo de formatos extraños de Gemini/LangGraph)
     if isinstance(respuesta_cruda, list):
@@ -0,0 +1,134 @@
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+from src.core.config import (
+    JOB_EVENTS_POLL_SECONDS, JOB_EVENTS_QUEUE_SIZE, JOB_EVENTS_RETENTION_SECONDS,
+)
+from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se purgan los eventos vencidos (no hace falta en cada lectura)
+PRUNE_INTERVAL_SECONDS = 60.0
+
+
+class JobEventBroker:
+    """
+    Pub/sub en proceso de los eventos de Jobs para los streams SSE de la API.
+
+    El Worker corre en otro proceso: sus cambios de status y de progreso llegan al log durable
+    job_events (triggers de la migración 0010). Una sola tarea por proceso lee ese log por rango
+    de PK mientras haya suscriptores y reparte cada evento a las colas del tenant dueño del Job:
+    N dashboards abiertos cuestan una consulta barata cada JOB_EVENTS_POLL_SECONDS, no N polls con JOINs.
+
+    Una cola llena (cliente lento) o una reconexión con demasiado atraso reciben None:
+    el stream lo traduce a un evento `reset` y el cliente recarga el estado completo.
+    """
+
+    def __init__(self, poll_interval: float = JOB_EVENTS_POLL_SECONDS, queue_size: int = JOB_EVENTS_QUEUE_SIZE,
+                 retention_seconds: int = JOB_EVENTS_RETENTION_SECONDS):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.retention_seconds = retention_seconds
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._last_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_at = float("-inf")
+
+    @asynccontextmanager
+    async def subscribe(self, owner_id: str, last_event_id: Optional[int] = None) -> AsyncIterator[asyncio.Queue]:
+        """
+        Cola con los eventos del tenant a partir de ahora. Con last_event_id (header Last-Event-ID
+        del navegador al reconectar) primero se reenvían desde el log los eventos perdidos.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        # La cola se registra antes de cualquier await: lo que el poller publique durante la
+        # recuperación llega a la cola y se fusiona (sin duplicados) con lo leído del log
+        self._subscribers.setdefault(owner_id, set()).add(queue)
+        try:
+            if self._last_id is None:
+                tail = await run_db(StorageService.get_last_job_event_id)
+                if self._last_id is None:
+                    self._last_id = tail
+            if self._task is None:
+                self._task = asyncio.create_task(self._poll())
+            if last_event_id is not None and last_event_id < self._last_id:
+                missed = await run_db(StorageService.get_job_events, last_event_id, self.queue_size, owner_id)
+                self._merge_missed(queue, missed)
+            yield queue
+        finally:
+            queues = self._subscribers.get(owner_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[owner_id]
+
+    def _merge_missed(self, queue: asyncio.Queue, missed: list):
+        """
+        Antepone a la cola los eventos recuperados del log. Lo posterior a _last_id lo entrega el
+        poller; lo que ya publicó mientras se leía el log está en la cola y se deduplica por id.
+        """
+        live = []
+        while not queue.empty():
+            live.append(queue.get_nowait())
+        if len(missed) >= self.queue_size or None in live:
+            queue.put_nowait(None)
+            return
+        events = {event["id"]: event for event in missed if event["id"] <= self._last_id}
+        events.update((event["id"], event) for event in live)
+        for event_id in sorted(events):
+            try:
+                queue.put_nowait(events[event_id])
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                return
+
+    def publish(self, event: dict):
+        for queue in self._subscribers.get(event["owner_id"], ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _poll(self):
+        try:
+            while self._subscribers:
+                try:
+                    events = await run_db(StorageService.get_job_events, self._last_id, self.queue_size)
+                    if events:
+                        self._last_id = events[-1]["id"]
+                    for event in events:
+                        self.publish(event)
+                    if time.monotonic() - self._pruned_at >= PRUNE_INTERVAL_SECONDS:
+                        self._pruned_at = time.monotonic()
+                        await run_db(StorageService.prune_job_events, self.retention_seconds)
+                except Exception as e:
+                    logger.error(f"❌ [EVENTS] Error leyendo job_events: {e}")
+                    events = []
+                if len(events) < self.queue_size:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            # Sin suscriptores el log sigue creciendo solo hasta la retención; el siguiente suscriptor parte de la cola actual
+            self._task = None
+            self._last_id = None
+
+    async def stop(self):
+        """Apagado ordenado (lifespan de la API)."""
+        task = self._task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+job_event_broker = JobEventBroker()
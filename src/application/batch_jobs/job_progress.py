@@ -0,0 +1,62 @@
+import time
+import logging
+from typing import Callable, Optional
+
+from src.core.config import JOB_PROGRESS_INTERVAL_SECONDS
+from src.domain.models import JobStage
+
+logger = logging.getLogger(__name__)
+
+
+class JobProgressReporter:
+    """
+    Recibe los snapshots de progreso del scraper (uno por listing) y los persiste
+    a ritmo acotado: como máximo una escritura cada `min_interval` segundos,
+    salvo cambios de etapa, que se escriben de inmediato.
+    Mantiene estado (último snapshot y hora de escritura), por eso es una clase.
+    """
+
+    def __init__(self, job_id: int, writer: Callable, min_interval: float = JOB_PROGRESS_INTERVAL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.job_id = job_id
+        self.writer = writer
+        self.min_interval = min_interval
+        self.clock = clock
+        self._last_snapshot: Optional[dict] = None
+        self._last_written_at: Optional[float] = None
+        self._dirty = False
+
+    def __call__(self, snapshot: dict):
+        stage_changed = self._last_snapshot is None or snapshot.get("stage") != self._last_snapshot.get("stage")
+        self._last_snapshot = dict(snapshot)
+        self._dirty = True
+        now = self.clock()
+        if stage_changed or self._last_written_at is None or now - self._last_written_at >= self.min_interval:
+            self.flush()
+
+    def set_stage(self, stage: JobStage):
+        """Fuerza una etapa (ej. DONE al terminar) conservando los últimos contadores."""
+        snapshot = dict(self._last_snapshot or {})
+        snapshot["stage"] = stage.value
+        self._last_snapshot = snapshot
+        self._dirty = True
+        self.flush()
+
+    def flush(self):
+        """Escribe el último snapshot pendiente. Best-effort: un fallo de progreso nunca tumba el Job."""
+        if not self._dirty or self._last_snapshot is None:
+            return
+        snap = self._last_snapshot
+        try:
+            self.writer(
+                self.job_id,
+                stage=snap.get("stage", JobStage.STARTING.value),
+                discovered=snap.get("discovered", 0),
+                processed=snap.get("processed", 0),
+                cached=snap.get("cached", 0),
+                skipped=snap.get("skipped", 0),
+            )
+            self._dirty = False
+            self._last_written_at = self.clock()
+        except Exception as e:
+            logger.warning(f"⚠️ [Progress] No se pudo guardar el progreso del Job #{self.job_id}: {e}")
@@ -5,11 +5,16 @@ from apscheduler.triggers.cron import CronTrigger
 from telegram.ext import Application
 from src.infrastructure.database.storage_service import StorageService
 from src.application.ai_agents.agent_service import procesar_mensaje_agente
+from src.core.metrics import Counter, Histogram
+from src.core.tracing import traced
 
 import logging
 # El Scheduler usa el logger global configurado por el componente que lo inicia (Bot)
 logger = logging.getLogger(__name__)
 
+ALERT_RUNS = Counter("scheduler_alert_runs_total", "Scheduled alerts executed", ["outcome"])
+ALERT_DURATION = Histogram("scheduler_alert_duration_seconds", "Agent time spent on a scheduled alert")
+
 class SchedulerService:
     _scheduler = AsyncIOScheduler()
     _app: Application = None
@@ -62,6 +67,7 @@ class SchedulerService:
             logger.error(f"❌ [Scheduler] Error validando CRON '{cron_expression}': {str(e)}")
 
     @classmethod
+    @traced("scheduler.alert")
     async def _ejecutar_alerta(cls, chat_id: str, prompt_task: str):
         """Esta es la función que ejecuta APScheduler a la hora acordada."""
         logger.info(f"⏰ [Scheduler Ejecutando] Tarea programada para chat {chat_id}: {prompt_task}")
@@ -80,13 +86,16 @@ class SchedulerService:
         
         try:
             # 2. Pasamos el prompt al "Cerebro" (LangGraph)
-            resultado = await procesar_mensaje_agente(prompt_task, chat_id)
+            with ALERT_DURATION.time():
+                resultado = await procesar_mensaje_agente(prompt_task, chat_id)
             
             # 3. Mandamos resultados usando el Notificador centralizado (Principio DRY)
             from src.infrastructure.notifications.telegram_service import TelegramService
             await TelegramService.notificar_resultado_agente(bot, str(chat_id), mensaje_estado, resultado)
+            ALERT_RUNS.inc(outcome="ok")
                 
         except Exception as e:
+            ALERT_RUNS.inc(outcome="error")
             await bot.edit_message_text(
                 chat_id=chat_id,
                 message_id=mensaje_estado.message_id,
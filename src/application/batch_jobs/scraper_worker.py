@@ -1,16 +1,35 @@
 import asyncio
 import os
+import time
+from datetime import datetime, timezone
 from typing import Optional
 from src.infrastructure.database.storage_service import StorageService
-from src.domain.engine.scrapers.scraper import GoogleMapsScraper
-from src.core.config import TELEGRAM_BOT_TOKEN
+from src.domain.engine.scrapers.scraper import GoogleMapsScraper, ScrapeCancelled
+from src.domain.models import JobStage
+from src.application.batch_jobs.job_progress import JobProgressReporter
+from src.core.config import (
+    TELEGRAM_BOT_TOKEN, RESULT_REUSE_HOURS, METRICS_HOST, WORKER_METRICS_PORT,
+    JOB_STALE_PROCESSING_SECONDS, JOB_REAPER_INTERVAL_SECONDS,
+)
+from src.core.metrics import Histogram, start_metrics_server
 from telegram import Bot
 import telegram.error
-from src.core.logging_config import setup_logging
+from src.core.logging_config import setup_logging, bind_log_context, reset_log_context
+from src.core.tracing import new_trace_id, record_span, span
 
 # Configuración global de logs del Worker
 logger = setup_logging("WORKER")
 
+JOB_DURATION = Histogram("worker_job_duration_seconds", "Wall time per batch job, from claim until the worker releases it", ["outcome"])
+
+def _record_queue_wait(job: dict):
+    """Tramo de la petición entre encolar (created_at, UTC de SQLite) y que el Worker toma el Job."""
+    try:
+        created = datetime.strptime(job['created_at'], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        return
+    record_span("worker.queue_wait", max((datetime.now(timezone.utc) - created).total_seconds(), 0.0))
+
 async def process_next_job() -> bool:
     """
     Intenta obtener y procesar el siguiente trabajo pendiente en la cola.
@@ -23,6 +42,10 @@ async def process_next_job() -> bool:
     
     job_id = job['id']
     owner_id = job['owner_id']
+    # Todos los logs del Job (Worker y scraper) llevan job_id/owner_id y el trace_id de la petición que lo encoló
+    log_context_token = bind_log_context(job_id=job_id, owner_id=owner_id, trace_id=job.get('trace_id') or new_trace_id())
+    # Carpeta de salida exclusiva del Job (no del tenant) para permitir Jobs concurrentes
+    job_session = StorageService.get_job_session_id(owner_id, job_id)
 
     # Dual-path: Bot usa texto libre, Frontend usa FKs con JOIN
     city_name = job.get('zona_text') or job.get('city_name') or 'Zona desconocida'
@@ -31,8 +54,14 @@ async def process_next_job() -> bool:
     # 2. Iniciar procesamiento. 
     # El status 'processing' ya fue asignado atómicamente por get_pending_job().
     logger.info(f"🔄 [Worker] Iniciando Job #{job_id} para {category_name} en {city_name} (Owner: {owner_id})")
+    _record_queue_wait(job)
 
+    started = time.perf_counter()
+    outcome = "failed"
     bot = Bot(token=TELEGRAM_BOT_TOKEN) if TELEGRAM_BOT_TOKEN else None
+    # Contadores en vivo del Job (escrituras acotadas en el tiempo, ver JobProgressReporter)
+    progress = JobProgressReporter(job_id, StorageService.update_job_progress)
+    progress.set_stage(JobStage.STARTING)
 
     try:
         if bot:
@@ -48,23 +77,39 @@ async def process_next_job() -> bool:
                 logger.warning(f"⚠️ [Worker] No se pudo notificar inicio al usuario {owner_id}: {tg_err}. El job continúa.")
 
 
-        # 3. Instanciar el Scraper aislando sesión y en modo headless (para servidor)
-        scraper = GoogleMapsScraper(headless_override=True, session_id=owner_id)
+        # 3. Instanciar el Scraper aislando sesión y en modo headless (para servidor).
+        # Si la misma búsqueda se extrajo hace poco, el scraper arma los reportes desde leads.db
+        # sin abrir Chromium, salvo que el Job pida force_refresh.
+        reuse_hours = None if job.get('force_refresh') else RESULT_REUSE_HOURS
+        scraper = GoogleMapsScraper(
+            headless_override=True, session_id=job_session, job_id=job_id, owner_id=owner_id,
+            reuse_max_age_hours=reuse_hours, progress_callback=progress,
+            cancel_check=lambda: StorageService.is_job_cancelled(job_id)
+        )
         
         # 4. Ejecutar el scraping real
-        await scraper.scrape([city_name], [category_name])
+        with span("worker.scrape"):
+            await scraper.scrape([city_name], [category_name])
         
         # 5. Guardar datos en Excel y actualizar la base de datos de leads maestras
-        scraper.save_data()
+        with span("worker.save"):
+            scraper.save_data()
+
+        # Una cancelación que llega tras el scraping tampoco entrega archivos ni marca el Job completado
+        if StorageService.is_job_cancelled(job_id):
+            raise ScrapeCancelled(f"Job {job_id} cancelled before delivery")
         
-        # 6. Marcar trabajo como completado
+        # 6. Marcar trabajo como completado (leads_found alimenta el contador de su lote, si tiene)
+        StorageService.set_job_leads_found(job_id, len(scraper.results))
+        progress.set_stage(JobStage.DONE)
         StorageService.update_job_status(job_id, 'completed')
+        outcome = "completed"
         logger.info(f"✅ [Worker] Job #{job_id} completado con éxito.")
         
-        # 7. Enviar archivos resultantes y limpiar sesión (best-effort)
+        # 7. Enviar archivos resultantes del Job (best-effort). La limpieza ocurre en el finally.
         if bot:
             try:
-                archivos = StorageService.fetch_excel_files_for_session(owner_id)
+                archivos = StorageService.fetch_excel_files_for_session(job_session)
                 if len(archivos) > 0:
                     await bot.send_message(
                         chat_id=owner_id, 
@@ -79,15 +124,27 @@ async def process_next_job() -> bool:
                         chat_id=owner_id, 
                         text=f"✅ Extracción completada para {category_name} en {city_name}. Sin embargo, no se encontraron resultados nuevos (o no tienen teléfono/email públicos para clasificar)."
                     )
-                StorageService.eliminar_sesion(owner_id)
             except (telegram.error.Forbidden, telegram.error.BadRequest) as tg_err:
                 logger.warning(f"⚠️ [Worker] No se pudo enviar notificación de completado al usuario {owner_id}: {tg_err}")
             
         return True
 
+    except ScrapeCancelled:
+        # El status ya es 'cancelled' (lo puso la API). El browser ya se cerró en scrape();
+        # solo conservamos en leads.db lo extraído hasta ahora y liberamos el slot.
+        # La etapa 'cancelled' (con los últimos contadores) evita que el Dashboard quede en la anterior.
+        progress.set_stage(JobStage.CANCELLED)
+        outcome = "cancelled"
+        logger.info(f"🛑 [Worker] Job #{job_id} cancelado por el usuario. Liberando el worker.")
+        try:
+            scraper.save_to_db()
+        except Exception as save_err:
+            logger.warning(f"⚠️ [Worker] No se pudieron guardar los leads parciales del Job #{job_id}: {save_err}")
+        return False
 
     except Exception as e:
         # En caso de catástrofe aseguramos que la cola no se bloquee.
+        progress.flush()
         StorageService.update_job_status(job_id, 'failed')
         logger.error(f"❌ [Worker] Error crítico en Job #{job_id}: {str(e)}", exc_info=True)
         
@@ -102,16 +159,35 @@ async def process_next_job() -> bool:
             
         return False
 
+    finally:
+        JOB_DURATION.observe(time.perf_counter() - started, outcome=outcome)
+        # Limpieza rigurosa y acotada al Job: nunca borra reportes de otros Jobs del mismo tenant
+        StorageService.eliminar_sesion(job_session)
+        reset_log_context(log_context_token)
+
+def requeue_stale_jobs():
+    """Reencola Jobs huérfanos de Workers caídos (ver StorageService.requeue_stale_jobs)."""
+    requeued = StorageService.requeue_stale_jobs(JOB_STALE_PROCESSING_SECONDS)
+    if requeued:
+        logger.warning(f"⚠️ [Worker] {requeued} Job(s) sin avance en {JOB_STALE_PROCESSING_SECONDS}s vueltos a la cola.")
+
 async def main_loop(interval_seconds: int = 10):
     """
     Bucle infinito que mantiene vivo al worker consultando la cola.
+    Al arrancar y cada JOB_REAPER_INTERVAL_SECONDS reencola los Jobs huérfanos de Workers caídos.
     """
     logger.info("🚀 [Worker] Scraper Worker Iniciado. Escuchando cola batch_jobs...")
+    start_metrics_server(WORKER_METRICS_PORT, METRICS_HOST)
     was_paused = False
+    last_reap = None
     while True:
         try:
             # Reportar latido de vida para el Dashboard
             StorageService.set_worker_heartbeat()
+
+            if last_reap is None or time.monotonic() - last_reap >= JOB_REAPER_INTERVAL_SECONDS:
+                last_reap = time.monotonic()
+                requeue_stale_jobs()
             
             if not StorageService.get_worker_enabled():
                 if not was_paused:
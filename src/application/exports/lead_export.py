@@ -0,0 +1,170 @@
+"""
+Serialización de exportaciones de leads (CSV, NDJSON y XLSX) a partir de chunks de filas.
+
+Cada writer recibe el iterador de chunks de StorageService.open_lead_export y produce bytes
+chunk a chunk, para que la API los entregue con StreamingResponse sin cargar la exportación completa:
+- CSV: con BOM UTF-8 para que Excel respete los acentos.
+- NDJSON: un objeto JSON por línea.
+- XLSX: SpreadsheetML mínimo (una hoja, celdas inline) escrito sobre un zipfile abierto en un
+  sink no seekable: zipfile usa data descriptors, así que cada chunk de filas sale comprimido
+  apenas se escribe y el índice central del ZIP se emite al cerrar. Sin archivo temporal ni
+  libro completo en memoria.
+"""
+import csv
+import io
+import json
+import re
+import zipfile
+from typing import Dict, Iterable, Iterator, List
+from xml.sax.saxutils import escape
+
+EXPORT_COLUMNS = ['name', 'phone', 'email', 'address', 'website', 'map_url', 'zone', 'stars', 'reviews', 'segment', 'source']
+
+# Caracteres de control que XML 1.0 no admite (Excel rechaza el archivo si aparecen)
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Leads" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="1"><xf/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+_XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+_XLSX_COLUMN_LETTERS = [chr(ord("A") + i) for i in range(len(EXPORT_COLUMNS))]
+
+
+def _values(row: dict) -> list:
+    return [row.get(column) for column in EXPORT_COLUMNS]
+
+
+def write_csv(chunks: Iterable[List[dict]]) -> Iterator[bytes]:
+    yield "\ufeff".encode("utf-8")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(_values(row) for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Solo el encabezado (exportación vacía)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_ndjson(chunks: Iterable[List[dict]]) -> Iterator[bytes]:
+    for rows in chunks:
+        lines = (json.dumps({column: row.get(column) for column in EXPORT_COLUMNS}, ensure_ascii=False) for row in rows)
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino no seekable del zipfile: acumula lo escrito hasta que el writer lo drena."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _xlsx_cell(ref: str, value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = escape(_XML_ILLEGAL.sub("", str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number: int, values: list) -> str:
+    cells = "".join(_xlsx_cell(f"{letter}{number}", value) for letter, value in zip(_XLSX_COLUMN_LETTERS, values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+def write_xlsx(chunks: Iterable[List[dict]]) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((_XLSX_SHEET_HEAD + _xlsx_row(1, EXPORT_COLUMNS)).encode("utf-8"))
+            number = 1
+            for rows in chunks:
+                lines = []
+                for row in rows:
+                    number += 1
+                    lines.append(_xlsx_row(number, _values(row)))
+                sheet.write("".join(lines).encode("utf-8"))
+                block = sink.drain()
+                if block:
+                    yield block
+            sheet.write(_XLSX_SHEET_TAIL.encode("utf-8"))
+    yield sink.drain()
+
+
+EXPORT_FORMATS: Dict[str, tuple] = {
+    "csv": ("text/csv; charset=utf-8", write_csv),
+    "ndjson": ("application/x-ndjson", write_ndjson),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_xlsx),
+}
+
+
+def export_writer(export_format: str) -> tuple:
+    """(media_type, writer) del formato. Lanza ValueError si el formato no existe."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no soportado: {export_format}. Usa uno de: {', '.join(EXPORT_FORMATS)}.")
+    return EXPORT_FORMATS[export_format]
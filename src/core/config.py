@@ -32,3 +32,73 @@ JWT_SECRET = os.getenv("JWT_SECRET", "super-secret-key-bastion-core")
 # CORS: Orígenes permitidos (para desarrollo y producción)
 allowed_origins_env = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000")
 ALLOWED_ORIGINS = [o.strip() for o in allowed_origins_env.split(",")] if allowed_origins_env else ["http://localhost:3000"]
+
+# Reutilización de resultados: si la misma categoría/ciudad se extrajo hace menos de N horas,
+# el Worker arma los reportes desde leads.db sin abrir Chromium (0 = desactivado)
+RESULT_REUSE_HOURS = int(os.getenv("RESULT_REUSE_HOURS", "24"))
+
+# Progreso de Jobs: intervalo mínimo (segundos) entre escrituras de contadores a SQLite
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.getenv("JOB_PROGRESS_INTERVAL_SECONDS", "2"))
+# Un Job en 'processing' sin avance durante este tiempo se da por huérfano (Worker caído) y vuelve a la cola
+JOB_STALE_PROCESSING_SECONDS = int(os.getenv("JOB_STALE_PROCESSING_SECONDS", "1800"))
+JOB_REAPER_INTERVAL_SECONDS = int(os.getenv("JOB_REAPER_INTERVAL_SECONDS", "60"))
+
+# SQLite: ajustes de las conexiones compartidas (ver src/infrastructure/database/connection.py)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "128"))
+
+# API: hilos dedicados a SQLite. Acota cuántas consultas corren en paralelo fuera del event loop
+DB_THREAD_POOL_SIZE = int(os.getenv("DB_THREAD_POOL_SIZE", "8"))
+
+# Caché en memoria del catálogo maestro: cada cuántos segundos se revalida contra catalog_version
+# (las escrituras del mismo proceso lo invalidan al instante; 0 = revalidar en cada lectura)
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "30"))
+
+# Exportación de leads: filas leídas de SQLite (y escritas al cliente) por chunk; acota la memoria por descarga
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+# API: respuestas a partir de este tamaño se comprimen con gzip si el cliente lo acepta
+GZIP_MINIMUM_SIZE_BYTES = int(os.getenv("GZIP_MINIMUM_SIZE_BYTES", "1024"))
+
+# Eventos de Jobs (SSE): cada proceso de la API lee el log job_events cada N segundos y lo reparte a sus suscriptores
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "0.5"))
+JOB_EVENTS_RETENTION_SECONDS = int(os.getenv("JOB_EVENTS_RETENTION_SECONDS", "3600"))
+JOB_EVENTS_KEEPALIVE_SECONDS = float(os.getenv("JOB_EVENTS_KEEPALIVE_SECONDS", "15"))
+JOB_EVENTS_QUEUE_SIZE = int(os.getenv("JOB_EVENTS_QUEUE_SIZE", "1000"))
+
+# Métricas (formato Prometheus): la API las expone en /metrics; Worker y Bot en su propio puerto (0 = desactivado)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))
+BOT_METRICS_PORT = int(os.getenv("BOT_METRICS_PORT", "9102"))
+# /metrics de la API exige "Authorization: Bearer <token>"; vacío = endpoint desactivado (404)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Logs de los componentes (start_dev.sh) expuestos al panel de Admin
+LOGS_DIR = os.getenv("LOGS_DIR", "logs")
+LOG_FOLLOW_POLL_SECONDS = float(os.getenv("LOG_FOLLOW_POLL_SECONDS", "1.0"))
+# Tope de bytes recorridos hacia atrás por request de búsqueda; el resto se pagina con el cursor
+LOG_TAIL_SCAN_LIMIT_BYTES = int(os.getenv("LOG_TAIL_SCAN_LIMIT_BYTES", str(64 * 1024 * 1024)))
+
+# Logging (ver setup_logging): formato text ([ts] [COMP] mensaje) o json, archivo opcional con rotación
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_FILE = os.getenv("LOG_FILE", "")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Niveles por logger: "src.domain.engine=DEBUG,httpx=WARNING"
+LOG_LEVELS = dict(
+    (name.strip(), level.strip().upper())
+    for name, level in (pair.split("=", 1) for pair in os.getenv("LOG_LEVELS", "").split(",") if "=" in pair)
+)
+
+# Login por OTP (tabla auth_otps, compartida entre procesos de la API)
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "300"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_RESEND_SECONDS = int(os.getenv("OTP_RESEND_SECONDS", "30"))
+
+# Cuotas de creación de Jobs por tenant (owner_id); tenant_quotas puede sobrescribirlas. 0 = sin límite.
+TENANT_JOBS_PER_HOUR = int(os.getenv("TENANT_JOBS_PER_HOUR", "3000"))
+TENANT_MAX_PENDING_JOBS = int(os.getenv("TENANT_MAX_PENDING_JOBS", "5000"))
+TENANT_MAX_PROCESSING_JOBS = int(os.getenv("TENANT_MAX_PROCESSING_JOBS", "0"))
+# Retry-After sugerido cuando la cola del tenant está llena (depende de cuánto tarde el Worker en vaciarla)
+TENANT_PENDING_RETRY_SECONDS = int(os.getenv("TENANT_PENDING_RETRY_SECONDS", "60"))
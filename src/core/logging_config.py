@@ -1,6 +1,53 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-from datetime import datetime
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, Optional
+
+from src.core.config import LOG_BACKUP_COUNT, LOG_FILE, LOG_FORMAT, LOG_LEVELS, LOG_MAX_BYTES
+
+# Campos de contexto (job_id, owner_id, ...) que se adjuntan a cada registro emitido dentro del bloque
+_log_context: ContextVar[Dict[str, object]] = ContextVar("log_context", default={})
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def bind_log_context(**fields) -> Token:
+    """Agrega campos al contexto de logging de la tarea/hilo actual. Restaurar con reset_log_context(token)."""
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_log_context(token: Token):
+    _log_context.reset(token)
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+
+def get_log_context() -> Dict[str, object]:
+    return _log_context.get()
+
+
+class ContextFilter(logging.Filter):
+    """Copia el contexto al registro en el hilo que loguea (las contextvars no cruzan a la cola)."""
+
+    def filter(self, record):
+        record.context = _log_context.get()
+        return True
+
 
 class ComponentFormatter(logging.Formatter):
     """
@@ -10,29 +57,142 @@ class ComponentFormatter(logging.Formatter):
     def __init__(self, component_name: str):
         super().__init__()
         self.component_name = component_name
+        self._second = None
+        self._timestamp = ""
+
+    def timestamp(self, record) -> str:
+        # Hora de creación del registro (no de escritura) y un strftime por segundo, no por línea
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return self._timestamp
 
     def format(self, record):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return f"[{timestamp}] [{self.component_name}] {record.getMessage()}"
+        prefix = f"[{self.timestamp(record)}] [{self.component_name}]"
+        trace_id = getattr(record, "context", {}).get("trace_id")
+        if trace_id:
+            # Correlación entre Bot, API y Worker (ver src/core/tracing.py)
+            prefix = f"{prefix} [trace={trace_id}]"
+        message = f"{prefix} {record.getMessage()}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        return message
+
+
+class JsonFormatter(ComponentFormatter):
+    """Una línea JSON por registro (LOG_FORMAT=json) con nivel, logger y el contexto (job_id, owner_id...)."""
+
+    def format(self, record):
+        payload = {
+            "time": self.timestamp(record),
+            "component": self.component_name,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "context", {}),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # El formateo completo ocurre en el hilo del listener: aquí solo se resuelve el mensaje
+        # (los args pueden cambiar después) y se serializa el traceback mientras sigue vivo.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        # Vacía la cola antes de salir: ningún log en tránsito se pierde
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def stop_logging():
+    """
+    Apagado ordenado (lifespan de la API): vacía la cola y detiene el hilo del listener.
+    Lo que se loguee después (ej. el cierre de uvicorn) se escribe directo a los handlers finales.
+    """
+    listener = _listener
+    _stop_listener()
+    if listener is None:
+        return
+    logger = logging.getLogger()
+    for handler in logger.handlers[:]:
+        if isinstance(handler, _QueueHandler):
+            logger.removeHandler(handler)
+    for handler in listener.handlers:
+        logger.addHandler(handler)
+
+
+def _component_level(component_name: str, default):
+    level = os.getenv(f"LOG_LEVEL_{component_name.upper()}")
+    return level.upper() if level else default
+
 
 def setup_logging(component_name: str, level=logging.INFO):
     """
     Configuración de logging senior con formato de marca de tiempo y componente.
+
+    El logger raíz solo encola (QueueHandler): el formateo y la escritura a stdout/archivo ocurren
+    en el hilo de un QueueListener, así un stdout lento no frena el event loop del scraper.
+    - LOG_FORMAT=json: una línea JSON por registro con el contexto de log_context().
+    - LOG_FILE: además escribe a ese archivo con rotación por tamaño (LOG_MAX_BYTES, LOG_BACKUP_COUNT).
+    - LOG_LEVEL_<COMPONENTE> (ej. LOG_LEVEL_WORKER=DEBUG) fija el nivel del componente;
+      LOG_LEVELS="src.domain.engine=DEBUG,httpx=WARNING" el de loggers puntuales.
     """
+    global _listener
+    _stop_listener()
+
     logger = logging.getLogger()
-    logger.setLevel(level)
-    
+    logger.setLevel(_component_level(component_name, level))
+
     # Limpiar handlers previos para evitar duplicados
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
-        
-    # Usar sys.stdout directamente (sin interceptaciones complejas por ahora para estabilidad)
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(ComponentFormatter(component_name))
-    logger.addHandler(handler)
-    
+
+    formatter = JsonFormatter(component_name) if LOG_FORMAT == "json" else ComponentFormatter(component_name)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8",
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = _QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    # Ningún formatter usa proceso ni hilo: no se calculan por registro
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logThreads = False
+
     # Silenciar ruidos externos
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("apscheduler").setLevel(logging.INFO)
-    
+    for name, name_level in LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(name_level)
+
     return logger
@@ -1,7 +1,9 @@
 from langchain_core.tools import tool
 from langchain_core.runnables.config import RunnableConfig
 from src.infrastructure.database.storage_service import StorageService
+from src.domain.models import JobPriority, QuotaExceeded
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +14,19 @@ logger = logging.getLogger(__name__)
 # El Agente ya no sabe *cómo* se ejecutan los scrapers en la consola (subprocess), 
 # solo sabe que estas herramientas existen y las manda a llamar.
 
+def _mensaje_cuota(e: QuotaExceeded, jobs_creados: list) -> str:
+    """Respuesta para el Agente cuando el tenant llega a su cuota: qué sí se encoló y cuándo reintentar."""
+    logger.warning(f"⚠️ [CUOTA] {e}")
+    if e.quota == "max_pending":
+        partes = [f"⏳ No se pudieron agendar todas las búsquedas: el usuario ya tiene el máximo de {e.limit} en espera."]
+    else:
+        partes = [f"⏳ No se pudieron agendar todas las búsquedas: el usuario alcanzó su límite de {e.limit} por hora."]
+    if jobs_creados:
+        partes.append(f"Se alcanzaron a encolar {len(jobs_creados)} (Job IDs: {', '.join(jobs_creados)}).")
+    if e.retry_after:
+        partes.append(f"Puede reintentar en unos {max(1, math.ceil(e.retry_after / 60))} minuto(s).")
+    return " ".join(partes)
+
 @tool
 def ejecutar_scraper_google_maps(zonas: str, categorias: str, config: RunnableConfig) -> str:
     """
@@ -41,13 +56,17 @@ def ejecutar_scraper_google_maps(zonas: str, categorias: str, config: RunnableCo
             city_id = city_data['id'] if city_data else None
             city_text = None if city_data else zona_name
             
-            job_id = StorageService.create_hybrid_job(
-                owner_id=owner_id, 
-                category_id=cat_id, 
-                categoria_text=cat_text,
-                city_id=city_id,
-                zona_text=city_text
-            )
+            try:
+                job_id = StorageService.create_hybrid_job(
+                    owner_id=owner_id, 
+                    category_id=cat_id, 
+                    categoria_text=cat_text,
+                    city_id=city_id,
+                    zona_text=city_text,
+                    priority=JobPriority.INTERACTIVE
+                )
+            except QuotaExceeded as e:
+                return _mensaje_cuota(e, jobs_creados)
             jobs_creados.append(str(job_id))
     
     if not jobs_creados:
@@ -87,13 +106,17 @@ def ejecutar_scraper_facebook(zonas: str, categorias: str, config: RunnableConfi
             city_id = city_data['id'] if city_data else None
             city_text = None if city_data else zona_name
             
-            job_id = StorageService.create_hybrid_job(
-                owner_id=owner_id, 
-                category_id=cat_id, 
-                categoria_text=cat_text,
-                city_id=city_id,
-                zona_text=city_text
-            )
+            try:
+                job_id = StorageService.create_hybrid_job(
+                    owner_id=owner_id, 
+                    category_id=cat_id, 
+                    categoria_text=cat_text,
+                    city_id=city_id,
+                    zona_text=city_text,
+                    priority=JobPriority.INTERACTIVE
+                )
+            except QuotaExceeded as e:
+                return _mensaje_cuota(e, jobs_creados)
             jobs_creados.append(str(job_id))
             
     return f"✅ He encolado {len(jobs_creados)} búsqueda(s) en Facebook. Recibirás los archivos aquí automáticamente."
@@ -0,0 +1,82 @@
+"""
+IDs de correlación de punta a punta: mensaje de Telegram / request HTTP / alerta → Agente → tools →
+batch_jobs.trace_id → Worker → GoogleMapsScraper.
+
+- El trace_id vive en el contexto de logging (contextvars): cada registro lo lleva (campo `trace_id`
+  en JSON, prefijo [trace=…] en texto) y viaja solo a hilos (run_db, tools del grafo) y tareas async.
+- Se crea en la entrada (traced / TraceMiddleware) y se persiste en el Job al encolarlo; el Worker
+  lo retoma de la fila, así los logs del Bot, la API y el Worker de una misma petición comparten ID.
+- span() mide un tramo: un log con la duración y el histograma trace_span_duration_seconds{span}.
+"""
+import functools
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import Token
+from typing import Iterator, Optional
+
+from src.core.logging_config import bind_log_context, get_log_context, reset_log_context
+from src.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+SPAN_DURATION = Histogram("trace_span_duration_seconds", "Duration of traced spans", ["span"])
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id() -> Optional[str]:
+    return get_log_context().get("trace_id")
+
+
+def start_trace(trace_id: Optional[str] = None) -> Token:
+    """Fija el trace_id de la tarea actual (nuevo si no se da). Restaurar con end_trace(token)."""
+    return bind_log_context(trace_id=trace_id or new_trace_id())
+
+
+def end_trace(token: Token):
+    reset_log_context(token)
+
+
+@contextmanager
+def trace(trace_id: Optional[str] = None) -> Iterator[str]:
+    token = start_trace(trace_id)
+    try:
+        yield current_trace_id()
+    finally:
+        end_trace(token)
+
+
+def record_span(name: str, seconds: float, outcome: str = "ok", **fields):
+    """Registra un tramo ya medido (ej. la espera en cola, calculada desde created_at)."""
+    SPAN_DURATION.observe(seconds, span=name)
+    details = "".join(f" {key}={value}" for key, value in fields.items())
+    logger.info(f"⏱️ [TRACE] {name} {seconds * 1000:.0f} ms ({outcome}){details}")
+
+
+@contextmanager
+def span(name: str, **fields) -> Iterator[None]:
+    """Mide el bloque; el log de cierre lleva el trace_id vigente y `fields` (ej. query)."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        record_span(name, time.perf_counter() - start, outcome, **fields)
+
+
+def traced(span_name: str):
+    """Decorador de handlers async de entrada (Bot, alertas): cada invocación abre un trace nuevo y un span."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with trace(), span(span_name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -11,23 +11,52 @@ import re
 import json
 import sys
 import argparse
+import unicodedata
+from contextlib import contextmanager
+
+from src.domain.models import JobStage
+from src.infrastructure.database.connection import connection
+from src.infrastructure.database.migrations import LEADS_MIGRATIONS, apply_migrations, ensure_schema
+from src.core.metrics import Counter
+from src.core.tracing import span
+
+# rate(scraper_listings_total{result="processed"}[5m]) * 60 = listings per minute
+LISTINGS = Counter("scraper_listings_total", "Listings handled by GoogleMapsScraper, by progress counter", ["result"])
+BROWSER_LAUNCHES = Counter("scraper_browser_launches_total", "Chromium launches (one per scrape that is not fully reused)")
 
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
+class ScrapeCancelled(Exception):
+    """Raised when the cancel_check callable reports that the job was cancelled."""
+
+
 class GoogleMapsScraper:
     """
     Scraper for Google Maps business listings via Playwright.
     Methods to search, scroll feed, extract details (Name, Address, Phone), and save data.
     """
-    def __init__(self, headless_override=None, session_id=None, db_path='data/leads.db'):
+    def __init__(self, headless_override=None, session_id=None, db_path='data/leads.db', reuse_max_age_hours=None,
+                 progress_callback=None, cancel_check=None, job_id=None, owner_id=None):
         self.results = []
         self.known_leads = {} # Cache for existing DB records: {(name, zone): data_dict}
         self.seen_names = set() # Global session cache for names
         self.seen_phones = set() # Global session cache for phones
         self.session_id = session_id
+        # Batch job that owns this run: every result is linked to it in job_leads on save
+        self.job_id = job_id
+        self.owner_id = owner_id
         self.db_path = db_path
+        # Result reuse: if a query was fully scraped within this window, rebuild from DB (None/0 = disabled)
+        self.reuse_max_age_hours = reuse_max_age_hours
+        self.completed_queries = [] # Queries scraped in this run, recorded in scrape_runs on save
+        self.reused_queries = [] # Queries served from a recent run without opening the browser
+        # Live counters; progress_callback(snapshot) is invoked on every change (caller throttles writes)
+        self.progress = {"stage": JobStage.STARTING.value, "discovered": 0, "processed": 0, "cached": 0, "skipped": 0}
+        self.progress_callback = progress_callback
+        # Cooperative cancellation: cancel_check() -> True stops the run between listings/pairs
+        self.cancel_check = cancel_check
         self.config = self.load_config()
         if headless_override is not None:
             self.headless = headless_override
@@ -70,18 +99,17 @@ class GoogleMapsScraper:
             return
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row # Access columns by name
-            c = conn.cursor()
-            
-            # Check if table exists
-            c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='leads'")
-            if not c.fetchone():
-                conn.close()
-                return
-
-            c.execute("SELECT * FROM leads")
-            rows = c.fetchall()
+            with connection(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row # Access columns by name
+                c = conn.cursor()
+
+                # Check if table exists
+                c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='leads'")
+                if not c.fetchone():
+                    return
+
+                c.execute("SELECT * FROM leads")
+                rows = c.fetchall()
             
             for row in rows:
                 # Create a dictionary from the row
@@ -91,20 +119,111 @@ class GoogleMapsScraper:
                 if key[0]: # Ensure name is not empty
                     self.known_leads[key] = data
             
-            conn.close()
             logger.info(f"[CACHE] Loaded {len(self.known_leads)} existing leads from database.")
         except Exception as e:
             logger.info(f"[CACHE] Error loading cache: {e}")
 
+    def _report_progress(self, stage=None, **increments):
+        """Updates the live counters and notifies the progress callback, if any."""
+        if stage is not None:
+            self.progress["stage"] = stage.value if isinstance(stage, JobStage) else stage
+        for key, delta in increments.items():
+            self.progress[key] += delta
+            if delta > 0:
+                LISTINGS.inc(delta, result=key)
+        if self.progress_callback:
+            try:
+                self.progress_callback(dict(self.progress))
+            except Exception as e:
+                logger.info(f"[PROGRESS] Could not report progress: {e}")
+
+    def _raise_if_cancelled(self):
+        """Polls cancel_check (if any) and aborts the run with ScrapeCancelled."""
+        if not self.cancel_check:
+            return
+        try:
+            cancelled = self.cancel_check()
+        except Exception as e:
+            logger.warning(f"Cancel check failed, continuing: {e}")
+            return
+        if cancelled:
+            raise ScrapeCancelled("Job cancelled")
+
+    @staticmethod
+    def canonical_query(category, zone):
+        """
+        Canonical key for a category/zone pair: accent-, case- and whitespace-insensitive.
+        'Dentistas en  Monterrey' and 'dentistas en monterrey' share the same key.
+        """
+        def _norm(text):
+            text = unicodedata.normalize('NFKD', str(text))
+            text = "".join(ch for ch in text if not unicodedata.combining(ch))
+            return " ".join(text.casefold().split())
+        return f"{_norm(category)}|{_norm(zone)}"
+
+    def load_recent_run(self, category, zone):
+        """
+        Looks up a fresh scrape of the same canonical query in scrape_runs.
+        If found, loads its stored leads into self.results (flagged as cached) and returns True.
+        """
+        if not self.reuse_max_age_hours or self.reuse_max_age_hours <= 0:
+            return False
+        if self.db_path != ':memory:' and not os.path.exists(self.db_path):
+            return False
+
+        try:
+            with self._leads_db() as conn:
+                conn.row_factory = sqlite3.Row
+                c = conn.cursor()
+                c.execute(
+                    "SELECT zone FROM scrape_runs WHERE query_key = ? AND scraped_at >= datetime('now', ?)",
+                    (self.canonical_query(category, zone), f"-{int(self.reuse_max_age_hours)} hours")
+                )
+                run = c.fetchone()
+                if not run:
+                    return False
+
+                c.execute("SELECT * FROM leads WHERE zone = ?", (run['zone'],))
+                rows = [dict(row) for row in c.fetchall()]
+        except Exception as e:
+            logger.info(f"[REUSE] Error checking recent runs: {e}")
+            return False
+
+        if not rows:
+            return False
+
+        for row in rows:
+            row['_from_cache'] = True
+            self.results.append(row)
+        self._report_progress(JobStage.REUSED, discovered=len(rows), cached=len(rows))
+        logger.info(f"[REUSE] '{category} en {zone}' scraped within {self.reuse_max_age_hours}h. Loaded {len(rows)} leads from DB.")
+        return True
+
     async def scrape(self, zones, categories):
         """
         Main scraping loop.
         Iterates through all combinations of zones and categories.
+        Pairs with a fresh run in the DB are rebuilt from stored rows; the browser
+        is only launched if at least one pair still needs scraping.
         """
+        pending = []
+        for zone in zones:
+            for category in categories:
+                if self.load_recent_run(category, zone):
+                    self.reused_queries.append(f"{category} en {zone}")
+                else:
+                    pending.append((zone, category))
+
+        self._raise_if_cancelled()
+        if not pending:
+            logger.info("[REUSE] All queries served from recent runs. Browser not launched.")
+            return self.results
+
         async with async_playwright() as p:
             # Init browser
             # We use chromium. Launch options can be adjusted.
             browser = await p.chromium.launch(headless=self.headless)
+            BROWSER_LAUNCHES.inc()
             context = await browser.new_context(
                 viewport={"width": 1280, "height": 800},
                 locale="es-MX",
@@ -116,17 +235,24 @@ class GoogleMapsScraper:
             self.seen_names = set()
             self.seen_phones = set()
             
-            for zone in zones:
-                for category in categories:
+            try:
+                for zone, category in pending:
+                    self._raise_if_cancelled()
                     search_query = f"{category} en {zone}"
                     logger.info(f"\n--- Searching for: {search_query} ---")
-                    
+
                     try:
-                        await self.search_and_extract(page, search_query)
+                        # Per-query timing under the job's trace id (search, scroll and extraction)
+                        with span("scraper.query", query=repr(search_query)):
+                            await self.search_and_extract(page, search_query)
+                        self.completed_queries.append((self.canonical_query(category, zone), search_query))
+                    except ScrapeCancelled:
+                        raise
                     except Exception as e:
                         logger.info(f"Error scraping {search_query}: {e}")
-
-            await browser.close()
+            finally:
+                # Always release the browser, including on cancellation, so the worker slot frees up fast
+                await browser.close()
             return self.results
 
     async def search_and_extract(self, page, query):
@@ -134,6 +260,7 @@ class GoogleMapsScraper:
         Performs the search on Google Maps, scrolls the results feed to load all items,
         and extracts details for each listing.
         """
+        self._report_progress(JobStage.SEARCHING)
         await page.goto("https://www.google.com/maps", timeout=60000)
         
         # Search input interaction
@@ -168,6 +295,7 @@ class GoogleMapsScraper:
         feed_selector = 'div[role="feed"]'
         
         logger.info("Scrolling results...")
+        self._report_progress(JobStage.SCROLLING)
         previous_height = 0
         scroll_attempts = 0
         max_scroll_attempts = 5  # Increased retries for stability
@@ -219,8 +347,10 @@ class GoogleMapsScraper:
         # Select all listing items
         listings = await page.query_selector_all(f'{feed_selector} > div > div[role="article"]')
         logger.info(f"Found {len(listings)} listings to process.")
+        self._report_progress(JobStage.EXTRACTING, discovered=len(listings))
         
         for i, listing in enumerate(listings):
+            self._raise_if_cancelled()
             data = {}
             data['source'] = 'Google Maps' # Default source
             
@@ -233,6 +363,7 @@ class GoogleMapsScraper:
                 continue
             
             if not name:
+                self._report_progress(skipped=1)
                 continue
 
             # CHECK FOR CLOSED STATUS (Red text usually)
@@ -241,6 +372,7 @@ class GoogleMapsScraper:
                 full_text = await listing.inner_text()
                 if self.is_business_closed(full_text):
                     logger.info(f"[{i+1}/{len(listings)}] [SKIPPED] Closed: {name}")
+                    self._report_progress(skipped=1)
                     continue
             except:
                 pass
@@ -257,6 +389,7 @@ class GoogleMapsScraper:
                 
                 self.results.append(data)
                 logger.info(f"[{i+1}/{len(listings)}] [CACHE] Loaded from DB: {name}")
+                self._report_progress(cached=1)
                 continue
 
             # Process detail extraction (If not in cache)
@@ -305,6 +438,7 @@ class GoogleMapsScraper:
                     norm_phone = norm_phone[-10:]
                     if norm_phone in self.seen_phones:
                         logger.info(f"  [SKIPPED] Phone {norm_phone} already processed: {data['name']}")
+                        self._report_progress(skipped=1)
                         continue
                     self.seen_phones.add(norm_phone)
                 else:
@@ -312,6 +446,7 @@ class GoogleMapsScraper:
                     norm_name = "".join(filter(str.isalnum, data['name'].lower()))
                     if norm_name in self.seen_names:
                         logger.info(f"  [SKIPPED] Name '{data['name']}' already processed (no phone).")
+                        self._report_progress(skipped=1)
                         continue
                     self.seen_names.add(norm_name)
                 
@@ -344,6 +479,7 @@ class GoogleMapsScraper:
             data['zone'] = query
             self.results.append(data)
             logger.info(f"[{i+1}/{len(listings)}] Extracted: {data['name']} - Stars: {data.get('stars')} - Revs: {data.get('reviews')}")
+            self._report_progress(processed=1)
 
     async def get_facebook_contact(self, context, business_name, zone):
         # ... (Method remains for future use) ...
@@ -379,6 +515,13 @@ class GoogleMapsScraper:
         
         return 'Other'
 
+    def _safe_segment(self, row):
+        """classify_lead for persistence: a malformed stars/reviews value must not abort the insert."""
+        try:
+            return self.classify_lead(row)
+        except (TypeError, ValueError):
+            return None
+
     @staticmethod
     def is_business_closed(full_text):
         """
@@ -461,6 +604,19 @@ class GoogleMapsScraper:
 
     # ... (rest of class) ...
 
+    @contextmanager
+    def _leads_db(self):
+        """
+        Connection to leads.db with the schema of LEADS_MIGRATIONS applied, the only place its DDL lives:
+        a worker that touches a fresh file first still gets user_version, FTS5 and the stats triggers.
+        """
+        if self.db_path != ':memory:':
+            ensure_schema(self.db_path, LEADS_MIGRATIONS)
+        with connection(self.db_path) as conn:
+            if self.db_path == ':memory:':
+                apply_migrations(conn, LEADS_MIGRATIONS)  # every in-memory connection is a new database
+            yield conn
+
     def save_to_db(self):
         """
         Saves the results to a SQLite database 'data/leads.db'.
@@ -469,47 +625,61 @@ class GoogleMapsScraper:
         if not self.results:
             return
 
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        # Create table if not exists with PRIMARY KEY constraint
-        # Added stars (real), reviews (int), and map_url (text)
-        c.execute('''CREATE TABLE IF NOT EXISTS leads 
-                     (name text, phone text, address text, website text, zone text, email text, source text, stars real, reviews integer, map_url text,
-                     PRIMARY KEY (name, zone))''')
+        with self._leads_db() as conn:
+            c = conn.cursor()
         
-        # Get all keys from the first result to determine columns (or use fixed list)
-        columns = ['name', 'phone', 'address', 'website', 'zone', 'email', 'source', 'stars', 'reviews', 'map_url']
+            # segment lets the API filter by Micro/Corporate in SQL
+            columns = ['name', 'phone', 'address', 'website', 'zone', 'email', 'source', 'stars', 'reviews', 'map_url',
+                       'segment']
         
-        column_names = ", ".join(columns)
-        placeholders = ", ".join(["?"] * len(columns))
+            column_names = ", ".join(columns)
+            placeholders = ", ".join(["?"] * len(columns))
         
-        # Use INSERT OR IGNORE to skip duplicates automatically
-        insert_sql = f"INSERT OR IGNORE INTO leads ({column_names}) VALUES ({placeholders})"
+            # Use INSERT OR IGNORE to skip duplicates automatically
+            insert_sql = f"INSERT OR IGNORE INTO leads ({column_names}) VALUES ({placeholders})"
 
 
-        new_count = 0
-        for item in self.results:
-            # Skip if loaded from cache (double check, though DB handles it now too)
-            if item.get('_from_cache'):
-                continue
+            new_count = 0
+            for item in self.results:
+                # Skip if loaded from cache (double check, though DB handles it now too)
+                if item.get('_from_cache'):
+                    continue
                 
-            values = []
-            for col in columns:
-                if col == 'stars':
-                    val = item.get(col, 0.0)
-                elif col == 'reviews':
-                    val = item.get(col, 0)
-                else:
-                    val = item.get(col, "N/A")
-                values.append(val)
+                values = []
+                for col in columns:
+                    if col == 'stars':
+                        val = item.get(col, 0.0)
+                    elif col == 'reviews':
+                        val = item.get(col, 0)
+                    elif col == 'segment':
+                        val = self._safe_segment(item)
+                    else:
+                        val = item.get(col, "N/A")
+                    values.append(val)
             
-            c.execute(insert_sql, values)
-            if c.rowcount > 0: # Check if a row was actually inserted
-                new_count += 1
+                c.execute(insert_sql, values)
+                if c.rowcount > 0: # Check if a row was actually inserted
+                    new_count += 1
+
+            # Link every result (new, cached or reused) to the job so /api/leads/{job_id} is an exact join
+            if self.job_id is not None:
+                c.executemany(
+                    "INSERT OR IGNORE INTO job_leads (job_id, lead_name, lead_zone, owner_id) VALUES (?, ?, ?, ?)",
+                    [(self.job_id, item['name'], item['zone'], self.owner_id or "")
+                     for item in self.results if item.get('name') and item.get('zone')]
+                )
+
+            # Record completed runs so later jobs for the same pair can reuse them
+            for query_key, search_query in self.completed_queries:
+                lead_count = sum(1 for item in self.results if item.get('zone') == search_query)
+                if lead_count == 0:
+                    continue
+                c.execute('''INSERT INTO scrape_runs (query_key, zone, lead_count, scraped_at)
+                             VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                             ON CONFLICT(query_key) DO UPDATE SET
+                                zone=excluded.zone, lead_count=excluded.lead_count, scraped_at=excluded.scraped_at''',
+                          (query_key, search_query, lead_count))
 
-        conn.commit()
-        conn.close()
         logger.info(f"Data saved to database ({self.db_path}) - {new_count} new rows added (duplicates ignored).")
 
     def save_data(self):
@@ -526,6 +696,8 @@ class GoogleMapsScraper:
             logger.info("No data collected to save.")
             return
 
+        self._report_progress(JobStage.SAVING)
+
         df = pd.DataFrame(self.results)
         
         # 1. DATA CLEANING & NORMALIZATION (Global)
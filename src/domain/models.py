@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from enum import Enum
 from datetime import datetime
@@ -8,6 +8,28 @@ class JobStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class JobStage(str, Enum):
+    """Etapa fina dentro de un Job en 'processing', reportada por el scraper."""
+    QUEUED = "queued"
+    STARTING = "starting"
+    SEARCHING = "searching"
+    SCROLLING = "scrolling"
+    EXTRACTING = "extracting"
+    REUSED = "reused"
+    SAVING = "saving"
+    DONE = "done"
+    CANCELLED = "cancelled"
+
+class JobPriority(int, Enum):
+    """
+    Prioridad de un Job en la cola. Mayor valor = se atiende antes.
+    Las búsquedas interactivas (Bot) se adelantan a los lotes masivos del Dashboard.
+    """
+    BULK = 0
+    NORMAL = 5
+    INTERACTIVE = 10
 
 class MasterCountry(BaseModel):
     id: Optional[int] = None
@@ -48,6 +70,38 @@ class MasterCategory(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class JobProgress(BaseModel):
+    """Contadores en vivo de un Job (tabla job_progress)."""
+    job_id: Optional[int] = None
+    stage: JobStage = JobStage.QUEUED
+    discovered: int = 0
+    processed: int = 0
+    cached: int = 0
+    skipped: int = 0
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class Batch(BaseModel):
+    """Lote de Jobs creado desde el Dashboard, con contadores agregados por triggers (tabla batches)."""
+    id: int
+    owner_id: str
+    scope: str
+    category_id: Optional[int] = None
+    state_id: Optional[int] = None
+    city_id: Optional[int] = None
+    force_refresh: bool = False
+    total_jobs: int = 0
+    pending: int = 0
+    processing: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    leads_found: int = 0
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 class BatchJob(BaseModel):
     id: Optional[int] = None
     category_id: Optional[int] = None
@@ -56,7 +110,29 @@ class BatchJob(BaseModel):
     zona_text: Optional[str] = None
     owner_id: str
     status: JobStatus = JobStatus.PENDING
+    priority: int = JobPriority.NORMAL
+    force_refresh: bool = False
+    batch_id: Optional[int] = None
+    trace_id: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+class TenantQuota(BaseModel):
+    """Cuotas de creación de Jobs de un tenant (tabla tenant_quotas). None = usar el default de config; 0 = sin límite."""
+    jobs_per_hour: Optional[int] = Field(default=None, ge=0)
+    max_pending: Optional[int] = Field(default=None, ge=0)
+    max_processing: Optional[int] = Field(default=None, ge=0)
+
+class QuotaExceeded(Exception):
+    """
+    El tenant superó una cuota al encolar Jobs (la transacción se revierte: no queda nada a medias).
+    quota: "jobs_per_hour" o "max_pending". retry_after: segundos sugeridos antes de reintentar
+    (None si no hay una estimación).
+    """
+    def __init__(self, quota: str, limit: int, retry_after: Optional[float] = None):
+        super().__init__(f"Job quota exceeded: {quota} (limit {limit})")
+        self.quota = quota
+        self.limit = limit
+        self.retry_after = retry_after
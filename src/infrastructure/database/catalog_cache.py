@@ -0,0 +1,186 @@
+"""
+Caché en memoria (read-through) del catálogo maestro: países, estados, ciudades y categorías.
+
+- El catálogo casi no cambia y se lee en cada request del LocationCascader y en cada tool call
+  del Agente que resuelve un nombre. Se carga completo una vez por proceso y se sirve desde memoria.
+- Búsqueda por nombre sin distinguir mayúsculas ni acentos ("nuevo leon" == "Nuevo León")
+  mediante un diccionario indexado por el nombre normalizado.
+- Invalidación:
+  * Las escrituras de StorageService llaman a invalidate(): la siguiente lectura revalida.
+  * Otros procesos (Bot, Worker, API) se enteran vía catalog_version, que los triggers de la
+    migración 0007 incrementan en cualquier escritura. Se consulta como máximo cada
+    CATALOG_CACHE_TTL_SECONDS (una lectura por PK); solo se recarga si la versión cambió.
+- La versión también es el ETag de los endpoints del catálogo.
+"""
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Dict, List, Optional
+
+import sqlite3
+
+from src.core.config import CATALOG_CACHE_TTL_SECONDS
+
+
+def normalize_name(name: str) -> str:
+    """Llave de búsqueda: sin acentos, casefold y espacios colapsados."""
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+def _name_id(row: dict):
+    return (row["name"], row["id"])
+
+
+def _page(rows: List[dict], limit: Optional[int], offset: int, after: Optional[tuple]) -> List[dict]:
+    """Misma semántica que LIMIT/OFFSET y el keyset (name, id) > after de StorageService."""
+    start = bisect_right(rows, tuple(after), key=_name_id) if after is not None else offset
+    end = None if limit is None else start + limit
+    # Copias: quien llama puede modificar los dicts sin corromper el caché
+    return [dict(row) for row in rows[start:end]]
+
+
+def _lookup(index: Dict[str, List[dict]], name: str) -> Optional[dict]:
+    candidates = index.get(normalize_name(name))
+    if not candidates:
+        return None
+    # Igual que `name COLLATE NOCASE = ?`: gana la coincidencia exacta (sin contar mayúsculas), luego el id menor
+    lowered = (name or "").lower()
+    for row in candidates:
+        if row["name"].lower() == lowered:
+            return dict(row)
+    return dict(candidates[0])
+
+
+def _index_by_name(rows: List[dict]) -> Dict[str, List[dict]]:
+    index: Dict[str, List[dict]] = {}
+    for row in rows:
+        index.setdefault(normalize_name(row["name"]), []).append(row)
+    return index
+
+
+@dataclass
+class CatalogSnapshot:
+    version: int
+    countries: List[dict]
+    states_by_country: Dict[int, List[dict]]
+    cities: List[dict]
+    cities_by_state: Dict[int, List[dict]]
+    categories: List[dict]
+    city_names: Dict[str, List[dict]] = field(repr=False)
+    category_names: Dict[str, List[dict]] = field(repr=False)
+
+    def get_countries(self) -> List[dict]:
+        return [dict(row) for row in self.countries]
+
+    def get_states(self, country_id: int) -> List[dict]:
+        return [dict(row) for row in self.states_by_country.get(country_id, [])]
+
+    def get_cities(self, limit: Optional[int] = None, offset: int = 0, state_id: Optional[int] = None,
+                   after: Optional[tuple] = None) -> List[dict]:
+        rows = self.cities if state_id is None else self.cities_by_state.get(state_id, [])
+        return _page(rows, limit, offset, after)
+
+    def get_categories(self, limit: Optional[int] = None, offset: int = 0, after: Optional[tuple] = None) -> List[dict]:
+        return _page(self.categories, limit, offset, after)
+
+    def find_city(self, name: str) -> Optional[dict]:
+        return _lookup(self.city_names, name)
+
+    def find_category(self, name: str) -> Optional[dict]:
+        return _lookup(self.category_names, name)
+
+
+def read_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def load_snapshot(conn: sqlite3.Connection) -> CatalogSnapshot:
+    """
+    Lee el catálogo completo. La versión se lee ANTES que las filas: si otra escritura se cuela en
+    medio, el snapshot queda con una versión vieja y la siguiente revalidación lo recarga (nunca al revés).
+    """
+    conn.row_factory = sqlite3.Row
+
+    def rows(sql: str) -> List[dict]:
+        return [dict(row) for row in conn.execute(sql).fetchall()]
+
+    version = read_version(conn)
+    countries = rows("SELECT * FROM master_countries WHERE status = 1 ORDER BY name, id")
+    states_by_country: Dict[int, List[dict]] = {}
+    for state in rows("SELECT * FROM master_states WHERE status = 1 ORDER BY name, id"):
+        states_by_country.setdefault(state["country_id"], []).append(state)
+
+    # Mismas columnas que get_master_cities()
+    cities = rows('''
+        SELECT mc.id, mc.name, mc.state_id, mc.status, mc.created_at,
+               s.name  AS state_name,
+               co.name AS country_name
+        FROM master_cities mc
+        LEFT JOIN master_states    s  ON mc.state_id  = s.id
+        LEFT JOIN master_countries co ON s.country_id = co.id
+        WHERE mc.status = 1
+        ORDER BY mc.name, mc.id
+    ''')
+    cities_by_state: Dict[int, List[dict]] = {}
+    for city in cities:
+        cities_by_state.setdefault(city["state_id"], []).append(city)
+
+    # Las búsquedas por nombre no filtran por status (igual que las consultas que reemplazan)
+    all_cities = rows("SELECT * FROM master_cities ORDER BY id")
+    all_categories = rows("SELECT * FROM master_categories ORDER BY id")
+    categories = sorted((c for c in all_categories if c["status"] == 1), key=_name_id)
+
+    return CatalogSnapshot(
+        version=version,
+        countries=countries,
+        states_by_country=states_by_country,
+        cities=cities,
+        cities_by_state=cities_by_state,
+        categories=categories,
+        city_names=_index_by_name(all_cities),
+        category_names=_index_by_name(all_categories),
+    )
+
+
+class CatalogCache:
+    """Un snapshot por archivo de BD. Seguro entre hilos (la API consulta desde el pool de run_db)."""
+
+    def __init__(self, ttl_seconds: float = CATALOG_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[str, tuple] = {}  # path -> (snapshot, checked_at)
+
+    def get(self, path: str, open_db: Callable[[], ContextManager[sqlite3.Connection]]) -> CatalogSnapshot:
+        key = os.path.abspath(path)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+            return entry[0]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                return entry[0]
+            with open_db() as conn:
+                snapshot = entry[0] if entry is not None else None
+                if snapshot is None or read_version(conn) != snapshot.version:
+                    snapshot = load_snapshot(conn)
+            self._entries[key] = (snapshot, time.monotonic())
+            return snapshot
+
+    def invalidate(self, path: Optional[str] = None):
+        """Fuerza la revalidación en la siguiente lectura (de `path` o de todos)."""
+        with self._lock:
+            keys = list(self._entries) if path is None else [os.path.abspath(path)]
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries[key] = (entry[0], float("-inf"))
+
+
+catalog_cache = CatalogCache()
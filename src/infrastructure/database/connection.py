@@ -0,0 +1,157 @@
+"""
+Gestor de conexiones SQLite compartido por StorageService y el scraper (bastion_bot.db y leads.db).
+
+- Una conexión por hilo y por archivo, reutilizada entre llamadas (sqlite3 no permite
+  compartir una conexión entre hilos sin check_same_thread=False).
+- Cada conexión nueva se ajusta una sola vez: WAL (lectores no bloquean al escritor),
+  busy_timeout (espera en vez de "database is locked"), synchronous=NORMAL, cache y mmap.
+- ':memory:' nunca se reutiliza: cada conexión es una BD distinta, igual que sqlite3.connect().
+"""
+import os
+import sqlite3
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from src.core.config import SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE_MB
+from src.core.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Espera por el lock de escritura (BEGIN IMMEDIATE) y veces que se agotó busy_timeout
+LOCK_WAIT = Histogram("sqlite_lock_wait_seconds", "Time waiting for the SQLite write lock (BEGIN IMMEDIATE)", ["db"],
+                      buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+LOCK_TIMEOUTS = Counter("sqlite_lock_timeouts_total", "Transactions that gave up after busy_timeout", ["db"])
+
+_local = threading.local()
+
+
+def _is_memory(path: str) -> bool:
+    return path == ":memory:" or path.startswith("file::memory:")
+
+
+def _configure(conn: sqlite3.Connection, path: str):
+    """Pragmas por conexión. journal_mode=WAL queda persistido en el archivo."""
+    conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    if not _is_memory(path):
+        mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        if mode.lower() != "wal":
+            logger.warning(f"⚠️ [DB] No se pudo activar WAL en {path} (modo actual: {mode})")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+
+def _open(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+    _configure(conn, path)
+    return conn
+
+
+def _thread_pool() -> Dict[str, sqlite3.Connection]:
+    # Tras un fork (ej. uvicorn con workers) las conexiones heredadas no se deben reutilizar
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.pool = {}
+    return _local.pool
+
+
+def get_connection(path: str) -> sqlite3.Connection:
+    """Conexión del hilo actual para `path`. No se debe cerrar: la reutiliza la siguiente llamada."""
+    if _is_memory(path):
+        return _open(path)
+    pool = _thread_pool()
+    key = os.path.abspath(path)
+    conn = pool.get(key)
+    if conn is None:
+        conn = _open(path)
+        pool[key] = conn
+    return conn
+
+
+@contextmanager
+def connection(path: str, conn_override: Optional[sqlite3.Connection] = None) -> Iterator[sqlite3.Connection]:
+    """
+    Reemplazo de `with sqlite3.connect(path) as conn:` sobre la conexión del hilo.
+    Hace commit al salir (rollback si hay excepción) y restaura el row_factory,
+    para que un método que usa sqlite3.Row no afecte al siguiente.
+    Si el hilo ya tiene una transacción abierta (transaction()), se une a ella sin commit ni rollback:
+    la conexión es compartida y cerrarla aquí soltaría el lock a mitad del bloque externo.
+    Con conn_override (tests) se usa esa conexión tal cual.
+    """
+    if conn_override is not None:
+        yield conn_override
+        return
+    conn = get_connection(path)
+    saved_row_factory = conn.row_factory
+    try:
+        if conn.in_transaction:
+            yield conn
+        else:
+            with conn:
+                yield conn
+    finally:
+        conn.row_factory = saved_row_factory
+
+
+@contextmanager
+def transaction(path: str, conn_override: Optional[sqlite3.Connection] = None,
+                immediate: bool = True) -> Iterator[sqlite3.Connection]:
+    """
+    Transacción explícita para operaciones de lectura-y-escritura (ej. reclamar un Job).
+    BEGIN IMMEDIATE toma el lock de escritura al inicio: en WAL evita el SQLITE_BUSY que
+    aparece al promover una lectura a escritura, caso en el que busy_timeout no ayuda.
+    Si ya hay una transacción abierta en la conexión, se une a ella.
+    """
+    conn = conn_override if conn_override is not None else get_connection(path)
+    if conn.in_transaction:
+        yield conn
+        return
+    saved_row_factory = conn.row_factory
+    db = os.path.basename(path)
+    started = time.perf_counter()
+    try:
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    except sqlite3.OperationalError as e:
+        if "locked" in str(e):
+            LOCK_TIMEOUTS.inc(db=db)
+        raise
+    LOCK_WAIT.observe(time.perf_counter() - started, db=db)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.row_factory = saved_row_factory
+
+
+def close_all():
+    """Cierra las conexiones del hilo actual (apagado ordenado y tests con BDs temporales)."""
+    pool = _thread_pool()
+    for conn in pool.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    pool.clear()
+
+
+@contextmanager
+def read_only_connection(path: str) -> Iterator[sqlite3.Connection]:
+    """
+    Conexión de solo lectura dedicada (fuera del pool) para lecturas largas por chunks, ej. exportaciones.
+    Starlette itera los generadores síncronos en hilos distintos del threadpool, así que la conexión
+    se abre con check_same_thread=False y la cierra quien la abrió al terminar o si el cliente se desconecta.
+    """
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True,
+                           timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,48 @@
+"""
+Fachada async para StorageService desde los routers de FastAPI.
+
+Las consultas sqlite3 son bloqueantes: ejecutadas dentro de un `async def` congelan el event
+loop de uvicorn y serializan requests no relacionados. run_db() las despacha a un pool de
+hilos propio y acotado (DB_THREAD_POOL_SIZE); cada hilo reutiliza su conexión del pool
+de connection.py.
+
+    jobs = await run_db(StorageService.get_jobs, owner_id=owner_id, limit=limit, offset=offset)
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from src.core.config import DB_THREAD_POOL_SIZE
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DB_THREAD_POOL_SIZE, thread_name_prefix="sqlite")
+    return _executor
+
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Ejecuta una función de storage síncrona en el pool de BD sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    # Igual que asyncio.to_thread: las contextvars del request viajan al hilo
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+def shutdown_db_executor():
+    """Apagado ordenado del pool (lifespan de la API)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,81 @@
+"""
+Tareas de mantenimiento de las bases SQLite.
+
+USO:
+    python -m src.infrastructure.database.manage migrate   # aplica migraciones pendientes
+    python -m src.infrastructure.database.manage status    # muestra la versión de cada base
+    python -m src.infrastructure.database.manage rebuild-stats  # recalcula los contadores del Dashboard
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import Optional
+
+from src.infrastructure.database import storage_service
+from src.infrastructure.database.connection import read_only_connection
+from src.infrastructure.database.migrations import MAIN_MIGRATIONS, LEADS_MIGRATIONS, ensure_schema
+
+
+def _targets():
+    # Se leen en tiempo de ejecución para respetar rutas parcheadas (tests) o configuradas
+    return [
+        ("bastion_bot", storage_service.DB_PATH, MAIN_MIGRATIONS),
+        ("leads", storage_service.LEADS_DB_PATH, LEADS_MIGRATIONS),
+    ]
+
+
+def migrate() -> int:
+    for label, path, migrations in _targets():
+        applied = ensure_schema(path, migrations)
+        if applied:
+            print(f"✅ {label} ({path}): aplicadas {applied}")
+        else:
+            print(f"✅ {label} ({path}): al día (v{migrations[-1].version})")
+    return 0
+
+
+def _read_version(path: str) -> Optional[int]:
+    """Versión aplicada sin escribir nada (ni crear el archivo ni schema_version). None = sin inicializar."""
+    if not os.path.exists(path):
+        return None
+    with read_only_connection(path) as conn:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+        ).fetchone()
+        if not exists:
+            return None
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def status() -> int:
+    for label, path, migrations in _targets():
+        version = _read_version(path)
+        latest = migrations[-1].version
+        if version is None:
+            print(f"{label} ({path}): sin inicializar / v{latest} - correr `migrate`")
+            continue
+        flag = "al día" if version >= latest else f"pendientes {latest - version}"
+        print(f"{label} ({path}): v{version} / v{latest} - {flag}")
+    return 0
+
+
+def rebuild_stats() -> int:
+    storage_service.StorageService.rebuild_stats()
+    print("✅ Estadísticas recalculadas")
+    return 0
+
+
+COMMANDS = {"migrate": migrate, "status": status, "rebuild-stats": rebuild_stats}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mantenimiento de las bases SQLite de Bastion Core")
+    parser.add_argument("command", choices=list(COMMANDS))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    return COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,768 @@
+"""
+Migraciones versionadas del esquema SQLite.
+
+Cada base (bastion_bot.db y leads.db) guarda en `schema_version` las migraciones ya aplicadas.
+Las pendientes corren una sola vez, en orden y cada una en su propia transacción (BEGIN IMMEDIATE):
+si API, worker y bot arrancan a la vez, el primero migra y los demás solo leen la versión.
+
+Puntos de entrada:
+- `python -m src.infrastructure.database.manage migrate` (explícito, ej. en start_dev.sh).
+- `ensure_schema(path, MIGRATIONS)` en el primer uso de cada archivo dentro del proceso.
+
+Reglas para agregar una migración: versión nueva al final de la lista, nunca editar
+una ya publicada, y DDL idempotente (IF NOT EXISTS / _add_column_if_missing) porque
+existen bases creadas antes de este versionado.
+"""
+import os
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, List
+
+from src.infrastructure.database.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def _add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, decl: str):
+    """ALTER TABLE ADD COLUMN solo si la columna no existe (sin tragarse excepciones)."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+# ---------------------------------------------------------------------------
+# bastion_bot.db
+# ---------------------------------------------------------------------------
+
+def _main_0001_baseline(conn):
+    """Esquema normalizado Country→State→City, catálogo, alertas, sesiones y cola de Jobs."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS master_countries (
+            id   INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS master_states (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            name       TEXT    NOT NULL,
+            country_id INTEGER NOT NULL,
+            FOREIGN KEY (country_id) REFERENCES master_countries(id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scheduled_alerts (
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id         TEXT    NOT NULL,
+            cron_expression TEXT    NOT NULL,
+            prompt_task     TEXT    NOT NULL,
+            is_active       BOOLEAN NOT NULL DEFAULT 1
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS master_cities (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            name       TEXT    NOT NULL,
+            state_id   INTEGER,
+            status     INTEGER NOT NULL DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (state_id) REFERENCES master_states(id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bot_sessions (
+            chat_id     TEXT PRIMARY KEY,
+            session_id  TEXT NOT NULL,
+            created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS worker_config (
+            key   TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS master_categories (
+            id     INTEGER PRIMARY KEY AUTOINCREMENT,
+            name   TEXT    NOT NULL,
+            status INTEGER NOT NULL DEFAULT 1
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS batch_jobs (
+            id             INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id    INTEGER,
+            city_id        INTEGER,
+            zona_text      TEXT,
+            categoria_text TEXT,
+            owner_id       TEXT NOT NULL,
+            status         TEXT NOT NULL DEFAULT 'pending',
+            created_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (city_id)     REFERENCES master_cities(id),
+            FOREIGN KEY (category_id) REFERENCES master_categories(id)
+        )
+    ''')
+    # Bases anteriores al Dual-path y al borrado lógico
+    _add_column_if_missing(conn, "batch_jobs", "zona_text", "TEXT")
+    _add_column_if_missing(conn, "batch_jobs", "categoria_text", "TEXT")
+    for table in ("master_countries", "master_states"):
+        _add_column_if_missing(conn, table, "status", "INTEGER NOT NULL DEFAULT 1")
+    # Tablas legacy reemplazadas por el esquema normalizado
+    conn.execute("DROP TABLE IF EXISTS tenant_categories")
+    conn.execute("DROP TABLE IF EXISTS countries")
+    conn.execute("DROP TABLE IF EXISTS states")
+
+
+def _main_0002_fair_share_queue(conn):
+    """Prioridad, force_refresh y reparto justo entre tenants (ver get_pending_job)."""
+    _add_column_if_missing(conn, "batch_jobs", "priority", "INTEGER NOT NULL DEFAULT 5")
+    _add_column_if_missing(conn, "batch_jobs", "force_refresh", "BOOLEAN NOT NULL DEFAULT 0")
+    # Un registro por tenant con la secuencia de su último turno en la cola.
+    # get_pending_job() recorre estos tenants (pocos) y toma la cabeza de cada uno vía índice.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_queue_owners (
+            owner_id       TEXT PRIMARY KEY,
+            last_claim_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_queue_owner
+        AFTER INSERT ON batch_jobs
+        BEGIN
+            INSERT OR IGNORE INTO job_queue_owners (owner_id) VALUES (NEW.owner_id);
+        END
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO job_queue_owners (owner_id)
+        SELECT DISTINCT owner_id FROM batch_jobs WHERE status = 'pending'
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_batch_jobs_pending_queue
+        ON batch_jobs (owner_id, priority DESC, created_at, id)
+        WHERE status = 'pending'
+    ''')
+
+
+def _main_0003_job_progress(conn):
+    """Contadores en vivo por Job (JobProgressReporter)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_progress (
+            job_id     INTEGER PRIMARY KEY,
+            stage      TEXT    NOT NULL DEFAULT 'queued',
+            discovered INTEGER NOT NULL DEFAULT 0,
+            processed  INTEGER NOT NULL DEFAULT 0,
+            cached     INTEGER NOT NULL DEFAULT 0,
+            skipped    INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (job_id) REFERENCES batch_jobs(id)
+        )
+    ''')
+
+
+def _main_0004_catalog_and_jobs_indexes(conn):
+    """Listado de Jobs por tenant y navegación del catálogo Country→State→City."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_jobs_owner_created ON batch_jobs (owner_id, created_at DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_master_states_country ON master_states (country_id, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_master_cities_state ON master_cities (state_id, status)")
+
+
+def _main_0005_case_insensitive_name_indexes(conn):
+    """get_city_by_name / get_category_by_name comparan `name COLLATE NOCASE`: el índice debe usar la misma colación."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_master_cities_name_nocase ON master_cities (name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_master_categories_name_nocase ON master_categories (name COLLATE NOCASE)")
+
+
+def _main_0006_keyset_pagination_indexes(conn):
+    """
+    Paginación keyset: cada listado se ordena por una llave única y el índice cubre filtro + orden,
+    así cualquier página cuesta lo mismo. Reemplaza índices de 0004 que quedan como prefijo redundante.
+    """
+    conn.execute("DROP INDEX IF EXISTS idx_batch_jobs_owner_created")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_jobs_owner_keyset ON batch_jobs (owner_id, created_at DESC, id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_jobs_owner_status_keyset ON batch_jobs (owner_id, status, created_at DESC, id DESC)")
+    conn.execute("DROP INDEX IF EXISTS idx_master_cities_state")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_master_cities_status_keyset ON master_cities (status, name, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_master_cities_state_keyset ON master_cities (state_id, status, name, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_master_categories_status_keyset ON master_categories (status, name, id)")
+
+
+CATALOG_TABLES = ("master_countries", "master_states", "master_cities", "master_categories")
+
+
+def _main_0007_catalog_version(conn):
+    """
+    Versión global del catálogo maestro, incrementada por triggers en cualquier escritura.
+    El caché en memoria (catalog_cache.py) la usa para revalidar entre procesos y la API como ETag.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id      INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+    for table in CATALOG_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+
+
+def _main_0008_batches(conn):
+    """Lotes creados desde POST /api/jobs/batch: cada Job expandido guarda el batch_id de su lote."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS batches (
+            id            INTEGER PRIMARY KEY AUTOINCREMENT,
+            owner_id      TEXT    NOT NULL,
+            scope         TEXT    NOT NULL,
+            category_id   INTEGER,
+            state_id      INTEGER,
+            city_id       INTEGER,
+            force_refresh BOOLEAN NOT NULL DEFAULT 0,
+            total_jobs    INTEGER NOT NULL DEFAULT 0,
+            created_at    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (category_id) REFERENCES master_categories(id),
+            FOREIGN KEY (state_id)    REFERENCES master_states(id),
+            FOREIGN KEY (city_id)     REFERENCES master_cities(id)
+        )
+    ''')
+    _add_column_if_missing(conn, "batch_jobs", "batch_id", "INTEGER REFERENCES batches(id)")
+
+
+BATCH_STATUS_COLUMNS = ("pending", "processing", "completed", "failed", "cancelled")
+
+
+def _main_0009_batch_rollups(conn):
+    """
+    Contadores por lote mantenidos por triggers en cada cambio de status/leads_found de sus Jobs:
+    leer el avance de un lote es una fila, sin contar sus Jobs.
+    """
+    for column in BATCH_STATUS_COLUMNS + ("leads_found",):
+        _add_column_if_missing(conn, "batches", column, "INTEGER NOT NULL DEFAULT 0")
+    _add_column_if_missing(conn, "batch_jobs", "leads_found", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_jobs_batch ON batch_jobs (batch_id, status) WHERE batch_id IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_batches_owner_keyset ON batches (owner_id, created_at DESC, id DESC)")
+
+    # Backfill de lotes creados antes de los triggers
+    counts = ", ".join(
+        f"{column} = (SELECT COUNT(*) FROM batch_jobs j WHERE j.batch_id = batches.id AND j.status = '{column}')"
+        for column in BATCH_STATUS_COLUMNS
+    )
+    conn.execute(f"UPDATE batches SET {counts}")
+
+    def deltas(row: str, sign: str) -> str:
+        return ", ".join(f"{column} = {column} {sign} ({row}.status = '{column}')" for column in BATCH_STATUS_COLUMNS)
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_rollup_insert
+        AFTER INSERT ON batch_jobs WHEN NEW.batch_id IS NOT NULL
+        BEGIN
+            UPDATE batches SET {deltas("NEW", "+")}, leads_found = leads_found + NEW.leads_found
+            WHERE id = NEW.batch_id;
+        END
+    ''')
+    transitions = ", ".join(
+        f"{column} = {column} - (OLD.status = '{column}') + (NEW.status = '{column}')" for column in BATCH_STATUS_COLUMNS
+    )
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_rollup_status
+        AFTER UPDATE OF status ON batch_jobs WHEN NEW.batch_id IS NOT NULL AND OLD.status != NEW.status
+        BEGIN
+            UPDATE batches SET {transitions} WHERE id = NEW.batch_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_rollup_leads
+        AFTER UPDATE OF leads_found ON batch_jobs WHEN NEW.batch_id IS NOT NULL AND OLD.leads_found != NEW.leads_found
+        BEGIN
+            UPDATE batches SET leads_found = leads_found + NEW.leads_found - OLD.leads_found WHERE id = NEW.batch_id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_rollup_delete
+        AFTER DELETE ON batch_jobs WHEN OLD.batch_id IS NOT NULL
+        BEGIN
+            UPDATE batches SET {deltas("OLD", "-")}, leads_found = leads_found - OLD.leads_found
+            WHERE id = OLD.batch_id;
+        END
+    ''')
+
+
+def _main_0010_job_events(conn):
+    """
+    Log durable de eventos de Jobs (cambios de status y de progreso) escrito por triggers: cubre las
+    escrituras del Worker, del Bot y de la API sin tocar su código. Cada proceso de la API lo lee
+    por rango de PK (id > último visto) y lo reparte a sus suscriptores SSE; se purga por antigüedad.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_events (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id     INTEGER NOT NULL,
+            owner_id   TEXT    NOT NULL,
+            type       TEXT    NOT NULL,
+            payload    TEXT    NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_event_status
+        AFTER UPDATE OF status ON batch_jobs WHEN OLD.status != NEW.status
+        BEGIN
+            INSERT INTO job_events (job_id, owner_id, type, payload)
+            VALUES (NEW.id, NEW.owner_id, 'status',
+                    json_object('status', NEW.status, 'batch_id', NEW.batch_id, 'leads_found', NEW.leads_found));
+        END
+    ''')
+    # El Worker persiste el progreso a ritmo acotado (JobProgressReporter): un evento por escritura
+    progress = '''
+        INSERT INTO job_events (job_id, owner_id, type, payload)
+        SELECT NEW.job_id, j.owner_id, 'progress',
+               json_object('stage', NEW.stage, 'discovered', NEW.discovered, 'processed', NEW.processed,
+                           'cached', NEW.cached, 'skipped', NEW.skipped)
+        FROM batch_jobs j WHERE j.id = NEW.job_id;
+    '''
+    for event in ("INSERT", "UPDATE"):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_job_progress_event_{event.lower()}
+            AFTER {event} ON job_progress
+            BEGIN
+                {progress}
+            END
+        ''')
+
+
+# ---------------------------------------------------------------------------
+# Estadísticas del Dashboard (ambas bases): contadores mantenidos por triggers
+# ---------------------------------------------------------------------------
+
+# Scope de los contadores globales; el resto de scopes son owner_id
+GLOBAL_STATS_SCOPE = "*"
+
+
+def _create_stats_counters(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            scope  TEXT    NOT NULL,
+            metric TEXT    NOT NULL,
+            key    TEXT    NOT NULL,
+            value  INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, metric, key)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _stats_delta(scopes, metric: str, key: str, delta: str, source: str = "") -> str:
+    """Sentencias de trigger que suman `delta` al contador (scope, metric, key) de cada scope."""
+    statements = []
+    for scope in scopes:
+        if source:
+            # INSERT … SELECT con upsert: el WHERE de `source` evita la ambigüedad de ON CONFLICT
+            values = f"SELECT {scope}, '{metric}', {key}, {delta} {source}"
+        else:
+            values = f"VALUES ({scope}, '{metric}', {key}, {delta})"
+        statements.append(f'''
+            INSERT INTO stats_counters (scope, metric, key, value) {values}
+            ON CONFLICT(scope, metric, key) DO UPDATE SET value = value + excluded.value;''')
+    return "".join(statements)
+
+
+def rebuild_main_stats(conn: sqlite3.Connection):
+    """Recalcula desde cero los contadores de bastion_bot.db (migración y `manage rebuild-stats`)."""
+    conn.execute("DELETE FROM stats_counters")
+    city = "COALESCE(m.name, j.zona_text, 'Unknown')"
+    for scope, group in (("j.owner_id", "j.owner_id, "), (f"'{GLOBAL_STATS_SCOPE}'", "")):
+        conn.execute(f'''
+            INSERT INTO stats_counters (scope, metric, key, value)
+            SELECT {scope}, 'jobs_by_status', j.status, COUNT(*) FROM batch_jobs j GROUP BY {group}j.status
+        ''')
+        conn.execute(f'''
+            INSERT INTO stats_counters (scope, metric, key, value)
+            SELECT {scope}, 'leads_by_city', {city}, SUM(j.leads_found)
+            FROM batch_jobs j LEFT JOIN master_cities m ON m.id = j.city_id
+            WHERE j.leads_found > 0
+            GROUP BY {group}{city}
+        ''')
+
+
+def _main_0011_stats_counters(conn):
+    """
+    Contadores del Dashboard por tenant y globales (scope '*'): Jobs por status y leads encontrados por ciudad.
+    Los triggers los ajustan en cada alta/cambio de status/leads_found de un Job: leerlos no recorre batch_jobs.
+    """
+    _create_stats_counters(conn)
+    # Bases anteriores al catálogo relacional (leads_by_city la resuelve vía master_cities)
+    _add_column_if_missing(conn, "batch_jobs", "city_id", "INTEGER REFERENCES master_cities(id)")
+    scopes = ("{row}.owner_id", f"'{GLOBAL_STATS_SCOPE}'")
+
+    def delta(row: str, metric: str, key: str, value: str) -> str:
+        return _stats_delta([scope.format(row=row) for scope in scopes], metric, key, value)
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_stats_insert AFTER INSERT ON batch_jobs
+        BEGIN {delta("NEW", "jobs_by_status", "NEW.status", "1")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_stats_status
+        AFTER UPDATE OF status ON batch_jobs WHEN OLD.status != NEW.status
+        BEGIN {delta("OLD", "jobs_by_status", "OLD.status", "-1")}{delta("NEW", "jobs_by_status", "NEW.status", "1")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_stats_delete AFTER DELETE ON batch_jobs
+        BEGIN {delta("OLD", "jobs_by_status", "OLD.status", "-1")}
+        END
+    ''')
+    city = "COALESCE((SELECT name FROM master_cities WHERE id = NEW.city_id), NEW.zona_text, 'Unknown')"
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_stats_leads
+        AFTER UPDATE OF leads_found ON batch_jobs WHEN OLD.leads_found != NEW.leads_found
+        BEGIN {delta("NEW", "leads_by_city", city, "NEW.leads_found - OLD.leads_found")}
+        END
+    ''')
+    rebuild_main_stats(conn)
+
+
+def _main_0012_job_trace_id(conn):
+    """ID de correlación de la petición que encoló el Job (ver src/core/tracing.py)."""
+    _add_column_if_missing(conn, "batch_jobs", "trace_id", "TEXT")
+
+
+def _main_0013_auth_otps(conn):
+    """
+    OTPs de login compartidos por todos los procesos de la API (uvicorn --workers N): el código se pide
+    en un proceso y se verifica en otro. Tiempos en epoch (segundos); expires_at indexado para la purga.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS auth_otps (
+            chat_id      TEXT    PRIMARY KEY,
+            code_hash    TEXT    NOT NULL,
+            attempts     INTEGER NOT NULL DEFAULT 0,
+            requested_at REAL    NOT NULL,
+            expires_at   REAL    NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_auth_otps_expires ON auth_otps (expires_at)")
+
+
+
+def _main_0014_tenant_quotas(conn):
+    """
+    Cuotas por tenant para encolar Jobs. tenant_quotas guarda solo las excepciones (NULL = default de config).
+    job_rate_buckets es el token bucket de jobs_per_hour: una fila por owner con los tokens que quedaban
+    en updated_at (epoch); el recargo se calcula al consumir, sin tareas periódicas.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tenant_quotas (
+            owner_id       TEXT    PRIMARY KEY,
+            jobs_per_hour  INTEGER,
+            max_pending    INTEGER,
+            max_processing INTEGER
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_rate_buckets (
+            owner_id   TEXT PRIMARY KEY,
+            tokens     REAL NOT NULL,
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+
+
+def _main_0015_active_queue_owners(conn):
+    """
+    job_queue_owners nunca pierde filas (una por cada tenant que alguna vez encoló). pending_count, mantenido
+    por triggers, y el índice parcial sobre pending_count > 0 hacen que get_pending_job solo recorra los
+    tenants con Jobs pendientes; el índice de last_claim_seq resuelve el MAX() del turno sin recorrer la tabla.
+    """
+    _add_column_if_missing(conn, "job_queue_owners", "pending_count", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute('''
+        UPDATE job_queue_owners SET pending_count = (
+            SELECT COUNT(*) FROM batch_jobs j WHERE j.owner_id = job_queue_owners.owner_id AND j.status = 'pending'
+        )
+    ''')
+    bump = '''
+            INSERT INTO job_queue_owners (owner_id, pending_count) VALUES ({row}.owner_id, {delta})
+            ON CONFLICT(owner_id) DO UPDATE SET pending_count = pending_count + ({delta});'''
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_queue_pending_insert
+        AFTER INSERT ON batch_jobs WHEN NEW.status = 'pending'
+        BEGIN {bump.format(row="NEW", delta="1")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_queue_pending_status
+        AFTER UPDATE OF status ON batch_jobs WHEN OLD.status != NEW.status
+            AND 'pending' IN (OLD.status, NEW.status)
+        BEGIN {bump.format(row="NEW", delta="CASE WHEN NEW.status = 'pending' THEN 1 ELSE -1 END")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_batch_jobs_queue_pending_delete
+        AFTER DELETE ON batch_jobs WHEN OLD.status = 'pending'
+        BEGIN {bump.format(row="OLD", delta="-1")}
+        END
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_job_queue_owners_active
+        ON job_queue_owners (owner_id, last_claim_seq) WHERE pending_count > 0
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_queue_owners_claim_seq ON job_queue_owners (last_claim_seq)")
+
+
+
+def _main_0016_processing_jobs_index(conn):
+    """Jobs en 'processing' por antigüedad: requeue_stale_jobs los revisa sin recorrer el histórico."""
+    # Bases anteriores a updated_at (se llena en cada claim/cambio de status)
+    _add_column_if_missing(conn, "batch_jobs", "updated_at", "TIMESTAMP")
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_batch_jobs_processing
+        ON batch_jobs (updated_at) WHERE status = 'processing'
+    ''')
+
+
+MAIN_MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", _main_0001_baseline),
+    Migration(2, "fair_share_queue", _main_0002_fair_share_queue),
+    Migration(3, "job_progress", _main_0003_job_progress),
+    Migration(4, "catalog_and_jobs_indexes", _main_0004_catalog_and_jobs_indexes),
+    Migration(5, "case_insensitive_name_indexes", _main_0005_case_insensitive_name_indexes),
+    Migration(6, "keyset_pagination_indexes", _main_0006_keyset_pagination_indexes),
+    Migration(7, "catalog_version", _main_0007_catalog_version),
+    Migration(8, "batches", _main_0008_batches),
+    Migration(9, "batch_rollups", _main_0009_batch_rollups),
+    Migration(10, "job_events", _main_0010_job_events),
+    Migration(11, "stats_counters", _main_0011_stats_counters),
+    Migration(12, "job_trace_id", _main_0012_job_trace_id),
+    Migration(13, "auth_otps", _main_0013_auth_otps),
+    Migration(14, "tenant_quotas", _main_0014_tenant_quotas),
+    Migration(15, "active_queue_owners", _main_0015_active_queue_owners),
+    Migration(16, "processing_jobs_index", _main_0016_processing_jobs_index),
+]
+
+
+# ---------------------------------------------------------------------------
+# leads.db (escrita por GoogleMapsScraper, leída por la API)
+# ---------------------------------------------------------------------------
+
+def _leads_0001_baseline(conn):
+    """Mismas tablas que crea el scraper al guardar, para que la API pueda leer antes del primer Job."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS leads
+                    (name text, phone text, address text, website text, zone text, email text, source text,
+                     stars real, reviews integer, map_url text, PRIMARY KEY (name, zone))''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS scrape_runs
+                    (query_key text PRIMARY KEY, zone text NOT NULL, lead_count integer NOT NULL DEFAULT 0,
+                     scraped_at timestamp DEFAULT CURRENT_TIMESTAMP)''')
+
+
+def _leads_0002_zone_index(conn):
+    """La PK es (name, zone): buscar solo por zona (get_leads_for_job, reuse de corridas) no la aprovecha."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_zone ON leads (zone)")
+
+
+def _leads_0003_job_leads(conn):
+    """
+    Relación exacta Job → leads, escrita por el scraper al guardar (incluye leads reutilizados del caché).
+    La PK arranca en job_id y el JOIN a leads usa su PK (name, zone): /api/leads/{job_id} no depende
+    del texto "Categoría en Ciudad" y un lead encontrado por varios Jobs aparece en cada uno.
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS job_leads
+                    (job_id integer NOT NULL, lead_name text NOT NULL, lead_zone text NOT NULL, owner_id text NOT NULL,
+                     PRIMARY KEY (job_id, lead_name, lead_zone)) WITHOUT ROWID''')
+
+
+def _leads_0004_segment_and_keyset(conn):
+    """Segmento (Micro/Corporate/Other) persistido por el scraper para filtrar en SQL, y orden (zone, name) para el keyset legacy."""
+    _add_column_if_missing(conn, "leads", "segment", "text")
+    conn.execute("DROP INDEX IF EXISTS idx_leads_zone")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_zone_name ON leads (zone, name)")
+
+
+def _leads_0005_full_text_search(conn):
+    """
+    Índice FTS5 de contenido externo sobre leads (name, address, website, zone) para /api/leads/search.
+    Los triggers lo mantienen al insertar/actualizar/borrar; el 'rebuild' indexa lo ya guardado.
+    remove_diacritics: "clinica" encuentra "Clínica". job_leads por owner acota la búsqueda al tenant.
+    """
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts USING fts5(
+            name, address, website, zone,
+            content='leads', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_leads_fts_insert AFTER INSERT ON leads BEGIN
+            INSERT INTO leads_fts (rowid, name, address, website, zone)
+            VALUES (NEW.rowid, NEW.name, NEW.address, NEW.website, NEW.zone);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_leads_fts_delete AFTER DELETE ON leads BEGIN
+            INSERT INTO leads_fts (leads_fts, rowid, name, address, website, zone)
+            VALUES ('delete', OLD.rowid, OLD.name, OLD.address, OLD.website, OLD.zone);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_leads_fts_update AFTER UPDATE OF name, address, website, zone ON leads BEGIN
+            INSERT INTO leads_fts (leads_fts, rowid, name, address, website, zone)
+            VALUES ('delete', OLD.rowid, OLD.name, OLD.address, OLD.website, OLD.zone);
+            INSERT INTO leads_fts (rowid, name, address, website, zone)
+            VALUES (NEW.rowid, NEW.name, NEW.address, NEW.website, NEW.zone);
+        END
+    ''')
+    conn.execute("INSERT INTO leads_fts (leads_fts) VALUES ('rebuild')")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_leads_owner_lead ON job_leads (owner_id, lead_name, lead_zone)")
+
+
+UNCLASSIFIED_SEGMENT = "Unclassified"
+
+
+def rebuild_leads_stats(conn: sqlite3.Connection):
+    """Recalcula desde cero los contadores de leads.db (migración y `manage rebuild-stats`)."""
+    conn.execute("DELETE FROM stats_counters")
+    segment = f"COALESCE(l.segment, '{UNCLASSIFIED_SEGMENT}')"
+    conn.execute(f'''
+        INSERT INTO stats_counters (scope, metric, key, value)
+        SELECT '{GLOBAL_STATS_SCOPE}', 'leads_by_segment', {segment}, COUNT(*) FROM leads l GROUP BY {segment}
+    ''')
+    conn.execute(f'''
+        INSERT INTO stats_counters (scope, metric, key, value)
+        SELECT jl.owner_id, 'leads_by_segment', {segment}, COUNT(*)
+        FROM (SELECT DISTINCT owner_id, lead_name, lead_zone FROM job_leads) jl
+        JOIN leads l ON l.name = jl.lead_name AND l.zone = jl.lead_zone
+        GROUP BY jl.owner_id, {segment}
+    ''')
+
+
+def _leads_0006_stats_counters(conn):
+    """
+    Leads por segmento: globales (cada lead guardado) y por tenant (leads distintos enlazados por sus Jobs
+    en job_leads; un lead reencontrado por otro Job del mismo tenant no se cuenta dos veces).
+    Un cambio posterior de segment solo mueve el contador global; `manage rebuild-stats` recalcula todo.
+    """
+    _create_stats_counters(conn)
+    global_scope = [f"'{GLOBAL_STATS_SCOPE}'"]
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_leads_stats_insert AFTER INSERT ON leads
+        BEGIN {_stats_delta(global_scope, "leads_by_segment", f"COALESCE(NEW.segment, '{UNCLASSIFIED_SEGMENT}')", "1")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_leads_stats_delete AFTER DELETE ON leads
+        BEGIN {_stats_delta(global_scope, "leads_by_segment", f"COALESCE(OLD.segment, '{UNCLASSIFIED_SEGMENT}')", "-1")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_leads_stats_segment
+        AFTER UPDATE OF segment ON leads WHEN OLD.segment IS NOT NEW.segment
+        BEGIN {_stats_delta(global_scope, "leads_by_segment", f"COALESCE(OLD.segment, '{UNCLASSIFIED_SEGMENT}')", "-1")}
+              {_stats_delta(global_scope, "leads_by_segment", f"COALESCE(NEW.segment, '{UNCLASSIFIED_SEGMENT}')", "1")}
+        END
+    ''')
+
+    # Primer/último enlace del lead para el tenant (idx_job_leads_owner_lead resuelve el EXISTS)
+    lead_segment = f"COALESCE(l.segment, '{UNCLASSIFIED_SEGMENT}')"
+    for event, row, sign, other_links in (
+        ("INSERT", "NEW", "1", "AND job_id != NEW.job_id"),
+        ("DELETE", "OLD", "-1", ""),
+    ):
+        source = f"FROM leads l WHERE l.name = {row}.lead_name AND l.zone = {row}.lead_zone"
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_job_leads_stats_{event.lower()} AFTER {event} ON job_leads
+            WHEN NOT EXISTS (
+                SELECT 1 FROM job_leads
+                WHERE owner_id = {row}.owner_id AND lead_name = {row}.lead_name AND lead_zone = {row}.lead_zone {other_links}
+            )
+            BEGIN {_stats_delta([f"{row}.owner_id"], "leads_by_segment", lead_segment, sign, source)}
+            END
+        ''')
+    rebuild_leads_stats(conn)
+
+
+LEADS_MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", _leads_0001_baseline),
+    Migration(2, "zone_index", _leads_0002_zone_index),
+    Migration(3, "job_leads", _leads_0003_job_leads),
+    Migration(4, "segment_and_keyset", _leads_0004_segment_and_keyset),
+    Migration(5, "full_text_search", _leads_0005_full_text_search),
+    Migration(6, "stats_counters", _leads_0006_stats_counters),
+]
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection, migrations: List[Migration]) -> List[int]:
+    """Aplica sobre `conn` las migraciones pendientes. Retorna las versiones aplicadas."""
+    applied = []
+    if current_version(conn) >= migrations[-1].version:
+        return applied
+    for migration in migrations:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Se relee dentro del lock: otro proceso pudo migrar mientras esperábamos
+            if migration.version <= current_version(conn):
+                conn.rollback()
+                continue
+            migration.apply(conn)
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                         (migration.version, migration.name))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+        logger.info(f"🗄️ [DB] Migración {migration.version:04d}_{migration.name} aplicada")
+    return applied
+
+
+_ensured = set()
+_ensure_lock = threading.Lock()
+
+
+def ensure_schema(path: str, migrations: List[Migration]) -> List[int]:
+    """
+    Migra `path` la primera vez que el proceso lo usa; después es una búsqueda en un set.
+    Reemplaza al antiguo _init_db() que corría DDL en cada import del módulo.
+    """
+    if path in _ensured:
+        return []
+    with _ensure_lock:
+        if path in _ensured:
+            return []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        applied = apply_migrations(get_connection(path), migrations)
+        _ensured.add(path)
+        return applied
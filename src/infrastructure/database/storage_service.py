@@ -1,119 +1,201 @@
 import os
 import glob
 import glob
+import hmac
 import sqlite3
+import re
 import json
 import logging
-from typing import List, Dict, Optional
+import time
+from collections import Counter
+from typing import List, Dict, Iterator, Optional
+
+from src.core.config import (
+    EXPORT_CHUNK_ROWS, TENANT_JOBS_PER_HOUR, TENANT_MAX_PENDING_JOBS, TENANT_MAX_PROCESSING_JOBS,
+    TENANT_PENDING_RETRY_SECONDS,
+)
+from src.core.tracing import current_trace_id
+from src.domain.models import JobPriority, QuotaExceeded
+from src.infrastructure.database.connection import connection, read_only_connection, transaction
+from src.infrastructure.database.migrations import (
+    MAIN_MIGRATIONS, LEADS_MIGRATIONS, GLOBAL_STATS_SCOPE, apply_migrations, ensure_schema,
+    rebuild_leads_stats, rebuild_main_stats,
+)
+from src.infrastructure.database.catalog_cache import catalog_cache, CatalogSnapshot
 
 logger = logging.getLogger(__name__)
 
 DB_PATH = "data/bastion_bot.db"
 LEADS_DB_PATH = "data/leads.db"
 
-def _create_tables(conn):
-    """Crea el esquema normalizado Country→State→City sobre la conexión dada."""
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS master_countries (
-            id   INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS master_states (
-            id         INTEGER PRIMARY KEY AUTOINCREMENT,
-            name       TEXT    NOT NULL,
-            country_id INTEGER NOT NULL,
-            FOREIGN KEY (country_id) REFERENCES master_countries(id)
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS scheduled_alerts (
-            id              INTEGER PRIMARY KEY AUTOINCREMENT,
-            chat_id         TEXT    NOT NULL,
-            cron_expression TEXT    NOT NULL,
-            prompt_task     TEXT    NOT NULL,
-            is_active       BOOLEAN NOT NULL DEFAULT 1
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS master_cities (
-            id         INTEGER PRIMARY KEY AUTOINCREMENT,
-            name       TEXT    NOT NULL,
-            state_id   INTEGER,
-            status     INTEGER NOT NULL DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (state_id) REFERENCES master_states(id)
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS bot_sessions (
-            chat_id     TEXT PRIMARY KEY,
-            session_id  TEXT NOT NULL,
-            created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS worker_config (
-            key   TEXT PRIMARY KEY,
-            value TEXT NOT NULL
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS master_categories (
-            id     INTEGER PRIMARY KEY AUTOINCREMENT,
-            name   TEXT    NOT NULL,
-            status INTEGER NOT NULL DEFAULT 1
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS batch_jobs (
-            id             INTEGER PRIMARY KEY AUTOINCREMENT,
-            category_id    INTEGER,
-            city_id        INTEGER,
-            zona_text      TEXT,
-            categoria_text TEXT,
-            owner_id       TEXT NOT NULL,
-            status         TEXT NOT NULL DEFAULT 'pending',
-            created_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (city_id)     REFERENCES master_cities(id),
-            FOREIGN KEY (category_id) REFERENCES master_categories(id)
-        )
-    ''')
-    for col in ("zona_text", "categoria_text"):
-        try:
-            cursor.execute(f"ALTER TABLE batch_jobs ADD COLUMN {col} TEXT")
-        except Exception:
-            pass
-    for table in ["master_countries", "master_states"]:
-        try:
-            cursor.execute(f"ALTER TABLE {table} ADD COLUMN status INTEGER NOT NULL DEFAULT 1")
-        except Exception:
-            pass
-    cursor.execute("DROP TABLE IF EXISTS tenant_categories")
-    cursor.execute("DROP TABLE IF EXISTS countries")
-    cursor.execute("DROP TABLE IF EXISTS states")
-    conn.commit()
-
-
 def _init_db(conn_override=None):
     """
-    Inicializa el esquema de la BD.
-    - conn_override: conexión SQLite externa (tests con :memory:). Crea tablas y retorna.
-    - Sin override: usa DB_PATH, crea tablas y NO siembra datos (per clean DB spec).
+    Aplica las migraciones pendientes de bastion_bot.db (ver migrations.py).
+    - conn_override: conexión SQLite externa (tests con :memory:). Migra esa conexión y retorna.
+    - Sin override: migra DB_PATH y NO siembra datos (per clean DB spec).
+    Ya no corre al importar el módulo: la primera llamada a _db() lo hace de forma perezosa.
     """
     if conn_override is not None:
-        _create_tables(conn_override)
+        apply_migrations(conn_override, MAIN_MIGRATIONS)
         return
-    os.makedirs("data", exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
-        _create_tables(conn)
+    ensure_schema(DB_PATH, MAIN_MIGRATIONS)
+
+
+def _db(conn_override=None):
+    """Conexión a bastion_bot.db con el esquema garantizado (migración perezosa en el primer uso)."""
+    ensure_schema(DB_PATH, MAIN_MIGRATIONS)
+    return connection(DB_PATH, conn_override)
+
+
+def _db_transaction():
+    """Transacción explícita (BEGIN IMMEDIATE) sobre bastion_bot.db."""
+    ensure_schema(DB_PATH, MAIN_MIGRATIONS)
+    return transaction(DB_PATH)
+
+
+def _catalog() -> CatalogSnapshot:
+    """Snapshot en memoria del catálogo maestro de DB_PATH (ver catalog_cache.py)."""
+    return catalog_cache.get(DB_PATH, _db)
+
+
+def _catalog_changed():
+    """Llamar tras cada escritura al catálogo: la siguiente lectura de este proceso revalida al instante."""
+    catalog_cache.invalidate(DB_PATH)
+
+
+def _leads_db():
+    """Conexión a leads.db (escrita por el scraper) con sus migraciones aplicadas."""
+    ensure_schema(LEADS_DB_PATH, LEADS_MIGRATIONS)
+    return connection(LEADS_DB_PATH)
+
+
+def _lead_filters(segment: Optional[str] = None, min_stars: Optional[float] = None) -> tuple:
+    """Filtros comunes sobre leads (alias l): listados, búsqueda y exportación."""
+    sql, params = "", []
+    if segment:
+        sql += " AND l.segment = ?"
+        params.append(segment)
+    if min_stars is not None:
+        sql += " AND l.stars >= ?"
+        params.append(min_stars)
+    return sql, params
+
+
+def _job_leads_sql(conn, job: dict, after: Optional[tuple] = None, segment: Optional[str] = None,
+                   min_stars: Optional[float] = None, limit: Optional[int] = None) -> tuple:
+    """
+    SQL de los leads de un Job: vía job_leads (orden de su PK) o, para Jobs anteriores a job_leads,
+    por zona "Categoría en Ciudad" (mismo Dual-path que el Worker; idx_leads_zone_name da el orden por name).
+    """
+    filters, filter_params = _lead_filters(segment, min_stars)
+    page, page_params = ("", []) if limit is None else (" LIMIT ?", [limit])
+
+    if conn.execute("SELECT 1 FROM job_leads WHERE job_id = ? LIMIT 1", (job['id'],)).fetchone():
+        # El keyset va sobre columnas de job_leads para que la PK (job_id, lead_name, lead_zone) resuelva rango y orden
+        keyset, keyset_params = ("", []) if after is None else (" AND (jl.lead_name, jl.lead_zone) > (?, ?)", list(after))
+        sql = f'''
+            SELECT l.* FROM job_leads jl
+            JOIN leads l ON l.name = jl.lead_name AND l.zone = jl.lead_zone
+            WHERE jl.job_id = ?{keyset}{filters}
+            ORDER BY jl.lead_name, jl.lead_zone{page}
+        '''
+        return sql, [job['id'], *keyset_params, *filter_params, *page_params]
+
+    zone = f"{job.get('categoria_text') or job['category_name']} en {job.get('zona_text') or job['city_name']}"
+    keyset, keyset_params = ("", []) if after is None else (" AND l.name > ?", [after[0]])
+    sql = f"SELECT l.* FROM leads l WHERE l.zone = ?{keyset}{filters} ORDER BY l.name{page}"
+    return sql, [zone, *keyset_params, *filter_params, *page_params]
+
+
+def _search_leads_sql(owner_id: str, query: str, segment: Optional[str] = None, min_stars: Optional[float] = None,
+                      job_id: Optional[int] = None) -> tuple:
+    """
+    FROM/WHERE de la búsqueda FTS5 acotada al tenant. Retorna (sql, params, expresión de ranking).
+    Cada palabra se busca como prefijo entre comillas: la entrada del usuario nunca es sintaxis FTS5.
+    """
+    words = re.findall(r"\w+", query or "")
+    if not words:
+        raise ValueError("La búsqueda debe contener al menos una palabra.")
+    match = " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+    # El nombre pesa más que el sitio web, la dirección y la zona
+    rank = "bm25(leads_fts, 10.0, 2.0, 4.0, 1.0)"
+    sql = f'''
+        FROM leads_fts
+        JOIN leads l ON l.rowid = leads_fts.rowid
+        WHERE leads_fts MATCH ?
+          AND EXISTS (
+              SELECT 1 FROM job_leads jl
+              WHERE jl.owner_id = ? AND jl.lead_name = l.name AND jl.lead_zone = l.zone
+              {"AND jl.job_id = ?" if job_id is not None else ""}
+          )
+    '''
+    params: list = [match, owner_id]
+    if job_id is not None:
+        params.append(job_id)
+    filters, filter_params = _lead_filters(segment, min_stars)
+    return sql + filters, params + filter_params, rank
 
 
-_init_db()
+QUOTA_FIELDS = ("jobs_per_hour", "max_pending", "max_processing")
+
+
+def _tenant_quota(conn, owner_id: str) -> Dict[str, int]:
+    """Cuotas efectivas del tenant: su fila de tenant_quotas y, campo por campo, el default de config."""
+    row = conn.execute(
+        "SELECT jobs_per_hour, max_pending, max_processing FROM tenant_quotas WHERE owner_id = ?", (owner_id,)
+    ).fetchone() or (None, None, None)
+    defaults = (TENANT_JOBS_PER_HOUR, TENANT_MAX_PENDING_JOBS, TENANT_MAX_PROCESSING_JOBS)
+    return {name: default if value is None else value for name, value, default in zip(QUOTA_FIELDS, row, defaults)}
+
+
+def _owner_jobs_by_status(conn, owner_id: str, status: str) -> int:
+    """Jobs del tenant en `status` según stats_counters (lectura por PK, mantenida por triggers)."""
+    row = conn.execute(
+        "SELECT value FROM stats_counters WHERE scope = ? AND metric = 'jobs_by_status' AND key = ?",
+        (owner_id, status)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def _bucket_tokens(conn, owner_id: str, jobs_per_hour: int, now: float) -> float:
+    """Tokens disponibles del bucket del tenant en `now`: capacidad = jobs_per_hour, recarga continua."""
+    row = conn.execute("SELECT tokens, updated_at FROM job_rate_buckets WHERE owner_id = ?", (owner_id,)).fetchone()
+    if row is None:
+        return float(jobs_per_hour)
+    tokens, updated_at = row
+    return min(float(jobs_per_hour), tokens + max(0.0, now - updated_at) * jobs_per_hour / 3600)
+
+
+def _reserve_job_quota(conn, owner_id: str, count: int, now: float):
+    """
+    Aplica las cuotas del tenant a `count` Jobs recién insertados dentro de la transacción `conn`.
+    Va DESPUÉS del INSERT (los triggers ya los sumaron a stats_counters) y antes del commit:
+    si lanza QuotaExceeded la transacción se revierte completa y el bucket no se toca.
+
+    Un lote más grande que la cuota completa (ej. todas las ciudades de un país) no se rechaza para
+    siempre: entra cuando la cola del tenant está vacía y el bucket lleno, y lo deja en negativo.
+    El exceso se paga después (los siguientes Jobs esperan la recarga), así el ritmo medio se respeta.
+    """
+    quota = _tenant_quota(conn, owner_id)
+    max_pending = quota["max_pending"]
+    if max_pending:
+        pending_before = _owner_jobs_by_status(conn, owner_id, "pending") - count
+        if pending_before + min(count, max_pending) > max_pending:
+            raise QuotaExceeded("max_pending", max_pending, TENANT_PENDING_RETRY_SECONDS)
+
+    jobs_per_hour = quota["jobs_per_hour"]
+    if not jobs_per_hour:
+        return
+    tokens = _bucket_tokens(conn, owner_id, jobs_per_hour, now)
+    needed = min(count, jobs_per_hour)
+    if tokens < needed:
+        raise QuotaExceeded("jobs_per_hour", jobs_per_hour, (needed - tokens) * 3600 / jobs_per_hour)
+    conn.execute('''
+        INSERT INTO job_rate_buckets (owner_id, tokens, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(owner_id) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+    ''', (owner_id, tokens - count, now))
+
 
 class StorageService:
     """
@@ -132,6 +214,14 @@ class StorageService:
         """Devuelve la ruta estandarizada para guardar o buscar archivos de un usuario."""
         return f"leads/session_{session_id}"
         
+    @staticmethod
+    def get_job_session_id(owner_id: str, job_id: int) -> str:
+        """
+        Sesión aislada por Job: dos Jobs simultáneos del mismo tenant nunca comparten carpeta,
+        así la entrega y la limpieza de uno no tocan los reportes del otro.
+        """
+        return f"{owner_id}_job_{job_id}"
+
     @staticmethod
     def fetch_excel_files_for_session(session_id: str) -> List[str]:
         """
@@ -193,19 +283,18 @@ class StorageService:
     @staticmethod
     def guardar_alerta(chat_id: str, cron_expression: str, prompt_task: str) -> int:
         """Guarda una nueva alerta en SQLite y devuelve su ID."""
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO scheduled_alerts (chat_id, cron_expression, prompt_task, is_active) VALUES (?, ?, ?, 1)",
                 (str(chat_id), cron_expression, prompt_task)
             )
-            conn.commit()
             return cursor.lastrowid
 
     @staticmethod
     def obtener_alertas(chat_id: Optional[str] = None) -> List[Dict]:
         """Obtiene las alertas activas, opcionalmente filtradas por chat_id."""
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             if chat_id:
@@ -218,13 +307,12 @@ class StorageService:
     @staticmethod
     def eliminar_alerta(alerta_id: int, chat_id: Optional[str] = None) -> bool:
         """Marca una alerta como inactiva (eliminada lógicamente). Opcionalmente verifica propiedad."""
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             if chat_id:
                 cursor.execute("UPDATE scheduled_alerts SET is_active=0 WHERE id=? AND chat_id=?", (alerta_id, str(chat_id)))
             else:
                 cursor.execute("UPDATE scheduled_alerts SET is_active=0 WHERE id=?", (alerta_id,))
-            conn.commit()
             return cursor.rowcount > 0
 
     # ==========================================
@@ -232,7 +320,14 @@ class StorageService:
     # ==========================================
 
     @staticmethod
-    def get_master_cities(limit: int = 100, offset: int = 0, state_id: Optional[int] = None, conn_override=None):
+    def get_master_cities(limit: int = 100, offset: int = 0, state_id: Optional[int] = None, conn_override=None,
+                          after: Optional[tuple] = None):
+        """
+        Ciudades activas ordenadas por (name, id). `after` = keyset (name, id) de la página anterior; sustituye a offset.
+        Se sirve desde el caché del catálogo; con conn_override (tests) consulta SQLite directamente.
+        """
+        if conn_override is None:
+            return _catalog().get_cities(limit=limit, offset=offset, state_id=state_id, after=after)
         base_query = '''
             SELECT mc.id, mc.name, mc.state_id, mc.status, mc.created_at,
                    s.name  AS state_name,
@@ -246,20 +341,20 @@ class StorageService:
         if state_id is not None:
             base_query += " AND mc.state_id = ?"
             params.append(state_id)
+        if after is not None:
+            base_query += " AND (mc.name, mc.id) > (?, ?)"
+            params.extend(after)
             
-        base_query += " LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
+        base_query += " ORDER BY mc.name, mc.id LIMIT ?"
+        params.append(limit)
+        if after is None:
+            base_query += " OFFSET ?"
+            params.append(offset)
 
-        if conn_override is not None:
-            conn_override.row_factory = sqlite3.Row
-            cursor = conn_override.cursor()
-            cursor.execute(base_query, tuple(params))
-            return [dict(row) for row in cursor.fetchall()]
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(base_query, tuple(params))
-            return [dict(row) for row in cursor.fetchall()]
+        conn_override.row_factory = sqlite3.Row
+        cursor = conn_override.cursor()
+        cursor.execute(base_query, tuple(params))
+        return [dict(row) for row in cursor.fetchall()]
 
     @staticmethod
     def create_master_city(name: str, state_id: int, conn_override=None) -> int:
@@ -269,96 +364,83 @@ class StorageService:
             cursor.execute("INSERT INTO master_cities (name, state_id, status) VALUES (?, ?, 1)", (name, state_id))
             conn_override.commit()
             return cursor.lastrowid
-        with sqlite3.connect(StorageService.get_db_path()) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("INSERT INTO master_cities (name, state_id, status) VALUES (?, ?, 1)", (name, state_id))
-            conn.commit()
-            return cursor.lastrowid
+        _catalog_changed()
+        return cursor.lastrowid
 
     @staticmethod
     def update_master_city(city_id: int, name: str, state_id: int) -> bool:
-        with sqlite3.connect(StorageService.get_db_path()) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("UPDATE master_cities SET name=?, state_id=? WHERE id=?", (name, state_id, city_id))
-            conn.commit()
-            return cursor.rowcount > 0
+        _catalog_changed()
+        return cursor.rowcount > 0
 
     @staticmethod
     def delete_master_city(city_id: int) -> bool:
-        with sqlite3.connect(StorageService.get_db_path()) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM master_cities WHERE id=?", (city_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+        _catalog_changed()
+        return cursor.rowcount > 0
 
     @staticmethod
     def get_or_create_city(name: str) -> Optional[int]:
         """
-        Busca una ciudad por nombre (case-insensitive).
+        Busca una ciudad por nombre (sin distinguir mayúsculas ni acentos).
         NOTA: El catálogo es cerrado — ya NO crea ciudades. Devuelve None si no existe.
         """
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id FROM master_cities WHERE name COLLATE NOCASE = ?", (name,))
-            row = cursor.fetchone()
-            return row[0] if row else None
+        city = _catalog().find_city(name)
+        return city['id'] if city else None
 
     @staticmethod
     def get_city_by_name(name: str) -> Optional[dict]:
-        """Busca una ciudad por nombre exacto (case-insensitive) para validación."""
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM master_cities WHERE name COLLATE NOCASE = ?", (name,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        """Busca una ciudad por nombre exacto, sin distinguir mayúsculas ni acentos, para validación."""
+        return _catalog().find_city(name)
 
     @staticmethod
-    def get_categories():
-        """Retorna TODAS las categorías maestras globales. (Eliminamos parám owner_id por ser global)."""
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM master_categories WHERE status=1 ORDER BY name ASC")
-            return [dict(row) for row in cursor.fetchall()]
+    def get_categories(limit: Optional[int] = None, offset: int = 0, after: Optional[tuple] = None):
+        """
+        Categorías maestras globales activas, ordenadas por (name, id). (Eliminamos parám owner_id por ser global).
+        Sin limit retorna TODAS (Bot / validaciones); con limit pagina por offset o por keyset `after` = (name, id).
+        Se sirve desde el caché del catálogo.
+        """
+        return _catalog().get_categories(limit=limit, offset=offset, after=after)
 
     @staticmethod
     def create_category(name: str) -> int:
         """Crea una categoría maestra global."""
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO master_categories (name) VALUES (?)",
                 (name,)
             )
-            conn.commit()
-            return cursor.lastrowid
+        _catalog_changed()
+        return cursor.lastrowid
 
     @staticmethod
     def update_category_status(category_id: int, new_status: int) -> bool:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("UPDATE master_categories SET status=? WHERE id=?", (new_status, category_id))
-            conn.commit()
-            return cursor.rowcount > 0
+        _catalog_changed()
+        return cursor.rowcount > 0
 
     @staticmethod
     def delete_category(category_id: int) -> bool:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM master_categories WHERE id=?", (category_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+        _catalog_changed()
+        return cursor.rowcount > 0
 
     @staticmethod
     def get_category_by_name(name: str) -> Optional[dict]:
-        """Busca una categoría global por nombre exacto (case-insensitive) para validación del Bot."""
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM master_categories WHERE name COLLATE NOCASE = ?", (name,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        """Busca una categoría global por nombre exacto (sin distinguir mayúsculas ni acentos) para validación del Bot."""
+        return _catalog().find_category(name)
 
     # ==========================================
     # CATÁLOGO NORMALIZADO: COUNTRIES & STATES
@@ -372,11 +454,11 @@ class StorageService:
             cursor.execute("INSERT INTO master_countries (name) VALUES (?)", (name,))
             conn_override.commit()
             return cursor.lastrowid
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("INSERT INTO master_countries (name) VALUES (?)", (name,))
-            conn.commit()
-            return cursor.lastrowid
+        _catalog_changed()
+        return cursor.lastrowid
 
     @staticmethod
     def create_state(name: str, country_id: int, conn_override=None) -> int:
@@ -390,208 +472,500 @@ class StorageService:
                 )
                 conn_override.commit()
                 return cursor.lastrowid
-            with sqlite3.connect(DB_PATH) as conn:
+            with _db() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     "INSERT INTO master_states (name, country_id) VALUES (?, ?)", 
                     (name, country_id)
                 )
-                conn.commit()
-                return cursor.lastrowid
+            _catalog_changed()
+            return cursor.lastrowid
         except sqlite3.IntegrityError:
             raise ValueError(f"No existe el country_id {country_id} para ligar este estado.")
 
     @staticmethod
     def update_country(country_id: int, name: str) -> bool:
         """Actualiza el nombre de un país. Retorna False si no existe."""
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("UPDATE master_countries SET name = ? WHERE id = ? AND status = 1", (name, country_id))
-            conn.commit()
-            return cursor.rowcount > 0
+        _catalog_changed()
+        return cursor.rowcount > 0
 
     @staticmethod
     def update_state(state_id: int, name: str) -> bool:
         """Actualiza el nombre de un estado. Retorna False si no existe."""
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("UPDATE master_states SET name = ? WHERE id = ? AND status = 1", (name, state_id))
-            conn.commit()
-            return cursor.rowcount > 0
+        _catalog_changed()
+        return cursor.rowcount > 0
 
     @staticmethod
     def delete_state_with_cascade(state_id: int) -> bool:
         """Hace Soft Delete de un estado y desactiva todas sus ciudades dependientes."""
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("UPDATE master_states SET status = 0 WHERE id = ?", (state_id,))
             if cursor.rowcount == 0:
                 return False
             cursor.execute("UPDATE master_cities SET status = 0 WHERE state_id = ?", (state_id,))
-            conn.commit()
-            return True
+        _catalog_changed()
+        return True
 
     @staticmethod
     def get_countries(conn_override=None) -> List[Dict]:
-        """Retorna todos los países activos del catálogo."""
+        """Retorna todos los países activos del catálogo (desde el caché salvo con conn_override)."""
         if conn_override is not None:
             conn_override.row_factory = sqlite3.Row
             cursor = conn_override.cursor()
             cursor.execute("SELECT * FROM master_countries WHERE status=1 ORDER BY name ASC")
             return [dict(row) for row in cursor.fetchall()]
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM master_countries WHERE status=1 ORDER BY name ASC")
-            return [dict(row) for row in cursor.fetchall()]
+        return _catalog().get_countries()
 
     @staticmethod
     def get_states_by_country(country_id: int, conn_override=None) -> List[Dict]:
-        """Retorna todos los estados activos de un país."""
+        """Retorna todos los estados activos de un país (desde el caché salvo con conn_override)."""
         if conn_override is not None:
             conn_override.row_factory = sqlite3.Row
             cursor = conn_override.cursor()
             cursor.execute("SELECT * FROM master_states WHERE country_id=? AND status=1 ORDER BY name ASC", (country_id,))
             return [dict(row) for row in cursor.fetchall()]
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM master_states WHERE country_id=? AND status=1 ORDER BY name ASC", (country_id,))
-            return [dict(row) for row in cursor.fetchall()]
+        return _catalog().get_states(country_id)
 
     @staticmethod
-    def get_jobs(owner_id: str, limit: int = 50, offset: int = 0):
-        """Returns batch jobs scoped to the tenant with pagination support."""
-        with sqlite3.connect(DB_PATH) as conn:
+    def get_catalog_version() -> int:
+        """Versión del catálogo maestro (cambia con cada escritura). La API la usa como ETag."""
+        return _catalog().version
+
+    @staticmethod
+    def get_jobs(owner_id: str, limit: int = 50, offset: int = 0,
+                 after: Optional[tuple] = None, status: Optional[str] = None):
+        """
+        Returns batch jobs scoped to the tenant, newest first.
+        - after: keyset (created_at, id) of the last row of the previous page. Takes precedence over
+          offset, whose cost grows with page depth (kept for existing clients).
+        - status: optional filter, resolved by idx_batch_jobs_owner_status_keyset.
+        """
+        query = '''
+            SELECT j.*, c.name as category_name, m.name as city_name 
+            FROM batch_jobs j
+            LEFT JOIN master_categories c ON j.category_id = c.id
+            LEFT JOIN master_cities m ON j.city_id = m.id
+            WHERE j.owner_id=?
+        '''
+        params: list = [owner_id]
+        if status:
+            query += " AND j.status = ?"
+            params.append(status)
+        if after is not None:
+            query += " AND (j.created_at, j.id) < (?, ?)"
+            params.extend(after)
+        query += " ORDER BY j.created_at DESC, j.id DESC LIMIT ?"
+        params.append(limit)
+        if after is None:
+            query += " OFFSET ?"
+            params.append(offset)
+        with _db() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            cursor.execute(f'''
-                SELECT j.*, c.name as category_name, m.name as city_name 
-                FROM batch_jobs j
-                LEFT JOIN master_categories c ON j.category_id = c.id
-                LEFT JOIN master_cities m ON j.city_id = m.id
-                WHERE j.owner_id=?
-                ORDER BY j.created_at DESC
-                LIMIT ? OFFSET ?
-            ''', (owner_id, limit, offset))
+            cursor.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
 
     @staticmethod
     def get_job_by_id(job_id: int, owner_id: str) -> Optional[dict]:
-        with sqlite3.connect(StorageService.get_db_path()) as conn:
+        """Detalle de un Job del tenant. Incluye 'progress' (dict) si el Worker ya reportó avance."""
+        with _db() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT j.*, 
                        COALESCE(c.name, 'Unknown') as category_name, 
-                       COALESCE(m.name, 'Unknown') as city_name 
+                       COALESCE(m.name, 'Unknown') as city_name,
+                       p.stage      AS progress_stage,
+                       p.discovered AS progress_discovered,
+                       p.processed  AS progress_processed,
+                       p.cached     AS progress_cached,
+                       p.skipped    AS progress_skipped,
+                       p.updated_at AS progress_updated_at
                 FROM batch_jobs j
                 LEFT JOIN master_categories c ON j.category_id = c.id
                 LEFT JOIN master_cities m ON j.city_id = m.id
+                LEFT JOIN job_progress p ON p.job_id = j.id
                 WHERE j.id = ? AND j.owner_id = ?
             ''', (job_id, owner_id))
             row = cursor.fetchone()
-            if row:
-                return dict(row)
-            return None
+            if not row:
+                return None
+            job = dict(row)
+            progress = {key[len("progress_"):]: job.pop(key) for key in list(job) if key.startswith("progress_")}
+            job['progress'] = dict(progress, job_id=job['id']) if progress['stage'] is not None else None
+            return job
+
+    @staticmethod
+    def update_job_progress(job_id: int, stage: str, discovered: int = 0, processed: int = 0,
+                            cached: int = 0, skipped: int = 0):
+        """Upsert de los contadores en vivo de un Job (una fila por Job)."""
+        with _db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO job_progress (job_id, stage, discovered, processed, cached, skipped, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    stage=excluded.stage, discovered=excluded.discovered, processed=excluded.processed,
+                    cached=excluded.cached, skipped=excluded.skipped, updated_at=excluded.updated_at
+            ''', (job_id, stage, discovered, processed, cached, skipped))
+
+    @staticmethod
+    def get_jobs_progress(owner_id: str, job_ids: List[int]) -> List[dict]:
+        """Progreso en bloque para la lista de Jobs del Dashboard (una sola consulta por PK)."""
+        if not job_ids:
+            return []
+        placeholders = ", ".join(["?"] * len(job_ids))
+        with _db() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT p.* FROM job_progress p
+                JOIN batch_jobs j ON j.id = p.job_id
+                WHERE p.job_id IN ({placeholders}) AND j.owner_id = ?
+            ''', (*job_ids, owner_id))
+            return [dict(row) for row in cursor.fetchall()]
 
     @staticmethod
-    def retry_job(job_id: int) -> bool:
-        """Resetea un job fallido a estado pendiente para ser re-procesado."""
-        with sqlite3.connect(DB_PATH) as conn:
+    def retry_job(job_id: int, owner_id: str) -> bool:
+        """
+        Regresa a pending un Job fallido o cancelado del tenant para re-procesarlo.
+        Retorna False si no es suyo o sigue activo (pending/processing: otro Worker lo tomaría dos veces)
+        o ya terminó bien. Reencolar cuenta como un Job nuevo para las cuotas: QuotaExceeded si no cabe.
+        """
+        with _db_transaction() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "UPDATE batch_jobs SET status='pending', updated_at=CURRENT_TIMESTAMP WHERE id=?",
-                (job_id,)
+                """
+                UPDATE batch_jobs SET status='pending', updated_at=CURRENT_TIMESTAMP
+                WHERE id=? AND owner_id=? AND status IN ('failed', 'cancelled')
+                """,
+                (job_id, owner_id)
             )
-            conn.commit()
-            return cursor.rowcount > 1
+            if cursor.rowcount != 1:
+                return False
+            _reserve_job_quota(conn, owner_id, 1, time.time())
+            return True
 
     @staticmethod
-    def get_leads_for_job(job_id: int, owner_id: str) -> List[dict]:
-        """Obtiene los leads reales de la DB de leads que coinciden con la zona/categoría del job."""
+    def cancel_jobs(owner_id: str, job_ids: Optional[List[int]] = None, batch_id: Optional[int] = None) -> int:
+        """
+        Cancela Jobs activos (pending/processing) del tenant. Sin job_ids cancela todos sus Jobs activos
+        (o solo los del lote `batch_id`).
+        Los pending dejan de ser elegibles en get_pending_job(); los processing los detiene
+        el worker en su siguiente chequeo (is_job_cancelled). Retorna cuántos Jobs cambiaron de estado.
+        """
+        query = '''
+            UPDATE batch_jobs SET status='cancelled', updated_at=CURRENT_TIMESTAMP
+            WHERE owner_id = ? AND status IN ('pending', 'processing')
+        '''
+        params: list = [owner_id]
+        if job_ids is not None:
+            if not job_ids:
+                return 0
+            query += f" AND id IN ({','.join('?' * len(job_ids))})"
+            params.extend(job_ids)
+        if batch_id is not None:
+            query += " AND batch_id = ?"
+            params.append(batch_id)
+        with _db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.rowcount
+
+    @staticmethod
+    def is_job_cancelled(job_id: int) -> bool:
+        """Chequeo barato por PK que el worker consulta entre listings y entre pares zona/categoría."""
+        with _db() as conn:
+            row = conn.execute("SELECT status FROM batch_jobs WHERE id=?", (job_id,)).fetchone()
+            return bool(row) and row[0] == 'cancelled'
+
+    @staticmethod
+    def get_leads_for_job(job_id: int, owner_id: str, limit: Optional[int] = None, after: Optional[tuple] = None,
+                          segment: Optional[str] = None, min_stars: Optional[float] = None) -> List[dict]:
+        """
+        Obtiene los leads del Job vía job_leads (JOIN indexado, exacto para Jobs de catálogo y de texto libre).
+        Jobs procesados antes de job_leads no tienen filas ahí: para ellos se conserva la búsqueda por zona.
+        Orden estable por (name, zone); `after` es el keyset (name, zone) de la página anterior.
+        Los filtros segment/min_stars se resuelven en SQL (segment es NULL en leads anteriores a la columna).
+        """
         job = StorageService.get_job_by_id(job_id, owner_id)
         if not job:
             return []
-            
-        city_name = job['city_name']
-        cat_name = job['category_name']
-        # GoogleMapsScraper guarda la zona como "Categoría en Ciudad"
-        search_query = f"{cat_name} en {city_name}"
         
         if not os.path.exists(LEADS_DB_PATH):
             return []
             
-        with sqlite3.connect(LEADS_DB_PATH) as conn:
+        with _leads_db() as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            # Filtramos por zona (que es el search_query)
-            cursor.execute("SELECT * FROM leads WHERE zone = ?", (search_query,))
-            return [dict(row) for row in cursor.fetchall()]
+            sql, params = _job_leads_sql(conn, job, after=after, segment=segment, min_stars=min_stars, limit=limit)
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    @staticmethod
+    def search_leads(owner_id: str, query: str, limit: int = 50, after: Optional[tuple] = None,
+                     segment: Optional[str] = None, min_stars: Optional[float] = None,
+                     job_id: Optional[int] = None) -> List[dict]:
+        """
+        Búsqueda de texto completo (FTS5) en nombre, dirección, sitio web y zona de los leads del tenant
+        (los que alguno de sus Jobs encontró, vía job_leads), ordenada por relevancia bm25.
+        Cada palabra se busca como prefijo ("dent" encuentra "Dental"); todas deben aparecer.
+        `after` = keyset (rank, lead_rowid) del último resultado de la página anterior.
+        Lanza ValueError si la consulta no contiene palabras.
+        """
+        sql, params, rank = _search_leads_sql(owner_id, query, segment=segment, min_stars=min_stars, job_id=job_id)
+        if not os.path.exists(LEADS_DB_PATH):
+            return []
+
+        sql = f"SELECT l.*, l.rowid AS lead_rowid, {rank} AS rank {sql}"
+        if after is not None:
+            sql += f" AND ({rank}, l.rowid) > (?, ?)"
+            params.extend(after)
+        sql += f" ORDER BY {rank}, l.rowid LIMIT ?"
+        params.append(limit)
+
+        with _leads_db() as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    @staticmethod
+    def open_lead_export(owner_id: str, job_id: Optional[int] = None, batch_id: Optional[int] = None,
+                         query: Optional[str] = None, segment: Optional[str] = None, min_stars: Optional[float] = None,
+                         chunk_size: int = EXPORT_CHUNK_ROWS) -> Optional[Iterator[List[dict]]]:
+        """
+        Prepara la exportación de leads de un Job, de un lote completo o de una búsqueda (query, opcionalmente
+        acotada a job_id). Valida y resuelve los Jobs de inmediato y retorna un generador que lee leads.db
+        en chunks de `chunk_size` (fetchmany): la memoria no crece con el tamaño de la exportación.
+        Retorna None si el Job o el lote no pertenecen al tenant; lanza ValueError si la búsqueda no tiene palabras.
+        """
+        if query is not None:
+            search_sql, params, _ = _search_leads_sql(owner_id, query, segment=segment, min_stars=min_stars, job_id=job_id)
+            jobs = None
+        elif batch_id is not None:
+            if not StorageService.get_batch(batch_id, owner_id):
+                return None
+            with _db() as conn:
+                conn.row_factory = sqlite3.Row
+                jobs = [dict(row) for row in conn.execute('''
+                    SELECT j.id, j.categoria_text, j.zona_text,
+                           COALESCE(c.name, 'Unknown') AS category_name,
+                           COALESCE(m.name, 'Unknown') AS city_name
+                    FROM batch_jobs j
+                    LEFT JOIN master_categories c ON j.category_id = c.id
+                    LEFT JOIN master_cities m ON j.city_id = m.id
+                    WHERE j.batch_id = ? AND j.owner_id = ?
+                    ORDER BY j.id
+                ''', (batch_id, owner_id)).fetchall()]
+        else:
+            job = StorageService.get_job_by_id(job_id, owner_id)
+            if not job:
+                return None
+            jobs = [job]
+
+        def chunks() -> Iterator[List[dict]]:
+            if not os.path.exists(LEADS_DB_PATH):
+                return
+            ensure_schema(LEADS_DB_PATH, LEADS_MIGRATIONS)
+            with read_only_connection(LEADS_DB_PATH) as conn:
+                conn.row_factory = sqlite3.Row
+                if jobs is None:
+                    statements = [(f"SELECT l.* {search_sql} ORDER BY l.rowid", params)]
+                else:
+                    statements = (_job_leads_sql(conn, job, segment=segment, min_stars=min_stars) for job in jobs)
+                for sql, sql_params in statements:
+                    cursor = conn.execute(sql, sql_params)
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield [dict(row) for row in rows]
+
+        return chunks()
 
     @staticmethod
-    def create_hybrid_job(owner_id: str, category_id: int = None, categoria_text: str = None, city_id: int = None, zona_text: str = None) -> int:
+    def create_hybrid_job(owner_id: str, category_id: int = None, categoria_text: str = None, city_id: int = None, zona_text: str = None,
+                          priority: int = JobPriority.NORMAL, force_refresh: bool = False, trace_id: Optional[str] = None) -> int:
         """
         Punto de entrada unificado para crear Jobs. 
         Soporta tanto Jobs 100% relacionales (Frontend) como Jobs híbridos/texto-libre (Bot).
+        priority: ver JobPriority. El Bot encola con INTERACTIVE para adelantarse a los lotes.
+        force_refresh: ignora resultados recientes de la misma búsqueda y vuelve a extraer.
+        trace_id: por defecto el de la petición en curso; el Worker lo retoma al procesar el Job.
+        Lanza QuotaExceeded si el tenant superó sus cuotas (ver _reserve_job_quota).
         """
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db_transaction() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
                 INSERT INTO batch_jobs 
-                (category_id, categoria_text, city_id, zona_text, owner_id, status) 
-                VALUES (?, ?, ?, ?, ?, 'pending')
+                (category_id, categoria_text, city_id, zona_text, owner_id, status, priority, force_refresh, trace_id) 
+                VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)
                 """,
-                (category_id, categoria_text, city_id, zona_text, owner_id)
+                (category_id, categoria_text, city_id, zona_text, owner_id, int(priority), int(force_refresh),
+                 trace_id or current_trace_id())
             )
-            conn.commit()
-            return cursor.lastrowid
+            job_id = cursor.lastrowid
+            _reserve_job_quota(conn, owner_id, 1, time.time())
+            return job_id
 
     @staticmethod
-    def create_batch_jobs(jobs_payloads: List[tuple]) -> int:
+    def create_batch_jobs(jobs_payloads: List[tuple], priority: int = JobPriority.BULK, force_refresh: bool = False) -> int:
         """
         Inserta múltiples trabajos de forma atómica usando executemany.
         jobs_payloads debe ser lista de tuplas: 
         (category_id, categoria_text, city_id, zona_text, owner_id)
+        Los lotes entran con prioridad BULK para no bloquear búsquedas interactivas.
+        Todos comparten el trace_id de la petición en curso.
+        Las cuotas se aplican por owner: si alguno las supera no se inserta ninguno (QuotaExceeded).
         """
         if not jobs_payloads:
             return 0
             
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db_transaction() as conn:
             cursor = conn.cursor()
             cursor.executemany(
-                """
+                f"""
                 INSERT INTO batch_jobs 
-                (category_id, categoria_text, city_id, zona_text, owner_id, status) 
-                VALUES (?, ?, ?, ?, ?, 'pending')
+                (category_id, categoria_text, city_id, zona_text, owner_id, status, priority, force_refresh, trace_id) 
+                VALUES (?, ?, ?, ?, ?, 'pending', {int(priority)}, {int(force_refresh)}, ?)
                 """,
-                jobs_payloads
+                [(*payload, current_trace_id()) for payload in jobs_payloads]
             )
-            conn.commit()
-            return cursor.rowcount
-            
+            inserted = cursor.rowcount
+            now = time.time()
+            for owner_id, count in sorted(Counter(payload[4] for payload in jobs_payloads).items()):
+                _reserve_job_quota(conn, owner_id, count, now)
+            return inserted
+
+    @staticmethod
+    def create_batch_for_cities(owner_id: str, category_id: int, state_id: Optional[int] = None,
+                                city_id: Optional[int] = None, priority: int = JobPriority.BULK,
+                                force_refresh: bool = False) -> tuple:
+        """
+        Crea un lote y expande sus Jobs dentro de SQLite con un solo INSERT … SELECT sobre master_cities
+        (ciudades activas, filtradas por estado o ciudad; sin filtros = nivel nacional).
+        No trae ciudades a Python ni tiene tope de filas: memoria constante sin importar el tamaño del lote.
+        Retorna (batch_id, jobs_creados). Si ninguna ciudad coincide no deja lote vacío: (None, 0).
+        El lote cuenta completo contra las cuotas del tenant: si no cabe, QuotaExceeded y no se crea nada.
+        """
+        scope = "city" if city_id is not None else "state" if state_id is not None else "country"
+        filters, params = "", []
+        if state_id is not None:
+            filters += " AND mc.state_id = ?"
+            params.append(state_id)
+        if city_id is not None:
+            filters += " AND mc.id = ?"
+            params.append(city_id)
+
+        with _db_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO batches (owner_id, scope, category_id, state_id, city_id, force_refresh) VALUES (?, ?, ?, ?, ?, ?)",
+                (owner_id, scope, category_id, state_id, city_id, int(force_refresh))
+            )
+            batch_id = cursor.lastrowid
+            cursor.execute(f'''
+                INSERT INTO batch_jobs (category_id, city_id, owner_id, status, priority, force_refresh, batch_id, trace_id)
+                SELECT ?, mc.id, ?, 'pending', ?, ?, ?, ?
+                FROM master_cities mc
+                WHERE mc.status = 1{filters}
+                ORDER BY mc.id
+            ''', (category_id, owner_id, int(priority), int(force_refresh), batch_id, current_trace_id(), *params))
+            count = cursor.rowcount
+            if count == 0:
+                cursor.execute("DELETE FROM batches WHERE id = ?", (batch_id,))
+                return None, 0
+            cursor.execute("UPDATE batches SET total_jobs = ? WHERE id = ?", (count, batch_id))
+            _reserve_job_quota(conn, owner_id, count, time.time())
+            return batch_id, count
+
+    @staticmethod
+    def get_batches(owner_id: str, limit: int = 50, after: Optional[tuple] = None) -> List[dict]:
+        """
+        Lotes del tenant, más recientes primero, con sus contadores (pending/processing/completed/failed/
+        cancelled/leads_found) ya agregados por los triggers de la migración 0009. `after` = keyset (created_at, id).
+        """
+        query = "SELECT * FROM batches WHERE owner_id = ?"
+        params: list = [owner_id]
+        if after is not None:
+            query += " AND (created_at, id) < (?, ?)"
+            params.extend(after)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with _db() as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    @staticmethod
+    def get_batch(batch_id: int, owner_id: str) -> Optional[dict]:
+        """Avance de un lote en una lectura por PK, sin recorrer sus Jobs."""
+        with _db() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM batches WHERE id = ? AND owner_id = ?", (batch_id, owner_id)).fetchone()
+            return dict(row) if row else None
+
+    @staticmethod
+    def set_job_leads_found(job_id: int, leads_found: int):
+        """Leads entregados por el Job; el trigger suma la diferencia al contador de su lote."""
+        with _db() as conn:
+            conn.execute("UPDATE batch_jobs SET leads_found = ? WHERE id = ?", (leads_found, job_id))
+
     @staticmethod
     def get_pending_job():
-        with sqlite3.connect(DB_PATH) as conn:
+        """
+        Reclama atómicamente el siguiente Job con reparto justo (fair-share) entre tenants:
+        1. Se toma la cabeza de cola de cada owner con Jobs pendientes (idx_job_queue_owners_active:
+           los tenants inactivos no cuestan nada) usando el índice parcial idx_batch_jobs_pending_queue.
+        2. Entre esas cabezas gana la de mayor prioridad y, a igual prioridad, el owner
+           que lleva más tiempo sin turno (round-robin por last_claim_seq).
+        Así un lote nacional de un tenant no deja sin servicio al resto.
+        3. Se saltan los owners que ya ocupan todos sus slots (max_processing, 0 = sin límite): con
+           varios Workers un tenant no acapara todos los navegadores a la vez.
+        """
+        with _db_transaction() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute('''
+                WITH heads AS (
+                    SELECT o.owner_id,
+                           o.last_claim_seq,
+                           (SELECT j.id FROM batch_jobs j
+                            WHERE j.status = 'pending' AND j.owner_id = o.owner_id
+                            ORDER BY j.priority DESC, j.created_at ASC, j.id ASC
+                            LIMIT 1) AS job_id
+                    FROM job_queue_owners o
+                    LEFT JOIN tenant_quotas q ON q.owner_id = o.owner_id
+                    WHERE o.pending_count > 0
+                      AND (COALESCE(q.max_processing, :max_processing) <= 0
+                       OR COALESCE((SELECT s.value FROM stats_counters s
+                                    WHERE s.scope = o.owner_id AND s.metric = 'jobs_by_status'
+                                      AND s.key = 'processing'), 0) < COALESCE(q.max_processing, :max_processing))
+                )
                 UPDATE batch_jobs 
                 SET status='processing', updated_at=CURRENT_TIMESTAMP
                 WHERE id = (
-                    SELECT id FROM batch_jobs 
-                    WHERE status='pending' 
-                    ORDER BY created_at ASC 
+                    SELECT h.job_id FROM heads h
+                    JOIN batch_jobs hj ON hj.id = h.job_id
+                    ORDER BY hj.priority DESC, h.last_claim_seq ASC, hj.created_at ASC, hj.id ASC
                     LIMIT 1
                 )
-                RETURNING id;
-            ''')
+                RETURNING id, owner_id;
+            ''', {"max_processing": TENANT_MAX_PROCESSING_JOBS})
             row = cursor.fetchone()
             if not row:
                 return None
             
             job_id = row['id']
+            cursor.execute('''
+                UPDATE job_queue_owners
+                SET last_claim_seq = (SELECT COALESCE(MAX(last_claim_seq), 0) + 1 FROM job_queue_owners)
+                WHERE owner_id = ?
+            ''', (row['owner_id'],))
             # Dual-path: LEFT JOIN para soportar jobs del Bot (sin FK) y del Frontend (con FK)
             cursor.execute('''
                 SELECT 
@@ -608,9 +982,26 @@ class StorageService:
             full_row = cursor.fetchone()
             return dict(full_row) if full_row else None
 
+    @staticmethod
+    def requeue_stale_jobs(max_age_seconds: int) -> int:
+        """
+        Devuelve a pending los Jobs en 'processing' sin avance (ni claim ni job_progress) en max_age_seconds:
+        su Worker se cayó a mitad del Job. Sin esto el Job queda bloqueado para siempre y, con
+        max_processing, también el resto de la cola de su tenant. Retorna cuántos se reencolaron.
+        """
+        age = f"{-int(max_age_seconds)} seconds"
+        with _db_transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE batch_jobs SET status='pending', updated_at=CURRENT_TIMESTAMP
+                WHERE status = 'processing' AND updated_at < datetime('now', ?)
+                  AND NOT EXISTS (SELECT 1 FROM job_progress p
+                                  WHERE p.job_id = batch_jobs.id AND p.updated_at >= datetime('now', ?))
+            ''', (age, age))
+            return cursor.rowcount
+
     @staticmethod
     def get_worker_enabled() -> bool:
-        with sqlite3.connect(StorageService.get_db_path()) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT value FROM worker_config WHERE key = 'is_enabled'")
             row = cursor.fetchone()
@@ -621,37 +1012,195 @@ class StorageService:
     @staticmethod
     def set_worker_enabled(enabled: bool):
         value = 'true' if enabled else 'false'
-        with sqlite3.connect(StorageService.get_db_path()) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO worker_config (key, value) 
                 VALUES ('is_enabled', ?)
                 ON CONFLICT(key) DO UPDATE SET value=?
             ''', (value, value))
-            conn.commit()
 
     @staticmethod
     def update_job_status(job_id: int, status: str):
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
-            cursor.execute("UPDATE batch_jobs SET status=?, updated_at=CURRENT_TIMESTAMP WHERE id=?", (status, job_id))
-            conn.commit()
+            # Un Job cancelado no se sobrescribe con el resultado tardío del worker
+            cursor.execute(
+                "UPDATE batch_jobs SET status=?, updated_at=CURRENT_TIMESTAMP WHERE id=? AND status != 'cancelled'",
+                (status, job_id)
+            )
+
+    @staticmethod
+    def get_job_events(after_id: int, limit: int = 500, owner_id: Optional[str] = None) -> List[dict]:
+        """
+        Eventos de Jobs (status/progreso) posteriores a `after_id`, en orden. Rango por PK: barato aunque
+        se consulte cada medio segundo. Sin owner_id trae los de todos los tenants (reparto en la API).
+        """
+        sql = "SELECT id, job_id, owner_id, type, payload, created_at FROM job_events WHERE id > ?"
+        params: list = [after_id]
+        if owner_id is not None:
+            sql += " AND owner_id = ?"
+            params.append(owner_id)
+        sql += " ORDER BY id LIMIT ?"
+        params.append(limit)
+        with _db() as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row, payload=json.loads(row["payload"])) for row in conn.execute(sql, params).fetchall()]
+
+    @staticmethod
+    def get_last_job_event_id() -> int:
+        with _db() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM job_events").fetchone()[0]
+
+    @staticmethod
+    def prune_job_events(max_age_seconds: int) -> int:
+        """Borra eventos más antiguos que la retención; quien reconecte después recarga el estado completo."""
+        with _db() as conn:
+            cursor = conn.execute(
+                "DELETE FROM job_events WHERE created_at < datetime('now', ?)", (f"{-int(max_age_seconds)} seconds",)
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def save_otp(chat_id: str, code_hash: str, ttl_seconds: float, resend_seconds: float, now: float) -> bool:
+        """
+        Guarda (o reemplaza) el OTP del chat y reinicia sus intentos; de paso purga los vencidos.
+        Retorna False sin tocar nada si ya hay uno vigente pedido hace menos de resend_seconds.
+        """
+        with _db_transaction() as conn:
+            conn.execute("DELETE FROM auth_otps WHERE expires_at <= ?", (now,))
+            recent = conn.execute(
+                "SELECT 1 FROM auth_otps WHERE chat_id = ? AND requested_at > ?", (chat_id, now - resend_seconds)
+            ).fetchone()
+            if recent:
+                return False
+            conn.execute('''
+                INSERT INTO auth_otps (chat_id, code_hash, attempts, requested_at, expires_at)
+                VALUES (?, ?, 0, ?, ?)
+                ON CONFLICT(chat_id) DO UPDATE SET
+                    code_hash = excluded.code_hash, attempts = 0,
+                    requested_at = excluded.requested_at, expires_at = excluded.expires_at
+            ''', (chat_id, code_hash, now, now + ttl_seconds))
+            return True
+
+    @staticmethod
+    def delete_otp(chat_id: str):
+        with _db() as conn:
+            conn.execute("DELETE FROM auth_otps WHERE chat_id = ?", (chat_id,))
+
+    @staticmethod
+    def consume_otp(chat_id: str, code_hash: str, max_attempts: int, now: float) -> str:
+        """
+        Verifica el OTP de forma atómica entre procesos. Retorna:
+        "ok" (se consume), "missing", "expired" (se borra), "invalid" (suma un intento) o
+        "locked" (se agotaron los intentos: se borra y hay que pedir otro código).
+        """
+        with _db_transaction() as conn:
+            row = conn.execute(
+                "SELECT code_hash, attempts, expires_at FROM auth_otps WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+            if not row:
+                return "missing"
+            stored_hash, attempts, expires_at = row
+            if now > expires_at:
+                conn.execute("DELETE FROM auth_otps WHERE chat_id = ?", (chat_id,))
+                return "expired"
+            if hmac.compare_digest(stored_hash, code_hash):
+                conn.execute("DELETE FROM auth_otps WHERE chat_id = ?", (chat_id,))
+                return "ok"
+            if attempts + 1 >= max_attempts:
+                conn.execute("DELETE FROM auth_otps WHERE chat_id = ?", (chat_id,))
+                return "locked"
+            conn.execute("UPDATE auth_otps SET attempts = attempts + 1 WHERE chat_id = ?", (chat_id,))
+            return "invalid"
+
+    @staticmethod
+    def get_stats(owner_id: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Contadores del Dashboard del tenant (o globales si owner_id es None), mantenidos por triggers:
+        {"jobs_by_status": {...}, "leads_by_city": {...}, "leads_by_segment": {...}}.
+        Dos lecturas por PK (una por base); el costo no crece con el historial.
+        """
+        scope = GLOBAL_STATS_SCOPE if owner_id is None else owner_id
+        stats: Dict[str, Dict[str, int]] = {"jobs_by_status": {}, "leads_by_city": {}, "leads_by_segment": {}}
+        sql = "SELECT metric, key, value FROM stats_counters WHERE scope = ? AND value != 0"
+
+        with _db() as conn:
+            rows = conn.execute(sql, (scope,)).fetchall()
+        if os.path.exists(LEADS_DB_PATH):
+            with _leads_db() as conn:
+                rows += conn.execute(sql, (scope,)).fetchall()
+        for metric, key, value in rows:
+            stats.setdefault(metric, {})[key] = value
+        return stats
+
+    @staticmethod
+    def rebuild_stats():
+        """Recalcula los contadores desde batch_jobs, leads y job_leads (`manage rebuild-stats`)."""
+        with _db_transaction() as conn:
+            rebuild_main_stats(conn)
+        if os.path.exists(LEADS_DB_PATH):
+            ensure_schema(LEADS_DB_PATH, LEADS_MIGRATIONS)
+            with transaction(LEADS_DB_PATH) as conn:
+                rebuild_leads_stats(conn)
+
+    @staticmethod
+    def count_pending_jobs() -> int:
+        """Profundidad de la cola (métrica jobs_queue_depth): una lectura por PK del contador global de stats_counters."""
+        with _db() as conn:
+            row = conn.execute(
+                "SELECT value FROM stats_counters WHERE scope = ? AND metric = 'jobs_by_status' AND key = 'pending'",
+                (GLOBAL_STATS_SCOPE,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def get_tenant_quota(owner_id: str) -> dict:
+        """
+        Cuotas efectivas del tenant, las sobrescritas en tenant_quotas (None = default) y su consumo:
+        Jobs pending/processing y tokens disponibles del bucket de jobs_per_hour.
+        """
+        with _db() as conn:
+            quota = _tenant_quota(conn, owner_id)
+            row = conn.execute(
+                "SELECT jobs_per_hour, max_pending, max_processing FROM tenant_quotas WHERE owner_id = ?", (owner_id,)
+            ).fetchone() or (None, None, None)
+            usage = {
+                "pending": _owner_jobs_by_status(conn, owner_id, "pending"),
+                "processing": _owner_jobs_by_status(conn, owner_id, "processing"),
+                "tokens": _bucket_tokens(conn, owner_id, quota["jobs_per_hour"], time.time())
+                          if quota["jobs_per_hour"] else None,
+            }
+        return {"owner_id": owner_id, **quota, "overrides": dict(zip(QUOTA_FIELDS, row)), "usage": usage}
+
+    @staticmethod
+    def set_tenant_quota(owner_id: str, jobs_per_hour: Optional[int] = None, max_pending: Optional[int] = None,
+                         max_processing: Optional[int] = None):
+        """Sobrescribe las cuotas del tenant; None deja ese campo en el default de config (todo None borra la fila)."""
+        with _db() as conn:
+            if jobs_per_hour is None and max_pending is None and max_processing is None:
+                conn.execute("DELETE FROM tenant_quotas WHERE owner_id = ?", (owner_id,))
+                return
+            conn.execute('''
+                INSERT INTO tenant_quotas (owner_id, jobs_per_hour, max_pending, max_processing) VALUES (?, ?, ?, ?)
+                ON CONFLICT(owner_id) DO UPDATE SET jobs_per_hour = excluded.jobs_per_hour,
+                    max_pending = excluded.max_pending, max_processing = excluded.max_processing
+            ''', (owner_id, jobs_per_hour, max_pending, max_processing))
 
     @staticmethod
     def set_worker_heartbeat():
         """Actualiza el timestamp del worker para monitoreo de salud."""
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO worker_config (key, value) VALUES ('last_heartbeat', CURRENT_TIMESTAMP)
                 ON CONFLICT(key) DO UPDATE SET value=CURRENT_TIMESTAMP
             ''')
-            conn.commit()
 
     @staticmethod
     def get_worker_health() -> dict:
         """Calcula el estado del worker basado en el último heartbeat."""
-        with sqlite3.connect(DB_PATH) as conn:
+        with _db() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT value FROM worker_config WHERE key = 'last_heartbeat'")
             row = cursor.fetchone()
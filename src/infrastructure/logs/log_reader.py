@@ -0,0 +1,334 @@
+"""
+Lectura eficiente de los logs de start_dev.sh (logs/[YYYY-MM-DD_HH-MM-SS] [COMPONENTE].log) para el panel de Admin.
+
+- Nunca carga un archivo completo: tail() lee bloques desde el final hacia atrás (seek) y se
+  detiene al juntar `limit` entradas, al salir del rango de tiempo o al agotar el presupuesto de
+  bytes por request; lo que falta se pide con el cursor `next_before`.
+- Varios archivos (componentes y corridas anteriores) se mezclan por timestamp. Un archivo entra a la
+  mezcla solo cuando la frontera de tiempo alcanza su última escritura (mtime), así que las corridas
+  viejas ni se abren mientras no se pagine hasta ellas.
+- Las líneas sin timestamp (tracebacks, prints) son continuación de la entrada anterior.
+- El formato [ts] [COMP] mensaje no lleva nivel: se infiere de las convenciones de los mensajes
+  (❌ error, ⚠️ advertencia). Las líneas JSON (LOG_FORMAT=json) traen nivel y traceback propios.
+- LogFollower lee solo los bytes nuevos de la corrida actual de cada componente (stream SSE).
+"""
+import base64
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.core.config import LOG_TAIL_SCAN_LIMIT_BYTES
+
+READ_BLOCK_BYTES = 64 * 1024
+# Un traceback larguísimo no debe inflar una entrada: se conservan sus últimas líneas (las más útiles)
+MAX_CONTINUATION_LINES = 50
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+LOG_FILE_PATTERN = re.compile(r"^\[(?P<started>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\] \[(?P<component>[A-Z_]+)\]\.log$")
+LOG_LINE_PATTERN = re.compile(r"^\[(?P<time>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] \[(?P<component>[A-Z_]+)\] ?(?P<message>.*)$")
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+_ERROR_MARKERS = ("❌", "Traceback (most recent call last)", "ERROR", "CRITICAL")
+_WARNING_MARKERS = ("⚠️", "WARNING")
+
+
+@dataclass(frozen=True)
+class LogFile:
+    name: str
+    path: str
+    component: str
+    started: str     # TIME_FORMAT, del nombre del archivo (inicio de la corrida)
+    last_write: str  # TIME_FORMAT, del mtime (ninguna entrada es posterior)
+    size: int
+
+    def as_dict(self) -> dict:
+        return {"name": self.name, "component": self.component, "started": self.started,
+                "last_write": self.last_write, "size": self.size}
+
+
+def list_log_files(logs_dir: str, component: Optional[str] = None) -> List[LogFile]:
+    """Archivos de log del directorio (opcionalmente de un componente), del más reciente al más antiguo."""
+    if not os.path.isdir(logs_dir):
+        return []
+    files = []
+    with os.scandir(logs_dir) as entries:
+        for entry in entries:
+            match = LOG_FILE_PATTERN.match(entry.name)
+            if match is None or not entry.is_file():
+                continue
+            if component and match.group("component") != component:
+                continue
+            stat = entry.stat()
+            started = datetime.strptime(match.group("started"), "%Y-%m-%d_%H-%M-%S").strftime(TIME_FORMAT)
+            files.append(LogFile(
+                name=entry.name, path=entry.path, component=match.group("component"), started=started,
+                last_write=datetime.fromtimestamp(stat.st_mtime).strftime(TIME_FORMAT), size=stat.st_size,
+            ))
+    files.sort(key=lambda f: (f.started, f.name), reverse=True)
+    return files
+
+
+def infer_level(message: str) -> str:
+    if any(marker in message for marker in _ERROR_MARKERS):
+        return "ERROR"
+    if any(marker in message for marker in _WARNING_MARKERS):
+        return "WARNING"
+    return "INFO"
+
+
+def read_lines_reverse(path: str, end: Optional[int] = None, block_size: int = READ_BLOCK_BYTES) -> Iterator[Tuple[int, bytes]]:
+    """
+    (offset, línea) desde `end` (o el final del archivo) hacia el inicio.
+    Memoria acotada por block_size más la línea más larga.
+    """
+    with open(path, "rb") as f:
+        if end is None:
+            end = f.seek(0, os.SEEK_END)
+        position = end
+        remainder = b""
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b"\n")
+            # La primera puede estar cortada por el bloque: se completa con el siguiente
+            remainder = lines.pop(0)
+            start = position + len(remainder) + 1
+            starts = []
+            for line in lines:
+                starts.append(start)
+                start += len(line) + 1
+            for start, line in zip(reversed(starts), reversed(lines)):
+                yield start, line
+        yield 0, remainder
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def _parse_line(text: str) -> Optional[Tuple[str, str, Optional[str]]]:
+    """(time, mensaje, nivel | None) de una línea con formato, o None si es continuación."""
+    if text.startswith("{"):
+        try:
+            record = json.loads(text)
+            message = record["message"]
+            if record.get("exc"):
+                message = f"{message}\n{record['exc']}"
+            return record["time"], message, record.get("level")
+        except (ValueError, KeyError, TypeError):
+            return None
+    match = LOG_LINE_PATTERN.match(text)
+    if match is None:
+        return None
+    return match.group("time"), match.group("message"), None
+
+
+def _entry(log_file: LogFile, offset: int, header: Tuple[str, str, Optional[str]], continuation: List[str]) -> dict:
+    time, message, level = header
+    if continuation:
+        message = "\n".join([message, *continuation])
+    if level not in LEVELS:
+        level = "ERROR" if level == "CRITICAL" else infer_level(message)
+    return {"time": time, "component": log_file.component, "level": level,
+            "message": message, "file": log_file.name, "offset": offset}
+
+
+def read_entries_reverse(log_file: LogFile, end: Optional[int] = None) -> Iterator[dict]:
+    """Entradas del archivo de la más reciente a la más antigua, a partir del offset `end`."""
+    continuation: List[str] = []
+    truncated = False
+    for offset, raw in read_lines_reverse(log_file.path, end):
+        text = _decode(raw)
+        if not text.strip():
+            continue
+        header = _parse_line(text)
+        if header is None:
+            # Se recorren de abajo hacia arriba: las primeras vistas son las últimas del bloque
+            if len(continuation) < MAX_CONTINUATION_LINES:
+                continuation.insert(0, text)
+            else:
+                truncated = True
+            continue
+        if truncated:
+            continuation.insert(0, "…")
+        yield _entry(log_file, offset, header, continuation)
+        continuation, truncated = [], False
+    if continuation:
+        # Salida previa al primer log con formato (ej. errores de import al arrancar)
+        yield _entry(log_file, 0, (log_file.started, continuation[0], None), continuation[1:])
+
+
+def _matches(entry: dict, min_level: Optional[str], query: Optional[str]) -> bool:
+    if min_level and LEVELS[entry["level"]] < LEVELS[min_level]:
+        return False
+    if query and query.lower() not in entry["message"].lower():
+        return False
+    return True
+
+
+def encode_cursor(positions: Dict[str, int]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(positions, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, int]:
+    """Lanza ValueError si el cursor no es uno emitido por tail()."""
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(positions, dict) or not all(isinstance(v, int) and v >= 0 for v in positions.values()):
+        raise ValueError("Cursor inválido")
+    return positions
+
+
+def tail(logs_dir: str, component: Optional[str] = None, min_level: Optional[str] = None,
+         since: Optional[datetime] = None, until: Optional[datetime] = None, query: Optional[str] = None,
+         limit: int = 200, before: Optional[str] = None, max_scan_bytes: int = LOG_TAIL_SCAN_LIMIT_BYTES) -> dict:
+    """
+    Últimas `limit` entradas que cumplen los filtros, de la más reciente a la más antigua:
+    {"entries": [...], "next_before": cursor | None}. next_before continúa hacia atrás desde
+    donde se quedó el recorrido (también si se agotó max_scan_bytes sin llenar la página).
+    """
+    since_text = since.strftime(TIME_FORMAT) if since else None
+    until_text = until.strftime(TIME_FORMAT) if until else None
+    cursor = decode_cursor(before) if before else None
+
+    files = []
+    ends: Dict[str, int] = {}
+    for log_file in list_log_files(logs_dir, component):
+        if cursor is not None and log_file.name not in cursor:
+            # Corrida creada después de la primera página
+            continue
+        if since_text and log_file.last_write < since_text:
+            continue
+        if until_text and log_file.started > until_text:
+            continue
+        ends[log_file.name] = min(cursor[log_file.name], log_file.size) if cursor is not None else log_file.size
+        files.append(log_file)
+
+    # Se admiten a la mezcla por última escritura: ninguna entrada de un archivo pendiente es posterior a su mtime
+    pending = sorted(files, key=lambda f: f.last_write, reverse=True)
+    heads: List[Tuple[dict, Iterator[dict]]] = []
+    positions = dict(ends)
+    entries: List[dict] = []
+    exhausted = False
+
+    while True:
+        while pending and (not heads or pending[0].last_write >= max(h[0]["time"] for h in heads)):
+            log_file = pending.pop(0)
+            iterator = read_entries_reverse(log_file, ends[log_file.name])
+            first = next(iterator, None)
+            if first is None:
+                positions[log_file.name] = 0
+            else:
+                heads.append((first, iterator))
+        if not heads:
+            exhausted = True
+            break
+
+        index = max(range(len(heads)), key=lambda i: heads[i][0]["time"])
+        entry, iterator = heads[index]
+        following = next(iterator, None)
+        if following is None:
+            heads.pop(index)
+        else:
+            heads[index] = (following, iterator)
+
+        if since_text and entry["time"] < since_text:
+            # Orden descendente: todo lo que sigue es anterior al rango
+            exhausted = True
+            break
+        positions[entry["file"]] = entry["offset"]
+        if (until_text is None or entry["time"] <= until_text) and _matches(entry, min_level, query):
+            entries.append(entry)
+            if len(entries) >= limit:
+                break
+        if sum(ends[name] - offset for name, offset in positions.items()) >= max_scan_bytes:
+            break
+
+    if not exhausted and any(positions.values()):
+        next_before = encode_cursor(positions)
+    else:
+        next_before = None
+    return {"entries": entries, "next_before": next_before}
+
+
+class LogFollower:
+    """
+    Sigue la corrida más reciente de cada componente (como tail -f) leyendo solo los bytes nuevos.
+    start() se posiciona al final; poll() devuelve las entradas completas escritas desde entonces.
+    Una corrida nueva (reinicio de start_dev.sh) se sigue desde su inicio; un archivo truncado, también.
+    """
+
+    def __init__(self, logs_dir: str, component: Optional[str] = None, min_level: Optional[str] = None,
+                 query: Optional[str] = None, max_read_bytes: int = 1024 * 1024):
+        self.logs_dir = logs_dir
+        self.component = component
+        self.min_level = min_level
+        self.query = query
+        self.max_read_bytes = max_read_bytes
+        self._offsets: Dict[str, int] = {}
+
+    def _current_files(self) -> List[LogFile]:
+        latest: Dict[str, LogFile] = {}
+        for log_file in list_log_files(self.logs_dir, self.component):
+            latest.setdefault(log_file.component, log_file)
+        return list(latest.values())
+
+    def start(self):
+        self._offsets = {f.path: f.size for f in self._current_files()}
+
+    def poll(self) -> List[dict]:
+        entries: List[dict] = []
+        for log_file in self._current_files():
+            offset = self._offsets.get(log_file.path, 0)
+            if log_file.size < offset:
+                offset = 0
+            if log_file.size == offset:
+                self._offsets[log_file.path] = offset
+                continue
+            with open(log_file.path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read(min(log_file.size - offset, self.max_read_bytes))
+            # Solo líneas completas: la última puede estar escribiéndose
+            complete = chunk.rfind(b"\n") + 1
+            if complete == 0 and len(chunk) < self.max_read_bytes:
+                self._offsets[log_file.path] = offset
+                continue
+            if complete == 0:
+                complete = len(chunk)
+            self._offsets[log_file.path] = offset + complete
+            entries.extend(self._parse(log_file, offset, chunk[:complete]))
+        entries.sort(key=lambda e: e["time"])
+        return [e for e in entries if _matches(e, self.min_level, self.query)]
+
+    @staticmethod
+    def _parse(log_file: LogFile, offset: int, chunk: bytes) -> List[dict]:
+        entries: List[dict] = []
+        header_offset = 0
+        header: Optional[Tuple[str, str, Optional[str]]] = None
+        continuation: List[str] = []
+        for raw in chunk.split(b"\n"):
+            line_offset = offset
+            offset += len(raw) + 1
+            text = _decode(raw)
+            if not text.strip():
+                continue
+            parsed = _parse_line(text)
+            if parsed is None and header is not None and len(continuation) < MAX_CONTINUATION_LINES:
+                continuation.append(text)
+                continue
+            if header is not None:
+                entries.append(_entry(log_file, header_offset, header, continuation))
+            if parsed is None:
+                # Continuación de una entrada ya enviada: se envía sola con la hora de la anterior
+                time = entries[-1]["time"] if entries else log_file.last_write
+                parsed = (time, text, None)
+            header_offset, header, continuation = line_offset, parsed, []
+        if header is not None:
+            entries.append(_entry(log_file, header_offset, header, continuation))
+        return entries
@@ -1,23 +1,131 @@
-from fastapi import APIRouter, Depends
+import json
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from src.presentation.api.auth import get_current_user
+from src.core.config import JOB_EVENTS_KEEPALIVE_SECONDS, LOG_FOLLOW_POLL_SECONDS, LOGS_DIR
+from src.domain.models import TenantQuota
 from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
+from src.infrastructure.logs.log_reader import LogFollower, list_log_files, tail
 
 router = APIRouter(prefix="/api/admin", tags=["Admin Worker Switch"])
 
+LOG_COMPONENT_PATTERN = "^[A-Z_]+$"
+LOG_LEVEL_PATTERN = "^(DEBUG|INFO|WARNING|ERROR)$"
+
 class WorkerToggle(BaseModel):
     is_enabled: bool
 
+class LogEntry(BaseModel):
+    time: str
+    component: str
+    level: str
+    message: str
+    file: str
+    offset: int
+
+class LogPage(BaseModel):
+    entries: List[LogEntry]
+    next_before: Optional[str] = None
+
+def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return current_user
+
 @router.get("/worker")
 async def get_worker_status(current_user: dict = Depends(get_current_user)):
-    return {"is_enabled": StorageService.get_worker_enabled()}
+    return {"is_enabled": await run_db(StorageService.get_worker_enabled)}
 
 @router.patch("/worker")
 async def set_worker_status(payload: WorkerToggle, current_user: dict = Depends(get_current_user)):
-    StorageService.set_worker_enabled(payload.is_enabled)
+    await run_db(StorageService.set_worker_enabled, payload.is_enabled)
     return {"is_enabled": payload.is_enabled, "message": "Worker configuration updated"}
 
 @router.get("/worker/health")
 async def get_worker_health(current_user: dict = Depends(get_current_user)):
     """Devuelve el estado de vida (heartbeat) del worker."""
-    return StorageService.get_worker_health()
+    return await run_db(StorageService.get_worker_health)
+
+@router.get("/quotas/{owner_id}")
+async def get_tenant_quota(owner_id: str, current_user: dict = Depends(require_admin)):
+    """Effective job quotas of a tenant, its overrides (null = config default) and current usage."""
+    return await run_db(StorageService.get_tenant_quota, owner_id)
+
+@router.put("/quotas/{owner_id}")
+async def set_tenant_quota(owner_id: str, payload: TenantQuota, current_user: dict = Depends(require_admin)):
+    """Overrides a tenant's job quotas; null fields fall back to the config default and 0 means unlimited."""
+    await run_db(StorageService.set_tenant_quota, owner_id, **payload.model_dump())
+    return await run_db(StorageService.get_tenant_quota, owner_id)
+
+@router.get("/logs/files")
+async def get_log_files(current_user: dict = Depends(require_admin)):
+    """Log files written by start_dev.sh, newest run first (component, start time, size)."""
+    files = await asyncio.to_thread(list_log_files, LOGS_DIR)
+    return [f.as_dict() for f in files]
+
+@router.get("/logs", response_model=LogPage)
+async def get_logs(
+    component: Optional[str] = Query(None, pattern=LOG_COMPONENT_PATTERN),
+    level: Optional[str] = Query(None, pattern=LOG_LEVEL_PATTERN),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    q: Optional[str] = Query(None, min_length=1, max_length=200),
+    limit: int = Query(200, ge=1, le=1000),
+    before: Optional[str] = None,
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Newest log entries first, read backwards from the end of the files (never loaded whole).
+    `level` is a minimum level; `since`/`until` are server-local times; `q` is a case-insensitive substring.
+    Pass `next_before` back as `before` to page further into the past.
+    """
+    try:
+        return await asyncio.to_thread(
+            tail, LOGS_DIR, component=component, min_level=level, since=since, until=until,
+            query=q, limit=limit, before=before,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/logs/stream")
+async def stream_logs(
+    component: Optional[str] = Query(None, pattern=LOG_COMPONENT_PATTERN),
+    level: Optional[str] = Query(None, pattern=LOG_LEVEL_PATTERN),
+    q: Optional[str] = Query(None, min_length=1, max_length=200),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Server-sent `log` events with new entries of the current run of each component (like `tail -f`).
+    Load the history with GET /api/admin/logs first; the stream starts at the end of the files.
+    """
+    follower = LogFollower(LOGS_DIR, component=component, min_level=level, query=q)
+    await asyncio.to_thread(follower.start)
+
+    async def events():
+        yield "retry: 3000\n\n"
+        idle = 0.0
+        while True:
+            entries = await asyncio.to_thread(follower.poll)
+            for entry in entries:
+                yield f"event: log\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+            if entries:
+                idle = 0.0
+                continue
+            await asyncio.sleep(LOG_FOLLOW_POLL_SECONDS)
+            idle += LOG_FOLLOW_POLL_SECONDS
+            if idle >= JOB_EVENTS_KEEPALIVE_SECONDS:
+                idle = 0.0
+                # Comment line: keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
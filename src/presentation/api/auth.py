@@ -1,5 +1,8 @@
 import jwt
-import random
+import hmac
+import time
+import hashlib
+import secrets
 from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -7,16 +10,19 @@ from pydantic import BaseModel
 from telegram import Bot
 
 import logging
-from src.core.config import JWT_SECRET, TELEGRAM_BOT_TOKEN
+from src.core.config import JWT_SECRET, TELEGRAM_BOT_TOKEN, OTP_TTL_SECONDS, OTP_MAX_ATTEMPTS, OTP_RESEND_SECONDS
 from src.core.security import es_usuario_permitido
+from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth", tags=["Auth"])
 security = HTTPBearer()
 
-# In-memory store for OTPs (For production, use Redis or SQLite)
-otp_store = {}
+def _otp_hash(chat_id: str, code: str) -> str:
+    # OTPs live in SQLite (auth_otps) so any API worker process can verify them; only a keyed hash is stored
+    return hmac.new(JWT_SECRET.encode(), f"{chat_id}:{code}".encode(), hashlib.sha256).hexdigest()
 
 class OTPRequest(BaseModel):
     chat_id: str
@@ -35,12 +41,17 @@ async def request_otp(data: OTPRequest):
         raise HTTPException(status_code=403, detail="Chat ID not authorized in Bastion Core")
 
     # Generate 4-digit numeric code
-    code = f"{random.randint(1000, 9999)}"
+    code = f"{secrets.randbelow(9000) + 1000}"
     
-    otp_store[chat_id_clean] = {
-        "code": code,
-        "expires_at": datetime.now(timezone.utc) + timedelta(minutes=5)
-    }
+    stored = await run_db(
+        StorageService.save_otp, chat_id_clean, _otp_hash(chat_id_clean, code),
+        OTP_TTL_SECONDS, OTP_RESEND_SECONDS, time.time()
+    )
+    if not stored:
+        raise HTTPException(
+            status_code=429, detail="A code was just sent. Wait before requesting another one.",
+            headers={"Retry-After": str(OTP_RESEND_SECONDS)}
+        )
     
     # Dispatch code via Telegram Bot
     bot = Bot(token=TELEGRAM_BOT_TOKEN)
@@ -48,25 +59,29 @@ async def request_otp(data: OTPRequest):
         logger.info(f"🧪 [DEBUG TEST] OTP Generado para [{chat_id_clean}]: {code}")
         await bot.send_message(
             chat_id=chat_id_clean, 
-            text=f"🔐 Tu código de acceso a Bastion Core Dashboard es: *{code}*\n\nExpirará en 5 minutos.",
+            text=f"🔐 Tu código de acceso a Bastion Core Dashboard es: *{code}*\n\nExpirará en {OTP_TTL_SECONDS // 60} minutos.",
             parse_mode="Markdown"
         )
         return {"msg": "OTP sent successfully"}
     except Exception as e:
+        # Undelivered code: let the user request a new one right away
+        await run_db(StorageService.delete_otp, chat_id_clean)
         raise HTTPException(status_code=400, detail=f"Failed to send Telegram message: {str(e)}")
 
 @router.post("/verify-otp")
 async def verify_otp(data: OTPVerify):
     chat_id_clean = data.chat_id.strip()
-    if chat_id_clean not in otp_store:
+    result = await run_db(
+        StorageService.consume_otp, chat_id_clean, _otp_hash(chat_id_clean, data.code.strip()),
+        OTP_MAX_ATTEMPTS, time.time()
+    )
+    if result == "missing":
         raise HTTPException(status_code=400, detail="OTP not requested or expired")
-        
-    store_data = otp_store[chat_id_clean]
-    if datetime.now(timezone.utc) > store_data["expires_at"]:
-        del otp_store[chat_id_clean]
+    if result == "expired":
         raise HTTPException(status_code=400, detail="OTP expired")
-        
-    if store_data["code"] != data.code:
+    if result == "locked":
+        raise HTTPException(status_code=429, detail="Too many invalid attempts. Request a new code.")
+    if result != "ok":
         raise HTTPException(status_code=400, detail="Invalid OTP code")
         
     # Evaluate proper RBAC using the strict security rules
@@ -79,8 +94,6 @@ async def verify_otp(data: OTPVerify):
         "exp": datetime.now(timezone.utc) + timedelta(days=7) # Maintain session for 7 days
     }
     token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
-    
-    del otp_store[data.chat_id]
     return {"token": token}
 
 # Dependency for checking auth and extracting tenant from valid JWT
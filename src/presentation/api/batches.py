@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import List, Optional
+
+from src.presentation.api.auth import get_current_user
+from src.domain.models import Batch
+from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
+from src.presentation.api.pagination import decode_cursor, set_next_cursor
+
+router = APIRouter(prefix="/api/batches", tags=["Batches"])
+
+@router.get("", response_model=List[Batch])
+async def get_batches(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Returns the tenant's batches, newest first, with their aggregate counters.
+    Pass the X-Next-Cursor header of a full page as ?cursor= to fetch the next one.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    after = decode_cursor(cursor, 2)
+    batches = await run_db(StorageService.get_batches, owner_id=owner_id, limit=limit, after=after)
+    set_next_cursor(response, batches, limit, ("created_at", "id"))
+    return [Batch(**batch) for batch in batches]
+
+@router.get("/{batch_id}", response_model=Batch)
+async def get_batch(batch_id: int, current_user: dict = Depends(get_current_user)):
+    """
+    Returns one batch rollup (e.g. 212/300 completed, 14 failed) without reading its jobs.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    batch = await run_db(StorageService.get_batch, batch_id=batch_id, owner_id=owner_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return Batch(**batch)
+
+@router.patch("/{batch_id}/cancel")
+async def cancel_batch(batch_id: int, current_user: dict = Depends(get_current_user)):
+    """
+    Cancels every pending/processing job of the batch.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if not await run_db(StorageService.get_batch, batch_id=batch_id, owner_id=owner_id):
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    count = await run_db(StorageService.cancel_jobs, owner_id=owner_id, batch_id=batch_id)
+    return {"message": f"{count} Jobs cancelled", "cancelled": count}
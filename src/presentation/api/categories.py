@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from typing import List, Optional
 from pydantic import BaseModel
 
 from src.presentation.api.auth import get_current_user
 from src.domain.models import MasterCategory
 from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
+from src.presentation.api.pagination import decode_cursor, set_next_cursor
+from src.presentation.api.http_cache import catalog_not_modified
 
 router = APIRouter(prefix="/api/categories", tags=["Master Categories"])
 
@@ -12,17 +15,31 @@ class CategoryCreate(BaseModel):
     name: str
 
 @router.get("", response_model=List[MasterCategory])
-async def get_categories(limit: int = 100, offset: int = 0, current_user: dict = Depends(get_current_user)):
+async def get_categories(
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Returns categories from the global Master Catalog.
+    Returns categories from the global Master Catalog, ordered by name.
+    Pass the X-Next-Cursor header of a full page as ?cursor= to fetch the next one.
     """
     owner_id = current_user.get("sub")
     if not owner_id:
         raise HTTPException(status_code=401, detail="Invalid token")
-        
-    categories_dict = StorageService.get_categories()
-    # Apply pagination in-memory for the global catalog
-    return [MasterCategory(**cat) for cat in categories_dict[offset:offset+limit]]
+
+    after = decode_cursor(cursor, 2)
+    version = await run_db(StorageService.get_catalog_version)
+    not_modified = catalog_not_modified(request, response, version, private=True)
+    if not_modified is not None:
+        return not_modified
+    keyset = {"after": after} if after is not None else {}
+    categories_dict = await run_db(StorageService.get_categories, limit=limit, offset=offset, **keyset)
+    set_next_cursor(response, categories_dict, limit, ("name", "id"))
+    return [MasterCategory(**cat) for cat in categories_dict]
 
 @router.post("", response_model=MasterCategory)
 async def create_category(category: CategoryCreate, current_user: dict = Depends(get_current_user)):
@@ -33,7 +50,7 @@ async def create_category(category: CategoryCreate, current_user: dict = Depends
     if not owner_id:
         raise HTTPException(status_code=401, detail="Invalid token")
         
-    cat_id = StorageService.create_category(name=category.name)
+    cat_id = await run_db(StorageService.create_category, name=category.name)
     return MasterCategory(id=cat_id, name=category.name)
 
 @router.put("/{category_id}", response_model=MasterCategory)
@@ -0,0 +1,39 @@
+"""
+HTTP revalidation for the master catalog endpoints.
+
+Every catalog response carries an ETag derived from catalog_version (bumped by any catalog write)
+and `Cache-Control: no-cache`, so the browser keeps the body and revalidates with If-None-Match.
+An unchanged catalog answers 304 without building the list.
+"""
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def catalog_etag(version: int) -> str:
+    # Weak: the same version may be served gzip-encoded or not
+    return f'W/"catalog-{version}"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:]
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def catalog_not_modified(request: Request, response: Response, version: int, private: bool = False) -> Optional[Response]:
+    """
+    Sets ETag/Cache-Control on `response`. Returns a ready 304 when the client already has this
+    version (the endpoint should return it as-is), otherwise None.
+    """
+    headers = {
+        "ETag": catalog_etag(version),
+        "Cache-Control": "private, no-cache" if private else "public, no-cache",
+    }
+    if _matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import math
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel, model_validator
 from datetime import datetime
 
 from src.presentation.api.auth import get_current_user
-from src.domain.models import BatchJob, JobStatus
+from src.domain.models import BatchJob, JobStatus, JobProgress, QuotaExceeded
 from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
+from src.presentation.api.pagination import decode_cursor, set_next_cursor
+from src.application.batch_jobs.job_events import job_event_broker
+from src.core.config import JOB_EVENTS_KEEPALIVE_SECONDS
 
 router = APIRouter(prefix="/api/jobs", tags=["Batch Jobs"])
 
@@ -14,6 +22,7 @@ class JobCreate(BaseModel):
     city_id: Optional[int] = None
     categoria_text: Optional[str] = None
     zona_text: Optional[str] = None
+    force_refresh: bool = False
 
     @model_validator(mode='after')
     def check_category_exists(self) -> 'JobCreate':
@@ -25,6 +34,7 @@ class JobCreate(BaseModel):
 class BatchJobView(BatchJob):
     category_name: Optional[str] = "Unknown"
     city_name: Optional[str] = "Unknown"
+    progress: Optional[JobProgress] = None
 
     @model_validator(mode='after')
     def resolve_hybrid_names(self):
@@ -45,20 +55,99 @@ class BatchJobView(BatchJob):
 
 @router.get("", response_model=List[BatchJobView])
 async def get_jobs(
+    response: Response,
     limit: int = 50, 
     offset: int = 0, 
+    cursor: Optional[str] = None,
+    status: Optional[JobStatus] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Returns batch jobs scoped to the currently authenticated tenant with pagination.
+    Returns batch jobs scoped to the currently authenticated tenant, newest first.
+    Pass the X-Next-Cursor header of a full page as ?cursor= to fetch the next one (offset is kept for older clients).
     """
     owner_id = current_user.get("sub")
     if not owner_id:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    filters = {}
+    after = decode_cursor(cursor, 2)
+    if after is not None:
+        filters["after"] = after
+    if status is not None:
+        filters["status"] = status.value
         
-    jobs_dict = StorageService.get_jobs(owner_id=owner_id, limit=limit, offset=offset)
+    jobs_dict = await run_db(StorageService.get_jobs, owner_id=owner_id, limit=limit, offset=offset, **filters)
+    set_next_cursor(response, jobs_dict, limit, ("created_at", "id"))
     return [BatchJobView(**job) for job in jobs_dict]
 
+MAX_PROGRESS_IDS = 200
+
+@router.get("/progress", response_model=List[JobProgress])
+async def get_jobs_progress(ids: str, current_user: dict = Depends(get_current_user)):
+    """
+    Bulk progress for the jobs list page: /api/jobs/progress?ids=1,2,3
+    Only returns rows for jobs owned by the tenant; jobs without progress yet are omitted.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        job_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if len(job_ids) > MAX_PROGRESS_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PROGRESS_IDS} ids per request")
+
+    rows = await run_db(StorageService.get_jobs_progress, owner_id=owner_id, job_ids=job_ids)
+    return [JobProgress(**row) for row in rows]
+
+# Browser EventSource reconnect delay after the stream drops
+SSE_RETRY_MS = 3000
+
+def _sse(event: dict) -> str:
+    data = json.dumps({"job_id": event["job_id"], **event["payload"], "at": event.get("created_at")})
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+@router.get("/events")
+async def stream_job_events(
+    job_id: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Server-sent events with the tenant's job status transitions (`status`) and live counters (`progress`),
+    optionally for a single job. Replaces polling /api/jobs and /api/jobs/{id}.
+    Reconnections send Last-Event-ID and receive the missed events; a `reset` event means the client
+    fell too far behind and must reload the full state.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    async def events():
+        async with job_event_broker.subscribe(owner_id, last_event_id) as queue:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=JOB_EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line: keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                if job_id is None or event["job_id"] == job_id:
+                    yield _sse(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/{job_id}", response_model=BatchJobView)
 async def get_job(job_id: int, current_user: dict = Depends(get_current_user)):
     """
@@ -68,7 +157,7 @@ async def get_job(job_id: int, current_user: dict = Depends(get_current_user)):
     if not owner_id:
         raise HTTPException(status_code=401, detail="Invalid token")
         
-    job_dict = StorageService.get_job_by_id(job_id=job_id, owner_id=owner_id)
+    job_dict = await run_db(StorageService.get_job_by_id, job_id=job_id, owner_id=owner_id)
     if not job_dict:
         raise HTTPException(status_code=404, detail="Job not found")
         
@@ -77,23 +166,73 @@ async def get_job(job_id: int, current_user: dict = Depends(get_current_user)):
 @router.patch("/{job_id}/retry")
 async def retry_job(job_id: int, current_user: dict = Depends(get_current_user)):
     """
-    Resets a failed job to pending status.
+    Resets a failed or cancelled job to pending status.
     """
     owner_id = current_user.get("sub")
     if not owner_id:
         raise HTTPException(status_code=401, detail="Invalid token")
         
     # Primero verificamos que el job le pertenezca al usuario
-    job = StorageService.get_job_by_id(job_id, owner_id)
+    job = await run_db(StorageService.get_job_by_id, job_id, owner_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found or unauthorized")
         
-    success = StorageService.retry_job(job_id)
-    if not success:
-        return {"message": "Job rescheduled for processing"} # Si rowcount fue 0 es porque ya estaba pending o no cambió
-    
+    try:
+        retried = await run_db(StorageService.retry_job, job_id, owner_id)
+    except QuotaExceeded as e:
+        raise quota_exceeded_error(e)
+    if not retried:
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+
     return {"message": "Job rescheduled for processing"}
 
+class JobsCancel(BaseModel):
+    job_ids: Optional[List[int]] = None
+    all_active: bool = False
+
+    @model_validator(mode='after')
+    def check_target(self) -> 'JobsCancel':
+        if not self.job_ids and not self.all_active:
+            raise ValueError("Debe proporcionar job_ids o all_active=true.")
+        return self
+
+@router.patch("/cancel")
+async def cancel_jobs(payload: JobsCancel, current_user: dict = Depends(get_current_user)):
+    """
+    Bulk cancel: the given job_ids, or every pending/processing job of the tenant (all_active=true).
+    Pending jobs leave the queue immediately; running ones stop at the worker's next check.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    job_ids = None if payload.all_active else payload.job_ids
+    count = await run_db(StorageService.cancel_jobs, owner_id=owner_id, job_ids=job_ids)
+    return {"message": f"{count} Jobs cancelled", "cancelled": count}
+
+@router.patch("/{job_id}/cancel")
+async def cancel_job(job_id: int, current_user: dict = Depends(get_current_user)):
+    """
+    Cancels a pending or running job. The worker stops between listings and frees the browser.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    job = await run_db(StorageService.get_job_by_id, job_id, owner_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or unauthorized")
+
+    if not await run_db(StorageService.cancel_jobs, owner_id=owner_id, job_ids=[job_id]):
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+
+    return {"message": "Job cancelled"}
+
+def quota_exceeded_error(e: QuotaExceeded) -> HTTPException:
+    """429 for a tenant over its job quota; Retry-After only when waiting can actually help."""
+    headers = None if e.retry_after is None else {"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    return HTTPException(status_code=429, detail=str(e), headers=headers)
+
 @router.post("", response_model=BatchJob)
 async def create_job(job: JobCreate, current_user: dict = Depends(get_current_user)):
     """
@@ -103,13 +242,17 @@ async def create_job(job: JobCreate, current_user: dict = Depends(get_current_us
     if not owner_id:
         raise HTTPException(status_code=401, detail="Invalid token")
         
-    job_id = StorageService.create_hybrid_job(
-        category_id=job.category_id, 
-        categoria_text=job.categoria_text,
-        city_id=job.city_id,
-        zona_text=job.zona_text,
-        owner_id=owner_id
-    )
+    try:
+        job_id = await run_db(StorageService.create_hybrid_job,
+            category_id=job.category_id, 
+            categoria_text=job.categoria_text,
+            city_id=job.city_id,
+            zona_text=job.zona_text,
+            owner_id=owner_id,
+            force_refresh=job.force_refresh
+        )
+    except QuotaExceeded as e:
+        raise quota_exceeded_error(e)
     
     return BatchJob(
         id=job_id, 
@@ -118,7 +261,8 @@ async def create_job(job: JobCreate, current_user: dict = Depends(get_current_us
         city_id=job.city_id, 
         zona_text=job.zona_text,
         owner_id=owner_id,
-        status=JobStatus.PENDING
+        status=JobStatus.PENDING,
+        force_refresh=job.force_refresh
     )
 
 class BatchCreate(BaseModel):
@@ -127,11 +271,13 @@ class BatchCreate(BaseModel):
     state_id: Optional[int] = None
     all_cities: Optional[bool] = False
     max_leads: Optional[int] = 50
+    force_refresh: bool = False
 
 @router.post("/batch", status_code=201)
 async def create_batch_jobs(payload: BatchCreate, current_user: dict = Depends(get_current_user)):
     """
-    Creates multiple scraping jobs at once for a given category across multiple cities.
+    Creates a batch of scraping jobs for a category: one city, every active city of a state,
+    or every active city (all_cities). Returns the batch id and the number of jobs enqueued.
     """
     owner_id = current_user.get("sub")
     if not owner_id:
@@ -140,22 +286,19 @@ async def create_batch_jobs(payload: BatchCreate, current_user: dict = Depends(g
     if not payload.city_id and not payload.state_id and not payload.all_cities:
         raise HTTPException(status_code=400, detail="Must specify city_id, state_id, or all_cities=true")
 
-    target_cities = []
-    if payload.all_cities:
-        target_cities = StorageService.get_master_cities(limit=10000)
-    elif payload.state_id:
-        target_cities = StorageService.get_master_cities(limit=10000, state_id=payload.state_id)
-    elif payload.city_id:
-        target_cities = [{"id": payload.city_id}]
+    # La expansión ciudad por ciudad ocurre dentro de SQLite (INSERT … SELECT), sin tope de ciudades
+    try:
+        batch_id, count = await run_db(StorageService.create_batch_for_cities,
+            owner_id=owner_id,
+            category_id=payload.category_id,
+            state_id=None if payload.all_cities else payload.state_id,
+            city_id=None if payload.all_cities or payload.state_id else payload.city_id,
+            force_refresh=payload.force_refresh
+        )
+    except QuotaExceeded as e:
+        raise quota_exceeded_error(e)
 
-    if not target_cities:
+    if not count:
         raise HTTPException(status_code=404, detail="No target cities found")
-
-    jobs_payloads = [
-        (payload.category_id, None, city["id"], None, owner_id)
-        for city in target_cities
-    ]
-
-    count = StorageService.create_batch_jobs(jobs_payloads)
     
-    return {"message": f"{count} Jobs Enqueued successfully in batch"}
+    return {"message": f"{count} Jobs Enqueued successfully in batch", "batch_id": batch_id, "count": count}
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel
 
 from src.presentation.api.auth import get_current_user
 from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
+from src.presentation.api.pagination import decode_cursor, set_next_cursor
+from src.presentation.api.serialization import list_adapter, render_list
+from src.application.exports.lead_export import export_writer
 
 router = APIRouter(prefix="/api/leads", tags=["Leads"])
 
@@ -15,15 +20,116 @@ class LeadView(BaseModel):
     stars: float = 0.0
     reviews: int = 0
     map_url: Optional[str] = None
+    segment: Optional[str] = None
+
+MAX_LEADS_PAGE = 1000
+
+class LeadSearchResult(LeadView):
+    zone: Optional[str] = None
+
+LEAD_VIEWS = list_adapter(LeadView)
+LEAD_SEARCH_RESULTS = list_adapter(LeadSearchResult)
+
+@router.get("/search", response_model=List[LeadSearchResult])
+async def search_leads(
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(50, ge=1, le=MAX_LEADS_PAGE),
+    cursor: Optional[str] = None,
+    segment: Optional[str] = None,
+    min_stars: Optional[float] = Query(None, ge=0, le=5),
+    job_id: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Full-text search across every lead the tenant's jobs have collected (name, address, website, zone),
+    ranked by relevance. Follow X-Next-Cursor via ?cursor= for the next page.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        leads = await run_db(StorageService.search_leads, owner_id=owner_id, query=q, limit=limit,
+                             after=decode_cursor(cursor, 2), segment=segment, min_stars=min_stars, job_id=job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = render_list(LEAD_SEARCH_RESULTS, leads)
+    set_next_cursor(response, leads, limit, ("rank", "lead_rowid"))
+    return response
+
+@router.get("/export")
+async def export_leads(
+    format: str = Query("csv", pattern="^(csv|ndjson|xlsx)$"),
+    job_id: Optional[int] = None,
+    batch_id: Optional[int] = None,
+    q: Optional[str] = Query(None, min_length=2, max_length=200),
+    segment: Optional[str] = None,
+    min_stars: Optional[float] = Query(None, ge=0, le=5),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streams every lead of a job, of a whole batch, or of a search (q, optionally narrowed by job_id)
+    as CSV, NDJSON or XLSX, straight from the leads database in fixed-size chunks.
+    Downloads can be repeated at any time without rescraping.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if q is None and job_id is None and batch_id is None:
+        raise HTTPException(status_code=400, detail="Provide job_id, batch_id or q")
+
+    media_type, writer = export_writer(format)
+    try:
+        chunks = await run_db(StorageService.open_lead_export, owner_id=owner_id, job_id=job_id,
+                              batch_id=batch_id, query=q,
+                              segment=segment, min_stars=min_stars)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="Job or batch not found")
+
+    if q is not None:
+        filename = "leads_search"
+    elif batch_id is not None:
+        filename = f"leads_batch_{batch_id}"
+    else:
+        filename = f"leads_job_{job_id}"
+    return StreamingResponse(
+        writer(chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
 
 @router.get("/{job_id}", response_model=List[LeadView])
-async def get_leads_by_job(job_id: int, current_user: dict = Depends(get_current_user)):
+async def get_leads_by_job(
+    job_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LEADS_PAGE),
+    cursor: Optional[str] = None,
+    segment: Optional[str] = None,
+    min_stars: Optional[float] = Query(None, ge=0, le=5),
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Returns the real leads extracted for a specific batch job.
+    Returns the real leads extracted for a specific batch job, ordered by name.
+    Without limit every lead is returned (existing clients); with limit, follow X-Next-Cursor via ?cursor=.
+    segment (Micro/Corporate/Other) and min_stars are applied in SQL.
     """
     owner_id = current_user.get("sub")
     if not owner_id:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    filters = {}
+    after = decode_cursor(cursor, 2)
+    if after is not None:
+        filters["after"] = after
+    if limit is not None:
+        filters["limit"] = limit
+    if segment:
+        filters["segment"] = segment
+    if min_stars is not None:
+        filters["min_stars"] = min_stars
         
-    leads = StorageService.get_leads_for_job(job_id, owner_id)
-    return [LeadView(**l) for l in leads]
+    leads = await run_db(StorageService.get_leads_for_job, job_id, owner_id, **filters)
+    response = render_list(LEAD_VIEWS, leads)
+    set_next_cursor(response, leads, limit, ("name", "zone"))
+    return response
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from typing import List
 from pydantic import BaseModel
 
 from src.domain.models import MasterCountry, MasterState, MasterCity, MasterCityResponse
 from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
 from src.presentation.api.auth import get_current_user
+from src.presentation.api.pagination import decode_cursor, set_next_cursor
+from src.presentation.api.http_cache import catalog_not_modified
 
 router = APIRouter(tags=["Locations"])
 
@@ -37,21 +40,25 @@ def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
 # ---------------------------------------------------------------------------
 
 @router.get("/api/countries", response_model=List[MasterCountry])
-async def get_countries():
-    """Retorna el catálogo global de países. Lectura pública."""
-    return [MasterCountry(**c) for c in StorageService.get_countries()]
+async def get_countries(request: Request, response: Response):
+    """Retorna el catálogo global de países. Lectura pública, revalidable con ETag."""
+    version = await run_db(StorageService.get_catalog_version)
+    not_modified = catalog_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    return [MasterCountry(**c) for c in await run_db(StorageService.get_countries)]
 
 
 @router.post("/api/countries", response_model=MasterCountry, status_code=201)
 async def create_country(payload: CountryCreate, current_user: dict = Depends(require_admin)):
     """Crea un nuevo país en el catálogo. Solo admins."""
-    country_id = StorageService.create_country(name=payload.name)
+    country_id = await run_db(StorageService.create_country, name=payload.name)
     return MasterCountry(id=country_id, name=payload.name)
 
 @router.put("/api/countries/{country_id}", response_model=MasterCountry)
 async def update_country(country_id: int, payload: CountryCreate, current_user: dict = Depends(require_admin)):
     """Actualiza el nombre de un país. Solo admins."""
-    if not StorageService.update_country(country_id, payload.name):
+    if not await run_db(StorageService.update_country, country_id, payload.name):
         raise HTTPException(status_code=404, detail="Country not found")
     return MasterCountry(id=country_id, name=payload.name)
 
@@ -60,28 +67,32 @@ async def update_country(country_id: int, payload: CountryCreate, current_user:
 # ---------------------------------------------------------------------------
 
 @router.get("/api/states", response_model=List[MasterState])
-async def get_states(country_id: int):
-    """Retorna los estados de un país. Lectura pública."""
-    return [MasterState(**s) for s in StorageService.get_states_by_country(country_id)]
+async def get_states(country_id: int, request: Request, response: Response):
+    """Retorna los estados de un país. Lectura pública, revalidable con ETag."""
+    version = await run_db(StorageService.get_catalog_version)
+    not_modified = catalog_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    return [MasterState(**s) for s in await run_db(StorageService.get_states_by_country, country_id)]
 
 
 @router.post("/api/states", response_model=MasterState, status_code=201)
 async def create_state(payload: StateCreate, current_user: dict = Depends(require_admin)):
     """Crea un nuevo estado vinculado a un país. Solo admins."""
-    state_id = StorageService.create_state(name=payload.name, country_id=payload.country_id)
+    state_id = await run_db(StorageService.create_state, name=payload.name, country_id=payload.country_id)
     return MasterState(id=state_id, name=payload.name, country_id=payload.country_id)
 
 @router.put("/api/states/{state_id}", response_model=MasterState)
 async def update_state(state_id: int, payload: StateCreate, current_user: dict = Depends(require_admin)):
     """Actualiza un estado. Solo admins."""
-    if not StorageService.update_state(state_id, payload.name):
+    if not await run_db(StorageService.update_state, state_id, payload.name):
         raise HTTPException(status_code=404, detail="State not found")
     return MasterState(id=state_id, name=payload.name, country_id=payload.country_id)
 
 @router.delete("/api/states/{state_id}", status_code=204)
 async def delete_state(state_id: int, current_user: dict = Depends(require_admin)):
     """Elimina lógicamente un estado y todas sus ciudades en cascada. Solo admins."""
-    if not StorageService.delete_state_with_cascade(state_id):
+    if not await run_db(StorageService.delete_state_with_cascade, state_id):
         raise HTTPException(status_code=404, detail="State not found")
 
 # ---------------------------------------------------------------------------
@@ -90,26 +101,36 @@ async def delete_state(state_id: int, current_user: dict = Depends(require_admin
 
 @router.get("/api/cities", response_model=List[MasterCityResponse])
 async def get_cities(
+    request: Request,
+    response: Response,
     state_id: int | None = None,
     limit: int = 100,
     offset: int = 0,
+    cursor: str | None = None,
 ):
-    """Retorna el catálogo de ciudades con jerarquía. Lectura pública."""
-    cities = StorageService.get_master_cities(limit=limit, offset=offset, state_id=state_id)
+    """Retorna el catálogo de ciudades con jerarquía, ordenado por nombre. Lectura pública. Paginación por ?cursor= (X-Next-Cursor)."""
+    after = decode_cursor(cursor, 2)
+    version = await run_db(StorageService.get_catalog_version)
+    not_modified = catalog_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    keyset = {"after": after} if after is not None else {}
+    cities = await run_db(StorageService.get_master_cities, limit=limit, offset=offset, state_id=state_id, **keyset)
+    set_next_cursor(response, cities, limit, ("name", "id"))
     return [MasterCityResponse(**c) for c in cities]
 
 
 @router.post("/api/cities", response_model=MasterCity, status_code=201)
 async def create_city(payload: CityCreate, current_user: dict = Depends(require_admin)):
     """Crea una nueva ciudad en el catálogo. Solo admins. Requiere state_id."""
-    city_id = StorageService.create_master_city(name=payload.name, state_id=payload.state_id)
+    city_id = await run_db(StorageService.create_master_city, name=payload.name, state_id=payload.state_id)
     return MasterCity(id=city_id, name=payload.name, state_id=payload.state_id)
 
 
 @router.put("/api/cities/{city_id}", response_model=MasterCity)
 async def update_city(city_id: int, payload: CityCreate, current_user: dict = Depends(require_admin)):
     """Actualiza una ciudad. Solo admins."""
-    if not StorageService.update_master_city(city_id, payload.name, payload.state_id):
+    if not await run_db(StorageService.update_master_city, city_id, payload.name, payload.state_id):
         raise HTTPException(status_code=404, detail="City not found")
     return MasterCity(id=city_id, name=payload.name, state_id=payload.state_id)
 
@@ -117,5 +138,5 @@ async def update_city(city_id: int, payload: CityCreate, current_user: dict = De
 @router.delete("/api/cities/{city_id}", status_code=204)
 async def delete_city(city_id: int, current_user: dict = Depends(require_admin)):
     """Elimina una ciudad del catálogo. Solo admins."""
-    if not StorageService.delete_master_city(city_id):
+    if not await run_db(StorageService.delete_master_city, city_id):
         raise HTTPException(status_code=404, detail="City not found")
@@ -1,9 +1,13 @@
-import sys
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.core.logging_config import setup_logging
-from src.core.config import ALLOWED_ORIGINS
+from fastapi.middleware.gzip import GZipMiddleware
+from src.core.logging_config import setup_logging, stop_logging
+from src.core.config import ALLOWED_ORIGINS, GZIP_MINIMUM_SIZE_BYTES
+from src.infrastructure.database.db_executor import shutdown_db_executor
+from src.application.batch_jobs.job_events import job_event_broker
+from src.presentation.api.pagination import NEXT_CURSOR_HEADER
 
 # Router imports
 from .auth import router as auth_router
@@ -12,6 +16,10 @@ from .categories import router as categories_router
 from .jobs import router as jobs_router
 from .admin import router as admin_router
 from .leads import router as leads_router
+from .batches import router as batches_router
+from .stats import router as stats_router
+from .metrics import router as metrics_router, MetricsMiddleware
+from .tracing import TraceMiddleware, TRACE_HEADER
 
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
@@ -19,21 +27,29 @@ from fastapi.responses import JSONResponse
 def init_app_logging():
     # Setup senior logging for API
     setup_logging("API")
-    # Forzar formato en loggers de uvicorn que suelen ignorar el root logger
+    # Los loggers de uvicorn traen handlers propios (síncronos): se redirigen a la cola del root logger
     for logger_name in ["uvicorn", "uvicorn.error", "uvicorn.access"]:
         uv_logger = logging.getLogger(logger_name)
-        for handler in uv_logger.handlers:
-            from src.core.logging_config import ComponentFormatter
-            handler.setFormatter(ComponentFormatter("API"))
+        for handler in uv_logger.handlers[:]:
+            uv_logger.removeHandler(handler)
+        uv_logger.propagate = True
 
-# Solo inicializar logging si no estamos en modo test (detectado por la presencia de pytest o ejecución directa)
-if "pytest" not in sys.modules and __name__ == "__main__":
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # En el arranque de cada proceso (uvicorn importa `app`, nunca corre este módulo como __main__)
     init_app_logging()
+    yield
+    await job_event_broker.stop()
+    # Espera a que terminen las consultas en curso del pool de BD antes de salir
+    shutdown_db_executor()
+    # Al final: vacía la cola de logs con todo lo anterior ya encolado
+    stop_logging()
 
 app = FastAPI(
     title="Bastion Core API",
     description="API for managing Batch Scraper Jobs and tenant resources",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 @app.exception_handler(HTTPException)
@@ -53,7 +69,8 @@ async def professional_http_exception_handler(request: Request, exc: HTTPExcepti
         )
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers  # e.g. Retry-After on 429
     )
 
 # Configure CORS to allow Next.js Frontend access (Dynamic from Config)
@@ -63,8 +80,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TRACE_HEADER],
 )
 
+# Compress large JSON/CSV bodies (e.g. thousands of leads); small responses are sent as-is
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE_BYTES)
+
+# Correlation id for every log line of the request and the jobs it enqueues
+app.add_middleware(TraceMiddleware)
+
+# Outermost: latency includes CORS and compression
+app.add_middleware(MetricsMiddleware)
+
 # Include Routers
 app.include_router(auth_router)
 app.include_router(locations_router)
@@ -72,6 +99,9 @@ app.include_router(categories_router)
 app.include_router(jobs_router)
 app.include_router(admin_router)
 app.include_router(leads_router)
+app.include_router(batches_router)
+app.include_router(stats_router)
+app.include_router(metrics_router)
 
 @app.get("/health")
 def health_check():
@@ -0,0 +1,82 @@
+"""
+Request telemetry for the API and the GET /metrics endpoint (Prometheus text format).
+
+Latency is measured until the response starts (time to first byte), so long-lived
+streams (SSE, exports) do not skew it. Routes are labelled by their path template
+(/api/jobs/{job_id}), and unmatched paths share one label to keep cardinality bounded.
+
+The API listens on every interface, so /metrics requires METRICS_TOKEN as a bearer token
+and is disabled (404) while no token is configured.
+
+The registry lives in process memory: with API_WORKERS > 1 each uvicorn worker keeps its
+own counters and a scrape only sees the worker that happened to answer it. Run the API
+with a single worker when these metrics matter.
+"""
+import hmac
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import METRICS_TOKEN
+from src.core.metrics import CONTENT_TYPE, REGISTRY, Gauge, Histogram
+from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "API time to first byte", ["method", "route", "status"])
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "API requests being handled")
+QUEUE_DEPTH = Gauge("jobs_queue_depth", "Batch jobs waiting in the queue (status pending)")
+QUEUE_DEPTH.set_function(lambda: StorageService.count_pending_jobs())
+
+router = APIRouter(tags=["Metrics"])
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int):
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(time.perf_counter() - started, method=scope["method"],
+                                    route=getattr(route, "path", "unmatched"), status=status)
+
+        async def send_wrapper(message: Message):
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                observe(message["status"])
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not observed:
+                observe(500)
+            raise
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+
+
+def _check_metrics_token(authorization: Optional[str]):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    _check_metrics_token(authorization)
+    # Callback gauges (queue depth) query SQLite: render off the event loop
+    return Response(content=await run_db(REGISTRY.render), media_type=CONTENT_TYPE)
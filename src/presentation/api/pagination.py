@@ -0,0 +1,41 @@
+"""
+Cursor (keyset) pagination helpers shared by the list endpoints.
+
+The cursor is an opaque, URL-safe token that encodes the sort key of the last row returned
+(e.g. (created_at, id) for jobs, (name, id) for catalogs). Clients pass it back as ?cursor=...
+and read the next one from the X-Next-Cursor response header, so list bodies keep their shape.
+"""
+import base64
+import json
+from typing import Any, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[tuple]:
+    """Returns the keyset tuple, None when no cursor was sent, or 400 when it was tampered with."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(values)
+
+
+def set_next_cursor(response: Response, rows: List[dict], limit: Optional[int], keys: Iterable[str]):
+    """A full page means there may be more rows: expose the cursor pointing after the last one."""
+    if limit is None or not rows or len(rows) < limit:
+        return
+    last = rows[-1]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.get(key) for key in keys])
@@ -0,0 +1,22 @@
+"""
+Bulk JSON rendering for large list responses.
+
+Returning a list of Pydantic models makes FastAPI walk it twice: once to build the models and
+once more to validate and encode them against response_model. For lists of DB rows the endpoint
+instead validates the whole list in a single TypeAdapter pass (pydantic-core) and dumps it straight
+to JSON bytes. The response_model stays on the route for the OpenAPI schema only.
+"""
+from typing import List
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+def list_adapter(model: type) -> TypeAdapter:
+    # Built once per model at import time: adapter construction compiles the schema
+    return TypeAdapter(List[model])
+
+
+def render_list(adapter: TypeAdapter, rows: List[dict]) -> Response:
+    """Rows keep only the model's fields (extra DB columns are dropped), exactly like response_model."""
+    return Response(content=adapter.dump_json(adapter.validate_python(rows)), media_type="application/json")
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+from src.presentation.api.auth import get_current_user
+from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.db_executor import run_db
+
+router = APIRouter(prefix="/api/stats", tags=["Stats"])
+
+class StatsView(BaseModel):
+    scope: str
+    jobs_by_status: Dict[str, int]
+    total_jobs: int
+    success_rate: Optional[float] = None
+    leads_found: int
+    leads_by_city: Dict[str, int]
+    leads_by_segment: Dict[str, int]
+
+@router.get("", response_model=StatsView)
+async def get_stats(
+    scope: str = Query("tenant", pattern="^(tenant|global)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Dashboard totals read from incrementally maintained counters: jobs by status, success rate
+    (completed / finished), leads found per city and distinct leads per segment.
+    scope=global (admins only) aggregates every tenant.
+    """
+    owner_id = current_user.get("sub")
+    if not owner_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if scope == "global" and current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+
+    stats = await run_db(StorageService.get_stats, None if scope == "global" else owner_id)
+    jobs = stats["jobs_by_status"]
+    finished = jobs.get("completed", 0) + jobs.get("failed", 0)
+    return StatsView(
+        scope=scope,
+        jobs_by_status=jobs,
+        total_jobs=sum(jobs.values()),
+        success_rate=round(jobs.get("completed", 0) / finished, 4) if finished else None,
+        leads_found=sum(stats["leads_by_city"].values()),
+        leads_by_city=stats["leads_by_city"],
+        leads_by_segment=stats["leads_by_segment"],
+    )
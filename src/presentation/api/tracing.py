@@ -0,0 +1,41 @@
+"""
+Correlation IDs for API requests (see src/core/tracing.py).
+
+Each request runs under the caller's X-Request-ID (if it is a sane token) or a new trace id, echoed
+back in the response header. Logs of the request and the jobs it enqueues carry the same id.
+"""
+import re
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.tracing import trace
+
+TRACE_HEADER = "x-request-id"
+_VALID_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class TraceMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == TRACE_HEADER.encode():
+                incoming = value.decode("latin-1")
+                break
+        if incoming is not None and not _VALID_TRACE_ID.match(incoming):
+            incoming = None
+
+        with trace(incoming) as trace_id:
+            async def send_wrapper(message: Message):
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message)[TRACE_HEADER] = trace_id
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
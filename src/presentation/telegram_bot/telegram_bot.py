@@ -9,8 +9,10 @@ from src.core.security import es_usuario_permitido
 from src.infrastructure.audio.audio_service import transcribir_audio
 from src.application.ai_agents.agent_service import procesar_mensaje_agente
 from src.infrastructure.notifications.telegram_service import TelegramService
-from src.core.config import AGENT_NAME, USER_TITLE, TELEGRAM_BOT_TOKEN
+from src.core.config import AGENT_NAME, USER_TITLE, TELEGRAM_BOT_TOKEN, METRICS_HOST, BOT_METRICS_PORT
+from src.core.metrics import start_metrics_server
 from src.core.logging_config import setup_logging
+from src.core.tracing import traced
 # Configuración global de logs del Bot
 logger = setup_logging("BOT")
 
@@ -38,6 +40,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     await update.message.reply_text(bienvenida)
 
+@traced("bot.message")
 async def manejar_mensaje(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Captura los mensajes de texto, los envía al Agente y muestra su respuesta.
@@ -68,6 +71,7 @@ async def manejar_mensaje(update: Update, context: ContextTypes.DEFAULT_TYPE):
             text=f"Lo siento, ocurrió un error: {str(e)}"
         )
 
+@traced("bot.audio")
 async def manejar_audio(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Escucha una nota de voz, la transcribe y delega el procesamiento al Agente.
@@ -143,6 +147,8 @@ def main():
         return
         
     logger.info("🤖 Encendiendo Agente y conectando con Telegram...")
+    # Latencia del Agente y alertas programadas para Prometheus
+    start_metrics_server(BOT_METRICS_PORT, METRICS_HOST)
     # Construimos la aplicación de Telegram y registramos el hook de inicio
     app = Application.builder().token(TELEGRAM_BOT_TOKEN).post_init(on_startup).build()
     
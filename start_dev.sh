@@ -39,6 +39,10 @@ TS=$(date +"%Y-%m-%d_%H-%M-%S")
 # Definir el binario de python de la venv para estabilidad absoluta
 PY="./.venv/bin/python3"
 
+# 0.7 Migrar el esquema una sola vez antes de levantar los servicios
+echo -e "${YELLOW}Aplicando migraciones de base de datos...${NC}"
+$PY -m src.infrastructure.database.manage migrate || exit 1
+
 # 1. Iniciar el Bot de Telegram (Polling Interface)
 echo -e "${YELLOW}[1/4] Iniciando Bot de Telegram...${NC}"
 $PY -u main.py > "logs/[$TS] [BOT].log" 2>&1 &
@@ -51,7 +55,8 @@ WORKER_PID=$!
 
 # 3. Iniciar la API de FastAPI (Backend)
 echo -e "${YELLOW}[3/4] Iniciando FastAPI Backend en el puerto 8000...${NC}"
-./.venv/bin/uvicorn src.presentation.api.main:app --host 0.0.0.0 --port 8000 > "logs/[$TS] [API].log" 2>&1 &
+# API_WORKERS=N reparte la API en N procesos (los OTPs y los eventos de Jobs viven en SQLite)
+./.venv/bin/uvicorn src.presentation.api.main:app --host 0.0.0.0 --port 8000 --workers "${API_WORKERS:-1}" > "logs/[$TS] [API].log" 2>&1 &
 API_PID=$!
 
 # 4. Iniciar el Frontend (Next.js Dashboard) con Binding Universal (Local + Red)
@@ -0,0 +1,103 @@
+"""
+Pruebas para src/application/batch_jobs/job_events.py
+
+El broker lee el log job_events (aquí una lista en memoria) y reparte cada evento a los
+suscriptores del tenant dueño del Job; las reconexiones recuperan lo perdido.
+"""
+import asyncio
+import time
+
+import pytest
+from unittest.mock import patch
+
+from src.application.batch_jobs.job_events import JobEventBroker
+
+
+class FakeLog:
+    def __init__(self):
+        self.events = []
+
+    def append(self, job_id, owner_id, status):
+        self.events.append({"id": len(self.events) + 1, "job_id": job_id, "owner_id": owner_id,
+                            "type": "status", "payload": {"status": status}})
+
+    def get_job_events(self, after_id, limit=500, owner_id=None):
+        rows = [e for e in self.events if e["id"] > after_id and owner_id in (None, e["owner_id"])]
+        return rows[:limit]
+
+    def get_last_job_event_id(self):
+        return len(self.events)
+
+    def prune_job_events(self, max_age_seconds):
+        return 0
+
+
+@pytest.fixture
+def log():
+    fake = FakeLog()
+    with patch("src.application.batch_jobs.job_events.StorageService", fake):
+        yield fake
+
+
+async def test_reparte_solo_al_tenant_dueno(log):
+    broker = JobEventBroker(poll_interval=0.01)
+    async with broker.subscribe("u1") as mine, broker.subscribe("u2") as other:
+        log.append(1, "u1", "processing")
+        event = await asyncio.wait_for(mine.get(), timeout=1)
+        assert event["payload"] == {"status": "processing"}
+        await asyncio.sleep(0.05)
+        assert other.empty()
+
+    # Sin suscriptores el poller se detiene solo
+    await asyncio.sleep(0.05)
+    assert broker._task is None
+
+
+async def test_reconexion_con_last_event_id_recupera_lo_perdido(log):
+    log.append(1, "u1", "processing")
+    log.append(2, "u2", "processing")
+    log.append(1, "u1", "completed")
+
+    broker = JobEventBroker(poll_interval=0.01)
+    async with broker.subscribe("u1", last_event_id=1) as queue:
+        assert (await asyncio.wait_for(queue.get(), timeout=1))["id"] == 3
+        log.append(1, "u1", "cancelled")
+        assert (await asyncio.wait_for(queue.get(), timeout=1))["id"] == 4
+
+
+@pytest.mark.parametrize("snapshot_first", [True, False])
+async def test_evento_publicado_durante_la_recuperacion_no_se_pierde_ni_se_duplica(log, snapshot_first):
+    log.append(1, "u1", "processing")
+    read_log = log.get_job_events
+
+    def slow_catch_up(after_id, limit=500, owner_id=None):
+        if owner_id is None:
+            return read_log(after_id, limit)
+        # Un evento nuevo llega mientras la lectura de recuperación sigue en curso
+        if snapshot_first:
+            rows = read_log(after_id, limit, owner_id)
+            log.append(1, "u1", "completed")
+        else:
+            log.append(1, "u1", "completed")
+            rows = read_log(after_id, limit, owner_id)
+        time.sleep(0.1)
+        return rows
+
+    log.get_job_events = slow_catch_up
+    broker = JobEventBroker(poll_interval=0.01)
+    async with broker.subscribe("u2"):
+        await asyncio.sleep(0.02)
+        async with broker.subscribe("u1", last_event_id=0) as queue:
+            received = [(await asyncio.wait_for(queue.get(), timeout=1))["id"] for _ in range(2)]
+            await asyncio.sleep(0.05)
+            assert received == [1, 2]
+            assert queue.empty()
+
+
+async def test_cola_llena_pide_reset(log):
+    broker = JobEventBroker(poll_interval=0.01, queue_size=2)
+    async with broker.subscribe("u1") as queue:
+        for status in ("a", "b", "c"):
+            log.append(1, "u1", status)
+        await asyncio.sleep(0.05)
+        assert queue.get_nowait() is None
@@ -0,0 +1,59 @@
+"""
+Pruebas para src/application/batch_jobs/job_progress.py
+
+El reporter debe persistir el progreso del scraper a ritmo acotado:
+- Cambios de etapa se escriben de inmediato.
+- Incrementos de contadores dentro del intervalo mínimo se acumulan y no generan escrituras.
+"""
+from unittest.mock import MagicMock
+from src.application.batch_jobs.job_progress import JobProgressReporter
+from src.domain.models import JobStage
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _snapshot(stage="extracting", processed=0):
+    return {"stage": stage, "discovered": 10, "processed": processed, "cached": 0, "skipped": 0}
+
+
+def test_reporter_acota_escrituras_por_intervalo():
+    writer = MagicMock()
+    clock = FakeClock()
+    reporter = JobProgressReporter(7, writer, min_interval=2.0, clock=clock)
+
+    reporter(_snapshot(processed=0))   # primera etapa -> escribe
+    for i in range(1, 50):             # mismo instante -> ninguna escritura extra
+        reporter(_snapshot(processed=i))
+    assert writer.call_count == 1
+
+    clock.now = 2.5
+    reporter(_snapshot(processed=50))  # intervalo cumplido -> escribe el último snapshot
+    assert writer.call_count == 2
+    assert writer.call_args.kwargs["processed"] == 50
+
+
+def test_reporter_escribe_cambios_de_etapa_y_flush_final():
+    writer = MagicMock()
+    reporter = JobProgressReporter(9, writer, min_interval=60.0, clock=FakeClock())
+
+    reporter(_snapshot(stage="searching"))
+    reporter(_snapshot(stage="scrolling"))
+    reporter(_snapshot(stage="scrolling", processed=3))
+    assert [c.kwargs["stage"] for c in writer.call_args_list] == ["searching", "scrolling"]
+
+    reporter.set_stage(JobStage.DONE)
+    assert writer.call_args.args == (9,)
+    assert writer.call_args.kwargs["stage"] == "done"
+    assert writer.call_args.kwargs["processed"] == 3
+
+
+def test_reporter_no_propaga_errores_de_escritura():
+    writer = MagicMock(side_effect=Exception("database is locked"))
+    reporter = JobProgressReporter(1, writer, clock=FakeClock())
+    reporter(_snapshot())  # no debe lanzar
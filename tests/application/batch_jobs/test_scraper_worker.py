@@ -59,6 +59,7 @@ class TestScraperWorker:
         mock_scraper_class.return_value = mock_scraper_inst
 
         # 2. Ejecutar
+        mock_storage.is_job_cancelled.return_value = False
         result = await process_next_job()
 
         # 3. Asserts
@@ -227,6 +228,7 @@ async def test_job_continua_si_notificacion_inicio_falla_telegram_forbidden(mock
     mock_scraper_inst.scrape = AsyncMock()
     mock_scraper_class.return_value = mock_scraper_inst
 
+    mock_storage.is_job_cancelled.return_value = False
     result = await process_next_job()
 
     # La notificación falló, PERO el scraping debe haber ocurrido igual
@@ -263,9 +265,175 @@ async def test_job_continua_si_notificacion_inicio_falla_telegram_bad_request(mo
     mock_scraper_inst.scrape = AsyncMock()
     mock_scraper_class.return_value = mock_scraper_inst
 
+    mock_storage.is_job_cancelled.return_value = False
     result = await process_next_job()
 
     # El error BadRequest de Telegram NO debe abortar el job
     mock_scraper_inst.scrape.assert_called_once()
     mock_storage.update_job_status.assert_called_with(444, 'completed')
     assert result is True
+
+
+@pytest.mark.asyncio
+@patch("src.application.batch_jobs.scraper_worker.StorageService")
+@patch("src.application.batch_jobs.scraper_worker.GoogleMapsScraper")
+@patch("src.application.batch_jobs.scraper_worker.Bot")
+async def test_force_refresh_desactiva_reutilizacion_de_resultados(mock_bot_class, mock_scraper_class, mock_storage):
+    """Un Job con force_refresh no debe reutilizar corridas recientes: el scraper recibe reuse desactivado."""
+    mock_bot_inst = MagicMock()
+    mock_bot_inst.send_message = AsyncMock()
+    mock_bot_class.return_value = mock_bot_inst
+    mock_storage.fetch_excel_files_for_session.return_value = []
+    mock_scraper_class.return_value.scrape = AsyncMock()
+
+    mock_storage.get_pending_job.return_value = {
+        'id': 7, 'owner_id': 'tenant_1', 'zona_text': 'Monterrey', 'categoria_text': 'Dentistas', 'force_refresh': 1
+    }
+    await process_next_job()
+    assert mock_scraper_class.call_args.kwargs['reuse_max_age_hours'] is None
+
+    mock_storage.get_pending_job.return_value = {
+        'id': 8, 'owner_id': 'tenant_1', 'zona_text': 'Monterrey', 'categoria_text': 'Dentistas', 'force_refresh': 0
+    }
+    await process_next_job()
+    from src.core.config import RESULT_REUSE_HOURS
+    assert mock_scraper_class.call_args.kwargs['reuse_max_age_hours'] == RESULT_REUSE_HOURS
+
+
+@pytest.mark.asyncio
+@patch("src.application.batch_jobs.scraper_worker.GoogleMapsScraper")
+@patch("src.application.batch_jobs.scraper_worker.Bot")
+async def test_salida_entrega_y_limpieza_aisladas_por_job(mock_bot_class, mock_scraper_class):
+    """
+    Dos Jobs del mismo tenant no deben compartir carpeta: el scraper escribe, el worker entrega
+    y limpia únicamente la sesión del Job en curso (también cuando el Job falla).
+    """
+    mock_bot_inst = MagicMock()
+    mock_bot_inst.send_message = AsyncMock()
+    mock_bot_class.return_value = mock_bot_inst
+    mock_scraper_class.return_value.scrape = AsyncMock(side_effect=Exception("Crash en Playwright"))
+
+    with patch("src.application.batch_jobs.scraper_worker.StorageService") as mock_storage:
+        from src.infrastructure.database.storage_service import StorageService as RealStorage
+        mock_storage.get_job_session_id.side_effect = RealStorage.get_job_session_id
+        mock_storage.get_pending_job.return_value = {
+            'id': 55, 'owner_id': 'tenant_1', 'zona_text': 'Monterrey', 'categoria_text': 'Dentistas'
+        }
+
+        await process_next_job()
+
+        expected_session = RealStorage.get_job_session_id('tenant_1', 55)
+        assert expected_session != RealStorage.get_job_session_id('tenant_1', 56)
+        assert mock_scraper_class.call_args.kwargs['session_id'] == expected_session
+        mock_storage.eliminar_sesion.assert_called_once_with(expected_session)
+
+
+@pytest.mark.asyncio
+@patch("src.application.batch_jobs.scraper_worker.StorageService")
+@patch("src.application.batch_jobs.scraper_worker.GoogleMapsScraper")
+@patch("src.application.batch_jobs.scraper_worker.Bot")
+async def test_job_cancelado_libera_el_worker_sin_marcar_fallo(mock_bot_class, mock_scraper_class, mock_storage):
+    """Si el usuario cancela a mitad del scraping, el worker no lo marca failed ni completed y limpia su sesión."""
+    from src.domain.engine.scrapers.scraper import ScrapeCancelled
+    mock_bot_inst = MagicMock()
+    mock_bot_inst.send_message = AsyncMock()
+    mock_bot_class.return_value = mock_bot_inst
+    mock_scraper_class.return_value.scrape = AsyncMock(side_effect=ScrapeCancelled("Job cancelled"))
+    mock_storage.get_pending_job.return_value = {
+        'id': 77, 'owner_id': 'tenant_1', 'zona_text': 'Monterrey', 'categoria_text': 'Dentistas'
+    }
+
+    result = await process_next_job()
+
+    assert result is False
+    mock_storage.update_job_status.assert_not_called()
+    mock_scraper_class.return_value.save_data.assert_not_called()
+    mock_scraper_class.return_value.save_to_db.assert_called_once()
+    mock_storage.eliminar_sesion.assert_called_once()
+    assert mock_storage.update_job_progress.call_args.kwargs['stage'] == "cancelled"
+
+    # El scraper consulta la cancelación del Job correcto
+    mock_scraper_class.call_args.kwargs['cancel_check']()
+    mock_storage.is_job_cancelled.assert_called_with(77)
+
+
+@pytest.mark.asyncio
+@patch("src.application.batch_jobs.scraper_worker.StorageService")
+@patch("src.application.batch_jobs.scraper_worker.GoogleMapsScraper")
+@patch("src.application.batch_jobs.scraper_worker.Bot")
+async def test_job_completado_registra_leads_encontrados(mock_bot_class, mock_scraper_class, mock_storage):
+    """Al completar, el worker guarda cuántos leads entregó el Job (contador del lote)."""
+    mock_bot_class.return_value.send_message = AsyncMock()
+    mock_scraper_class.return_value.scrape = AsyncMock()
+    mock_scraper_class.return_value.results = [{"name": "A"}, {"name": "B"}]
+    mock_storage.get_pending_job.return_value = {'id': 5, 'owner_id': '1', 'zona_text': 'MTY', 'categoria_text': 'Dentistas'}
+    mock_storage.fetch_excel_files_for_session.return_value = []
+
+    mock_storage.is_job_cancelled.return_value = False
+    assert await process_next_job() is True
+    mock_storage.set_job_leads_found.assert_called_once_with(5, 2)
+
+
+@pytest.mark.asyncio
+@patch("src.application.batch_jobs.scraper_worker.StorageService")
+@patch("src.application.batch_jobs.scraper_worker.GoogleMapsScraper")
+@patch("src.application.batch_jobs.scraper_worker.Bot")
+async def test_job_se_procesa_bajo_el_trace_id_de_su_peticion(mock_bot_class, mock_scraper_class, mock_storage):
+    """Los logs del Worker y del scraper comparten el trace_id guardado al encolar; al terminar se libera."""
+    from src.core.tracing import current_trace_id
+    mock_bot_class.return_value.send_message = AsyncMock()
+    seen = []
+    mock_scraper_class.return_value.scrape = AsyncMock(side_effect=lambda *a: seen.append(current_trace_id()))
+    mock_storage.get_pending_job.return_value = {
+        'id': 78, 'owner_id': 'tenant_1', 'zona_text': 'Monterrey', 'categoria_text': 'Dentistas',
+        'trace_id': 'trace-from-bot', 'created_at': '2026-03-22 10:00:00'
+    }
+
+    await process_next_job()
+
+    assert seen == ['trace-from-bot']
+    assert current_trace_id() is None
+
+
+@pytest.mark.asyncio
+@patch("src.application.batch_jobs.scraper_worker.asyncio.sleep")
+@patch("src.application.batch_jobs.scraper_worker.process_next_job")
+@patch("src.application.batch_jobs.scraper_worker.StorageService")
+async def test_main_loop_reencola_jobs_huerfanos_al_arrancar(mock_storage, mock_process, mock_sleep):
+    """Al arrancar (y luego cada JOB_REAPER_INTERVAL_SECONDS) el Worker recupera Jobs de Workers caídos."""
+    import asyncio
+    from src.application.batch_jobs.scraper_worker import main_loop
+    from src.core.config import JOB_STALE_PROCESSING_SECONDS
+    mock_storage.get_worker_enabled.return_value = True
+    mock_storage.requeue_stale_jobs.return_value = 2
+    mock_process.side_effect = [False, asyncio.CancelledError()]
+
+    with pytest.raises(asyncio.CancelledError):
+        await main_loop()
+
+    mock_storage.requeue_stale_jobs.assert_called_once_with(JOB_STALE_PROCESSING_SECONDS)
+
+
+@pytest.mark.asyncio
+@patch("src.application.batch_jobs.scraper_worker.StorageService")
+@patch("src.application.batch_jobs.scraper_worker.GoogleMapsScraper")
+@patch("src.application.batch_jobs.scraper_worker.Bot")
+async def test_cancelacion_tras_el_scraping_no_entrega_ni_completa(mock_bot_class, mock_scraper_class, mock_storage):
+    """Si el usuario cancela cuando el scraping ya terminó, no se envían archivos ni se marca completed."""
+    mock_bot_inst = MagicMock()
+    mock_bot_inst.send_message = AsyncMock()
+    mock_bot_inst.send_document = AsyncMock()
+    mock_bot_class.return_value = mock_bot_inst
+    mock_scraper_class.return_value.scrape = AsyncMock()
+    mock_storage.get_pending_job.return_value = {
+        'id': 78, 'owner_id': 'tenant_1', 'zona_text': 'Monterrey', 'categoria_text': 'Dentistas'
+    }
+    mock_storage.is_job_cancelled.return_value = True
+
+    result = await process_next_job()
+
+    assert result is False
+    mock_storage.update_job_status.assert_not_called()
+    mock_storage.fetch_excel_files_for_session.assert_not_called()
+    mock_bot_inst.send_document.assert_not_called()
+    assert mock_storage.update_job_progress.call_args.kwargs['stage'] == "cancelled"
@@ -0,0 +1,84 @@
+"""
+Pruebas para src/application/exports/lead_export.py
+
+Cada writer produce la exportación chunk a chunk a partir de las filas de leads.db.
+"""
+import csv
+import io
+import json
+
+import pytest
+from openpyxl import load_workbook
+
+from src.application.exports.lead_export import EXPORT_COLUMNS, export_writer, write_csv, write_ndjson, write_xlsx
+
+CHUNKS = [
+    [{"name": "Clínica Dental", "phone": "8112345678", "zone": "Dentistas en Monterrey", "stars": 4.8, "reviews": 10}],
+    [{"name": "Consultorio Pérez", "zone": "Dentistas en Monterrey", "segment": "Micro"}],
+]
+
+
+def test_csv_con_bom_encabezado_y_un_bloque_por_chunk():
+    parts = list(write_csv(iter(CHUNKS)))
+    assert parts[0] == "\ufeff".encode("utf-8")
+    assert len(parts) == 3
+
+    rows = list(csv.reader(io.StringIO(b"".join(parts).decode("utf-8-sig"))))
+    assert rows[0] == EXPORT_COLUMNS
+    assert rows[1][EXPORT_COLUMNS.index("name")] == "Clínica Dental"
+    assert rows[2][EXPORT_COLUMNS.index("segment")] == "Micro"
+
+
+def test_csv_vacio_conserva_el_encabezado():
+    data = b"".join(write_csv(iter([]))).decode("utf-8-sig")
+    assert data.strip() == ",".join(EXPORT_COLUMNS)
+
+
+def test_ndjson_un_objeto_por_linea():
+    lines = b"".join(write_ndjson(iter(CHUNKS))).decode("utf-8").splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["Clínica Dental", "Consultorio Pérez"]
+    assert json.loads(lines[0])["stars"] == 4.8
+
+
+def test_xlsx_legible_y_sin_archivo_temporal(tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    data = b"".join(write_xlsx(iter(CHUNKS)))
+    assert list(tmp_path.iterdir()) == []
+
+    sheet = load_workbook(io.BytesIO(data)).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == EXPORT_COLUMNS
+    assert rows[2][EXPORT_COLUMNS.index("name")] == "Consultorio Pérez"
+
+
+def test_xlsx_entrega_bytes_antes_de_agotar_los_chunks():
+    consumed = []
+
+    def chunks():
+        for i in range(50):
+            consumed.append(i)
+            yield [{"name": f"Lead {i}-{n}", "phone": str(n), "stars": 4.5} for n in range(500)]
+
+    writer = write_xlsx(chunks())
+    first = next(writer)
+    assert first.startswith(b"PK")
+    assert len(consumed) < 50
+
+    data = first + b"".join(writer)
+    rows = list(load_workbook(io.BytesIO(data), read_only=True).active.iter_rows(values_only=True))
+    assert len(rows) == 1 + 50 * 500
+    assert rows[-1][EXPORT_COLUMNS.index("name")] == "Lead 49-499"
+
+
+def test_xlsx_escapa_xml_y_descarta_caracteres_de_control():
+    data = b"".join(write_xlsx(iter([[{"name": "A & B <S.A.>\x07", "reviews": 0}]])))
+    row = list(load_workbook(io.BytesIO(data)).active.iter_rows(values_only=True))[1]
+    assert row[EXPORT_COLUMNS.index("name")] == "A & B <S.A.>"
+    assert row[EXPORT_COLUMNS.index("reviews")] == 0
+    assert row[EXPORT_COLUMNS.index("phone")] is None
+
+
+def test_formato_desconocido():
+    assert export_writer("csv")[0].startswith("text/csv")
+    with pytest.raises(ValueError):
+        export_writer("pdf")
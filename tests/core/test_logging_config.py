@@ -0,0 +1,95 @@
+import io
+import json
+import logging
+import time
+
+import pytest
+
+from src.core import logging_config
+from src.core.logging_config import log_context, setup_logging
+
+
+class SlowStream(io.StringIO):
+    """stdout con back-pressure (terminal o pipe lleno)."""
+
+    def write(self, text):
+        time.sleep(0.05)
+        return super().write(text)
+
+
+@pytest.fixture
+def root_logging(monkeypatch):
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield monkeypatch
+    logging_config._stop_listener()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def _flush():
+    # Detener el listener vacía la cola antes de leer la salida
+    logging_config._stop_listener()
+
+
+def test_formato_texto_incluye_traceback(root_logging):
+    stream = io.StringIO()
+    root_logging.setattr("sys.stdout", stream)
+    setup_logging("WORKER")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("test").error("❌ fallo %s", "#1", exc_info=True)
+    _flush()
+
+    lines = stream.getvalue().splitlines()
+    assert lines[0].endswith("] [WORKER] ❌ fallo #1")
+    assert lines[-1] == "ValueError: boom"
+
+
+def test_formato_json_con_contexto(root_logging):
+    stream = io.StringIO()
+    root_logging.setattr("sys.stdout", stream)
+    root_logging.setattr(logging_config, "LOG_FORMAT", "json")
+    setup_logging("WORKER")
+    with log_context(job_id=7, owner_id="u1"):
+        logging.getLogger("test").warning("⚠️ lento")
+    logging.getLogger("test").info("fuera")
+    _flush()
+
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["level"] == "WARNING" and first["component"] == "WORKER"
+    assert (first["job_id"], first["owner_id"], first["message"]) == (7, "u1", "⚠️ lento")
+    assert "job_id" not in second
+
+
+def test_loguear_no_espera_a_stdout(root_logging):
+    stream = SlowStream()
+    root_logging.setattr("sys.stdout", stream)
+    setup_logging("WORKER")
+    start = time.perf_counter()
+    for i in range(10):
+        logging.getLogger("test").info(f"listing {i}")
+    assert time.perf_counter() - start < 0.05
+    _flush()
+    assert len(stream.getvalue().splitlines()) == 10
+
+
+def test_rotacion_por_tamano_y_nivel_por_componente(root_logging, tmp_path):
+    log_file = tmp_path / "worker.log"
+    root_logging.setattr("sys.stdout", io.StringIO())
+    root_logging.setattr(logging_config, "LOG_FILE", str(log_file))
+    root_logging.setattr(logging_config, "LOG_MAX_BYTES", 200)
+    root_logging.setattr(logging_config, "LOG_BACKUP_COUNT", 2)
+    root_logging.setenv("LOG_LEVEL_WORKER", "debug")
+    setup_logging("WORKER")
+    assert logging.getLogger().level == logging.DEBUG
+
+    for i in range(20):
+        logging.getLogger("test").debug(f"línea de prueba número {i}")
+    _flush()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["worker.log", "worker.log.1", "worker.log.2"]
+    assert "número 19" in log_file.read_text(encoding="utf-8")
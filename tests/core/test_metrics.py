@@ -0,0 +1,79 @@
+import socket
+import urllib.request
+
+import pytest
+
+from src.core.metrics import CONTENT_TYPE, Counter, Gauge, Histogram, Registry, start_metrics_server
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_counter_render_con_etiquetas(registry):
+    counter = Counter("scraper_listings_total", "Listings", ["result"], registry=registry)
+    counter.inc(result="saved")
+    counter.inc(2, result="saved")
+    counter.inc(result='dup"licate')
+
+    text = registry.render()
+    assert "# TYPE scraper_listings_total counter" in text
+    assert 'scraper_listings_total{result="saved"} 3' in text
+    assert 'scraper_listings_total{result="dup\\"licate"} 1' in text
+    assert counter.value(result="saved") == 3
+
+    with pytest.raises(ValueError):
+        counter.inc(-1, result="saved")
+    with pytest.raises(ValueError):
+        counter.inc(status="saved")
+
+
+def test_nombre_duplicado_rechazado(registry):
+    Counter("jobs_total", "Jobs", registry=registry)
+    with pytest.raises(ValueError):
+        Gauge("jobs_total", "Jobs", registry=registry)
+
+
+def test_histogram_buckets_acumulativos(registry):
+    histogram = Histogram("job_seconds", "Jobs", ["outcome"], buckets=(1, 10), registry=registry)
+    histogram.observe(0.5, outcome="completed")
+    histogram.observe(5, outcome="completed")
+    histogram.observe(50, outcome="completed")
+
+    text = registry.render()
+    assert 'job_seconds_bucket{outcome="completed",le="1"} 1' in text
+    assert 'job_seconds_bucket{outcome="completed",le="10"} 2' in text
+    assert 'job_seconds_bucket{outcome="completed",le="+Inf"} 3' in text
+    assert 'job_seconds_sum{outcome="completed"} 55.5' in text
+    assert histogram.count(outcome="completed") == 3
+
+
+def test_gauge_function_tolera_errores(registry):
+    depth = Gauge("jobs_queue_depth", "Cola", registry=registry)
+    depth.set_function(lambda: 4)
+    assert "jobs_queue_depth 4" in registry.render()
+
+    depth.set_function(lambda: 1 / 0)
+    assert "# TYPE jobs_queue_depth gauge" in registry.render()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_servidor_de_metricas(registry):
+    Counter("bot_messages_total", "Mensajes", registry=registry).inc()
+    assert start_metrics_server(0, registry=registry) is None
+
+    port = _free_port()
+    server = start_metrics_server(port, "127.0.0.1", registry)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert "bot_messages_total 1" in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
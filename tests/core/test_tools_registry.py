@@ -48,6 +48,24 @@ class TestToolsEdgeCases:
 
             assert mock_create.call_count == 2
 
+    def test_cuota_alcanzada_responde_al_agente_sin_seguir_encolando(self):
+        """Si el tenant llega a su cuota, la tool informa lo encolado y cuándo reintentar en vez de fallar."""
+        from src.domain.models import QuotaExceeded
+        with patch("src.core.tools_registry.StorageService.get_category_by_name", return_value=None), \
+             patch("src.core.tools_registry.StorageService.get_city_by_name", return_value=None), \
+             patch("src.core.tools_registry.StorageService.create_hybrid_job",
+                   side_effect=[7, QuotaExceeded("jobs_per_hour", 20, retry_after=90)]) as mock_create:
+
+            respuesta = ejecutar_scraper_google_maps.invoke(
+                {"zonas": "Monterrey; Guadalajara; Saltillo", "categorias": "Dentistas"},
+                config=_make_config()
+            )
+
+        assert mock_create.call_count == 2
+        assert "20 por hora" in respuesta
+        assert "Job IDs: 7" in respuesta
+        assert "2 minuto(s)" in respuesta
+
 
 
 # =============================================================================
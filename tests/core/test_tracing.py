@@ -0,0 +1,53 @@
+import asyncio
+import logging
+
+from src.core.logging_config import ComponentFormatter, ContextFilter
+from src.core.tracing import SPAN_DURATION, current_trace_id, span, trace, traced
+from src.infrastructure.database.db_executor import run_db
+
+
+def test_trace_se_restaura_al_salir():
+    assert current_trace_id() is None
+    with trace("abc123") as trace_id:
+        assert trace_id == current_trace_id() == "abc123"
+        with trace() as inner:
+            assert inner != "abc123" and len(inner) == 16
+        assert current_trace_id() == "abc123"
+    assert current_trace_id() is None
+
+
+async def test_trace_viaja_a_hilos_y_cada_handler_abre_uno_nuevo():
+    seen = []
+
+    @traced("bot.message")
+    async def handler():
+        seen.append((current_trace_id(), await run_db(current_trace_id), await asyncio.to_thread(current_trace_id)))
+
+    before = SPAN_DURATION.count(span="bot.message")
+    await handler()
+    await handler()
+
+    assert all(len(set(ids)) == 1 and ids[0] for ids in seen)
+    assert seen[0][0] != seen[1][0]
+    assert SPAN_DURATION.count(span="bot.message") == before + 2
+    assert current_trace_id() is None
+
+
+def test_span_loguea_duracion_y_resultado(caplog):
+    caplog.set_level(logging.INFO, logger="src.core.tracing")
+    with trace("t1"):
+        try:
+            with span("worker.scrape", query="'Dentistas en Monterrey'"):
+                raise RuntimeError("crash")
+        except RuntimeError:
+            pass
+    message = caplog.records[-1].getMessage()
+    assert message.startswith("⏱️ [TRACE] worker.scrape ")
+    assert message.endswith("ms (error) query='Dentistas en Monterrey'")
+
+
+def test_formato_texto_incluye_trace_id():
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "Iniciando Job #1", None, None)
+    with trace("0123456789abcdef"):
+        ContextFilter().filter(record)
+    assert ComponentFormatter("WORKER").format(record).endswith("] [WORKER] [trace=0123456789abcdef] Iniciando Job #1")
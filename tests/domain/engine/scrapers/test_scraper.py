@@ -144,6 +144,71 @@ def test_excel_segmentation_and_export(tmp_path, memory_scraper):
     
     os.chdir(old_cwd)
 
+def test_canonical_query_ignores_case_accents_and_spaces():
+    """Verifica que búsquedas equivalentes compartan la misma llave canónica."""
+    assert GoogleMapsScraper.canonical_query("Médicos", "  San Pedro ") == GoogleMapsScraper.canonical_query("medicos", "san  pedro")
+
+@pytest.mark.asyncio
+async def test_scrape_reuses_recent_run_without_browser(tmp_path):
+    """Si la misma búsqueda se extrajo hace poco, scrape() reconstruye desde la DB sin abrir Playwright."""
+    from unittest.mock import patch
+    db_file = str(tmp_path / "reuse_leads.db")
+    first = GoogleMapsScraper(headless_override=True, db_path=db_file)
+    first.results = [{"name": "Dental Sonrisa", "zone": "Dentistas en Monterrey", "phone": "8112345678"}]
+    first.completed_queries = [(GoogleMapsScraper.canonical_query("Dentistas", "Monterrey"), "Dentistas en Monterrey")]
+    first.save_to_db()
+
+    snapshots = []
+    scraper = GoogleMapsScraper(headless_override=True, db_path=db_file, reuse_max_age_hours=24, progress_callback=snapshots.append)
+    with patch("src.domain.engine.scrapers.scraper.async_playwright", side_effect=AssertionError("browser launched")):
+        results = await scraper.scrape(["monterrey"], ["dentistas"])
+
+    assert [r["name"] for r in results] == ["Dental Sonrisa"]
+    assert results[0]["_from_cache"] is True
+    assert scraper.reused_queries == ["dentistas en monterrey"]
+    assert snapshots[-1] == {"stage": "reused", "discovered": 1, "processed": 0, "cached": 1, "skipped": 0}
+
+def test_recent_run_is_ignored_when_stale_or_disabled(tmp_path):
+    """Corridas viejas (o reuse desactivado por force_refresh) no se reutilizan."""
+    db_file = str(tmp_path / "stale_leads.db")
+    first = GoogleMapsScraper(headless_override=True, db_path=db_file)
+    first.results = [{"name": "Plomería Luna", "zone": "Plomeros en Saltillo", "phone": "8441234567"}]
+    first.completed_queries = [(GoogleMapsScraper.canonical_query("Plomeros", "Saltillo"), "Plomeros en Saltillo")]
+    first.save_to_db()
+
+    conn = sqlite3.connect(db_file)
+    conn.execute("UPDATE scrape_runs SET scraped_at = datetime('now', '-48 hours')")
+    conn.commit()
+    conn.close()
+
+    assert GoogleMapsScraper(headless_override=True, db_path=db_file, reuse_max_age_hours=24).load_recent_run("Plomeros", "Saltillo") is False
+    assert GoogleMapsScraper(headless_override=True, db_path=db_file, reuse_max_age_hours=72).load_recent_run("Plomeros", "Saltillo") is True
+    assert GoogleMapsScraper(headless_override=True, db_path=db_file, reuse_max_age_hours=None).load_recent_run("Plomeros", "Saltillo") is False
+
+def test_save_to_db_on_fresh_file_applies_leads_migrations(tmp_path):
+    """El Worker puede ser el primero en tocar leads.db: el esquema sale de LEADS_MIGRATIONS completo (FTS5, stats)."""
+    from src.infrastructure.database.migrations import LEADS_MIGRATIONS
+    db_file = str(tmp_path / "fresh_leads.db")
+    scraper = GoogleMapsScraper(headless_override=True, db_path=db_file, job_id=1, owner_id="u1")
+    scraper.results = [{"name": "Dental Sonrisa", "zone": "Dentistas en Monterrey", "reviews": 5}]
+    scraper.save_to_db()
+
+    conn = sqlite3.connect(db_file)
+    assert conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] == LEADS_MIGRATIONS[-1].version
+    assert conn.execute("SELECT rowid FROM leads_fts WHERE leads_fts MATCH 'sonrisa'").fetchall()
+    assert conn.execute("SELECT segment FROM leads").fetchone()[0] is not None
+    conn.close()
+
+@pytest.mark.asyncio
+async def test_scrape_stops_before_browser_when_cancelled(tmp_path):
+    """A cancelled job never launches the browser and surfaces ScrapeCancelled to the worker."""
+    from unittest.mock import patch
+    from src.domain.engine.scrapers.scraper import ScrapeCancelled
+    scraper = GoogleMapsScraper(headless_override=True, db_path=str(tmp_path / "cancel.db"), cancel_check=lambda: True)
+    with patch("src.domain.engine.scrapers.scraper.async_playwright", side_effect=AssertionError("browser launched")):
+        with pytest.raises(ScrapeCancelled):
+            await scraper.scrape(["monterrey"], ["dentistas"])
+
 # --- E2E SYNTHETIC TESTS: Playwright Extraction ---
 
 @pytest.mark.asyncio
@@ -0,0 +1,144 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from src.infrastructure.logs import log_reader
+from src.infrastructure.logs.log_reader import LogFollower, list_log_files, read_lines_reverse, tail
+
+
+def _write(path, lines, mtime=None):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines))
+    if mtime:
+        stamp = datetime.strptime(mtime, "%Y-%m-%d %H:%M:%S").timestamp()
+        os.utime(path, (stamp, stamp))
+
+
+@pytest.fixture
+def logs_dir(tmp_path):
+    worker = tmp_path / "[2026-03-22_10-00-00] [WORKER].log"
+    api = tmp_path / "[2026-03-22_10-00-00] [API].log"
+    _write(worker, [
+        "[2026-03-22 10:00:01] [WORKER] 🚀 [Worker] Scraper Worker Iniciado.",
+        "[2026-03-22 10:00:05] [WORKER] 🔄 [Worker] Iniciando Job #1",
+        "[2026-03-22 10:00:09] [WORKER] ❌ [Worker] Error en Job #1",
+        "Traceback (most recent call last):",
+        '  File "scraper.py", line 1',
+        "TimeoutError: chromium",
+        "[2026-03-22 10:00:12] [WORKER] ✅ [Worker] Job #2 completado con éxito.",
+    ], mtime="2026-03-22 10:00:12")
+    _write(api, [
+        "[2026-03-22 10:00:02] [API] Application startup complete.",
+        "[2026-03-22 10:00:10] [API] ⚠️ [AUTH] OTP inválido",
+    ], mtime="2026-03-22 10:00:10")
+    (tmp_path / "notes.txt").write_text("no es un log")
+    return str(tmp_path)
+
+
+def test_read_lines_reverse_une_lineas_cortadas_por_bloque(tmp_path):
+    path = tmp_path / "a.log"
+    lines = [f"linea {i} " + "x" * (i * 7) for i in range(40)]
+    _write(path, lines)
+    read = list(read_lines_reverse(str(path), block_size=16))
+    assert [line.decode() for _, line in read if line] == list(reversed(lines))
+
+    # Los offsets apuntan al inicio de cada línea
+    data = path.read_bytes()
+    for offset, line in read:
+        if line:
+            assert data[offset:offset + len(line)] == line
+
+
+def test_list_log_files_ignora_otros_archivos(logs_dir):
+    files = list_log_files(logs_dir)
+    assert sorted(f.component for f in files) == ["API", "WORKER"]
+    assert files[0].started == "2026-03-22 10:00:00"
+    assert [f.component for f in list_log_files(logs_dir, "API")] == ["API"]
+
+
+def test_tail_mezcla_componentes_y_agrupa_tracebacks(logs_dir):
+    page = tail(logs_dir, limit=10)
+    times = [e["time"] for e in page["entries"]]
+    assert times == sorted(times, reverse=True)
+    assert [e["component"] for e in page["entries"]][:3] == ["WORKER", "API", "WORKER"]
+    error = page["entries"][2]
+    assert error["level"] == "ERROR"
+    assert error["message"].endswith("TimeoutError: chromium")
+    assert page["next_before"] is None
+
+
+def test_tail_filtra_nivel_componente_texto_y_rango(logs_dir):
+    assert [e["level"] for e in tail(logs_dir, min_level="WARNING")["entries"]] == ["WARNING", "ERROR"]
+    assert [e["component"] for e in tail(logs_dir, component="API")["entries"]] == ["API", "API"]
+    assert len(tail(logs_dir, query="JOB #")["entries"]) == 3
+
+    window = tail(logs_dir, since=datetime(2026, 3, 22, 10, 0, 3), until=datetime(2026, 3, 22, 10, 0, 9))
+    assert [e["time"] for e in window["entries"]] == ["2026-03-22 10:00:09", "2026-03-22 10:00:05"]
+
+
+def test_tail_pagina_con_cursor(logs_dir):
+    seen = []
+    before = None
+    while True:
+        page = tail(logs_dir, limit=2, before=before)
+        seen.extend(e["time"] for e in page["entries"])
+        before = page["next_before"]
+        if before is None:
+            break
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 6
+
+    with pytest.raises(ValueError):
+        tail(logs_dir, before="no-es-un-cursor")
+
+
+def test_tail_respeta_el_presupuesto_de_bytes(logs_dir):
+    page = tail(logs_dir, query="no aparece", max_scan_bytes=1)
+    assert page["entries"] == []
+    assert page["next_before"] is not None
+
+
+def test_tail_no_abre_corridas_anteriores_innecesarias(logs_dir, monkeypatch):
+    old = os.path.join(logs_dir, "[2026-03-21_09-00-00] [WORKER].log")
+    _write(old, ["[2026-03-21 09:00:01] [WORKER] corrida anterior"], mtime="2026-03-21 09:00:01")
+
+    opened = []
+    real = log_reader.read_entries_reverse
+    monkeypatch.setattr(log_reader, "read_entries_reverse", lambda f, end=None: opened.append(f.name) or real(f, end))
+    page = tail(logs_dir, limit=2)
+    assert len(page["entries"]) == 2
+    assert os.path.basename(old) not in opened
+
+
+def test_follower_lee_solo_lo_nuevo(logs_dir):
+    follower = LogFollower(logs_dir, component="WORKER")
+    follower.start()
+    assert follower.poll() == []
+
+    path = os.path.join(logs_dir, "[2026-03-22_10-00-00] [WORKER].log")
+    _write(path, ["[2026-03-22 10:01:00] [WORKER] ❌ fallo", "ValueError: x"])
+    with open(path, "a") as f:
+        f.write("[2026-03-22 10:01:01] [WORKER] línea a medio escribir")
+
+    entries = follower.poll()
+    assert [(e["level"], e["message"]) for e in entries] == [("ERROR", "❌ fallo\nValueError: x")]
+
+    with open(path, "a") as f:
+        f.write("\n")
+    assert [e["message"] for e in follower.poll()] == ["línea a medio escribir"]
+
+    # Reinicio de start_dev.sh: la corrida nueva se sigue desde el inicio
+    _write(os.path.join(logs_dir, "[2026-03-22_11-00-00] [WORKER].log"), ["[2026-03-22 11:00:00] [WORKER] nueva corrida"])
+    assert [e["message"] for e in follower.poll()] == ["nueva corrida"]
+
+
+def test_tail_lee_lineas_json(tmp_path):
+    path = tmp_path / "[2026-03-22_10-00-00] [WORKER].log"
+    _write(path, [
+        json.dumps({"time": "2026-03-22 10:00:01", "component": "WORKER", "level": "DEBUG", "message": "detalle", "job_id": 1}),
+        json.dumps({"time": "2026-03-22 10:00:02", "component": "WORKER", "level": "ERROR", "message": "falló", "exc": "ValueError: x"}),
+    ])
+    entries = tail(str(tmp_path))["entries"]
+    assert [(e["level"], e["message"]) for e in entries] == [("ERROR", "falló\nValueError: x"), ("DEBUG", "detalle")]
@@ -0,0 +1,87 @@
+"""
+Pruebas para src/infrastructure/database/catalog_cache.py
+
+El catálogo se sirve desde memoria, se busca por nombre sin mayúsculas ni acentos y se invalida
+tanto por las escrituras de StorageService como por escrituras de otros procesos (catalog_version).
+"""
+import os
+import sqlite3
+import tempfile
+import pytest
+from unittest.mock import patch
+
+from src.infrastructure.database import storage_service
+from src.infrastructure.database.storage_service import StorageService, _init_db
+from src.infrastructure.database.catalog_cache import catalog_cache, normalize_name
+from src.infrastructure.database.connection import close_all
+
+
+@pytest.fixture
+def db_path():
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "bastion_bot.db")
+    with patch.object(storage_service, "DB_PATH", path):
+        _init_db()
+        yield path
+    close_all()
+
+
+@pytest.fixture
+def catalogo(db_path):
+    country = StorageService.create_country("México")
+    state = StorageService.create_state("Nuevo León", country)
+    StorageService.create_master_city("Monterrey", state)
+    StorageService.create_master_city("San Pedro Garza García", state)
+    StorageService.create_category("Dentistas")
+    return {"country": country, "state": state}
+
+
+def test_normalize_name_ignora_acentos_mayusculas_y_espacios():
+    assert normalize_name("  San Pedro  GARZA García ") == normalize_name("san pedro garza garcia")
+
+
+def test_busqueda_por_nombre_sin_acentos(catalogo):
+    assert StorageService.get_city_by_name("san pedro garza garcia")["name"] == "San Pedro Garza García"
+    assert StorageService.get_or_create_city("MONTERREY") is not None
+    assert StorageService.get_category_by_name("dentistas")["name"] == "Dentistas"
+    assert StorageService.get_city_by_name("Saltillo") is None
+
+
+def test_escrituras_de_storage_invalidan_al_instante(catalogo):
+    before = StorageService.get_catalog_version()
+    assert StorageService.get_category_by_name("Plomeros") is None
+
+    StorageService.create_category("Plomeros")
+    assert StorageService.get_category_by_name("plomeros") is not None
+    assert StorageService.get_catalog_version() > before
+
+    StorageService.delete_state_with_cascade(catalogo["state"])
+    assert StorageService.get_states_by_country(catalogo["country"]) == []
+    assert StorageService.get_master_cities(limit=100) == []
+
+
+def test_escrituras_externas_se_ven_al_vencer_el_ttl(db_path, catalogo):
+    """Otro proceso (Bot/Worker) escribe directo en SQLite: los triggers suben catalog_version."""
+    assert StorageService.get_city_by_name("Apodaca") is None
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO master_cities (name, state_id) VALUES ('Apodaca', ?)", (catalogo["state"],))
+
+    # Dentro del TTL se sigue sirviendo el snapshot en memoria
+    assert StorageService.get_city_by_name("Apodaca") is None
+    with patch.object(catalog_cache, "ttl_seconds", 0):
+        assert StorageService.get_city_by_name("apodaca")["name"] == "Apodaca"
+
+
+def test_paginacion_desde_cache_igual_que_sql(catalogo):
+    names = [c["name"] for c in StorageService.get_master_cities(limit=100)]
+    assert names == ["Monterrey", "San Pedro Garza García"]
+
+    first = StorageService.get_master_cities(limit=1)
+    rest = StorageService.get_master_cities(limit=1, after=(first[0]["name"], first[0]["id"]))
+    assert [c["name"] for c in rest] == ["San Pedro Garza García"]
+    assert rest[0]["state_name"] == "Nuevo León" and rest[0]["country_name"] == "México"
+    assert StorageService.get_master_cities(limit=1, offset=1) == rest
+
+    # Las copias devueltas no alteran el caché
+    rest[0]["name"] = "X"
+    assert StorageService.get_master_cities(limit=1, offset=1)[0]["name"] == "San Pedro Garza García"
@@ -0,0 +1,72 @@
+"""
+Pruebas para src/infrastructure/database/connection.py
+
+Las conexiones se reutilizan por hilo y archivo, llegan ajustadas (WAL, busy_timeout)
+y los helpers de transacción hacen commit/rollback sin contaminar la siguiente llamada.
+"""
+import sqlite3
+import threading
+import pytest
+
+from src.infrastructure.database import connection as db
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "pool.db")
+    yield path
+    db.close_all()
+
+
+def test_conexion_reutilizada_por_hilo_y_ajustada(db_file):
+    conn = db.get_connection(db_file)
+    assert db.get_connection(db_file) is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db.get_connection(db_file)))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+def test_memoria_no_se_reutiliza():
+    assert db.get_connection(":memory:") is not db.get_connection(":memory:")
+
+
+def test_transaction_hace_rollback_y_restaura_row_factory(db_file):
+    with db.connection(db_file) as conn:
+        conn.execute("CREATE TABLE t (v INTEGER)")
+
+    with pytest.raises(ValueError):
+        with db.transaction(db_file) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("INSERT INTO t VALUES (1)")
+            raise ValueError("boom")
+
+    with db.connection(db_file) as conn:
+        assert conn.row_factory is None
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        assert not conn.in_transaction
+
+
+def test_connection_anidada_no_cierra_la_transaccion_externa(db_file):
+    """Un _db() dentro de transaction() en el mismo hilo se une a ella: el rollback externo descarta todo."""
+    with db.connection(db_file) as conn:
+        conn.execute("CREATE TABLE t (v INTEGER)")
+
+    with pytest.raises(ValueError):
+        with db.transaction(db_file) as outer:
+            outer.execute("INSERT INTO t VALUES (1)")
+            with db.connection(db_file) as inner:
+                assert inner is outer
+                inner.row_factory = sqlite3.Row
+                inner.execute("INSERT INTO t VALUES (2)")
+            assert outer.in_transaction
+            assert outer.row_factory is None
+            raise ValueError("boom")
+
+    with db.connection(db_file) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
@@ -0,0 +1,47 @@
+"""
+Pruebas para src/infrastructure/database/db_executor.py
+
+run_db() debe sacar las consultas bloqueantes del event loop: dos llamadas lentas
+concurrentes se solapan y el loop sigue atendiendo otras corrutinas mientras tanto.
+"""
+import asyncio
+import threading
+import time
+import pytest
+
+from src.infrastructure.database.db_executor import run_db
+
+
+def _consulta_lenta(valor, espera=0.2):
+    time.sleep(espera)
+    return valor, threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_run_db_no_bloquea_el_event_loop():
+    ticks = []
+
+    async def latido():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.02)
+
+    inicio = time.monotonic()
+    resultados = await asyncio.gather(
+        run_db(_consulta_lenta, "a"), run_db(_consulta_lenta, "b", espera=0.2), latido()
+    )
+    transcurrido = time.monotonic() - inicio
+
+    assert [r[0] for r in resultados[:2]] == ["a", "b"]
+    assert all(r[1].startswith("sqlite") for r in resultados[:2])
+    assert transcurrido < 0.35  # las dos consultas corrieron en paralelo
+    assert len(ticks) == 5 and ticks[1] - ticks[0] < 0.15  # el loop siguió libre
+
+
+@pytest.mark.asyncio
+async def test_run_db_propaga_excepciones():
+    def falla():
+        raise ValueError("database is locked")
+
+    with pytest.raises(ValueError):
+        await run_db(falla)
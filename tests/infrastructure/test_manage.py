@@ -0,0 +1,39 @@
+"""
+Pruebas para src/infrastructure/database/manage.py
+
+`status` es de solo lectura: no crea archivos ni la tabla schema_version.
+"""
+import os
+import sqlite3
+from unittest.mock import patch
+
+from src.infrastructure.database import manage, storage_service
+from src.infrastructure.database.connection import close_all
+from src.infrastructure.database.migrations import MAIN_MIGRATIONS
+
+
+def test_status_no_escribe_en_bases_sin_inicializar(tmp_path, capsys):
+    main_db, leads_db = str(tmp_path / "bastion_bot.db"), str(tmp_path / "leads.db")
+    sqlite3.connect(leads_db).close()  # archivo existente pero sin schema_version
+    with patch.object(storage_service, "DB_PATH", main_db), patch.object(storage_service, "LEADS_DB_PATH", leads_db):
+        assert manage.status() == 0
+
+    out = capsys.readouterr().out
+    assert out.count("sin inicializar") == 2
+    assert not os.path.exists(main_db)
+    with sqlite3.connect(leads_db) as conn:
+        assert conn.execute("SELECT name FROM sqlite_master").fetchall() == []
+
+
+def test_status_reporta_la_version_aplicada(tmp_path, capsys):
+    main_db, leads_db = str(tmp_path / "bastion_bot.db"), str(tmp_path / "leads.db")
+    with patch.object(storage_service, "DB_PATH", main_db), patch.object(storage_service, "LEADS_DB_PATH", leads_db):
+        try:
+            manage.migrate()
+        finally:
+            close_all()
+        capsys.readouterr()
+        manage.status()
+
+    latest = MAIN_MIGRATIONS[-1].version
+    assert f"bastion_bot ({main_db}): v{latest} / v{latest} - al día" in capsys.readouterr().out
@@ -0,0 +1,53 @@
+"""
+Pruebas para src/infrastructure/database/migrations.py
+
+- Una base nueva queda en la última versión y re-migrar no hace nada.
+- Una base creada antes del versionado (columnas faltantes, tablas legacy) se actualiza sin errores.
+"""
+import sqlite3
+
+from src.infrastructure.database.migrations import (
+    MAIN_MIGRATIONS, apply_migrations, current_version, ensure_schema
+)
+from src.infrastructure.database.connection import close_all
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_base_nueva_migra_una_sola_vez():
+    conn = sqlite3.connect(":memory:")
+    applied = apply_migrations(conn, MAIN_MIGRATIONS)
+    assert applied == [m.version for m in MAIN_MIGRATIONS]
+    assert current_version(conn) == MAIN_MIGRATIONS[-1].version
+    assert apply_migrations(conn, MAIN_MIGRATIONS) == []
+
+
+def test_base_legacy_sin_versionado_se_actualiza():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE batch_jobs (id INTEGER PRIMARY KEY, owner_id TEXT NOT NULL, status TEXT DEFAULT 'pending', created_at TIMESTAMP)")
+    conn.execute("CREATE TABLE master_countries (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("CREATE TABLE countries (id INTEGER PRIMARY KEY)")
+    conn.execute("INSERT INTO batch_jobs (owner_id) VALUES ('u1')")
+    conn.commit()
+
+    apply_migrations(conn, MAIN_MIGRATIONS)
+
+    assert {"zona_text", "categoria_text", "priority", "force_refresh"} <= _columns(conn, "batch_jobs")
+    assert "status" in _columns(conn, "master_countries")
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert "countries" not in tables
+    # El backfill de la cola fair-share incluye al tenant con Jobs pendientes previos
+    assert conn.execute("SELECT owner_id FROM job_queue_owners").fetchall() == [("u1",)]
+
+
+def test_ensure_schema_migra_en_el_primer_uso(tmp_path):
+    path = str(tmp_path / "nested" / "bot.db")
+    try:
+        assert ensure_schema(path, MAIN_MIGRATIONS) == [m.version for m in MAIN_MIGRATIONS]
+        assert ensure_schema(path, MAIN_MIGRATIONS) == []
+        with sqlite3.connect(path) as conn:
+            assert current_version(conn) == MAIN_MIGRATIONS[-1].version
+    finally:
+        close_all()
@@ -0,0 +1,138 @@
+"""
+Regresión de planes de consulta (EXPLAIN QUERY PLAN) para las consultas calientes de StorageService.
+
+Se captura el SQL real que ejecuta cada método (trace callback sobre la conexión del pool) y se
+verifica que SQLite lo resuelva con índices. Si alguien cambia una consulta o borra un índice y
+la consulta vuelve a recorrer toda la tabla, esta prueba falla.
+
+Las lecturas del catálogo maestro no están aquí: se sirven desde catalog_cache (ver la prueba al final).
+
+Única excepción: get_pending_job recorre job_queue_owners para el reparto justo, pero solo las filas
+de tenants con Jobs pendientes (índice parcial idx_job_queue_owners_active); su costo no crece con el
+histórico de batch_jobs ni con los tenants inactivos.
+"""
+import os
+import sqlite3
+import tempfile
+import pytest
+from unittest.mock import patch
+
+from src.infrastructure.database import storage_service
+from src.infrastructure.database.storage_service import StorageService, _init_db
+from src.infrastructure.database.connection import get_connection, close_all
+
+# Recorridos permitidos (detalle exacto del plan)
+# job_queue_owners en get_pending_job: acotado por tenants con Jobs pendientes
+ALLOWED_SCANS = {"SCAN o USING INDEX idx_job_queue_owners_active"}
+
+
+@pytest.fixture
+def dbs():
+    tmp = tempfile.mkdtemp()
+    main_db, leads_db = os.path.join(tmp, "bastion_bot.db"), os.path.join(tmp, "leads.db")
+    with patch.object(storage_service, "DB_PATH", main_db), patch.object(storage_service, "LEADS_DB_PATH", leads_db):
+        _init_db()
+        sqlite3.connect(leads_db).close()  # get_leads_for_job solo lee si el archivo existe
+        job_id = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Dentistas", zona_text="Monterrey")
+        yield main_db, leads_db, job_id
+    close_all()
+
+
+def _captured_plans(paths, operation):
+    """Ejecuta `operation` registrando su SQL y retorna [(sql, [detalles del plan])]."""
+    statements = []
+    for path in paths:
+        get_connection(path).set_trace_callback(statements.append)
+    try:
+        operation()
+    finally:
+        for path in paths:
+            get_connection(path).set_trace_callback(None)
+
+    plans = []
+    for sql in statements:
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE")) or "schema_version" in sql:
+            continue
+        for path in paths:
+            try:
+                rows = get_connection(path).execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            except sqlite3.OperationalError:
+                continue  # la tabla vive en la otra base
+            plans.append((sql, [row[3] for row in rows]))
+            break
+    return plans
+
+
+HOT_QUERIES = {
+    "get_pending_job": lambda job_id: StorageService.get_pending_job(),
+    "get_jobs": lambda job_id: StorageService.get_jobs("u1", limit=50, offset=0),
+    "get_job_by_id": lambda job_id: StorageService.get_job_by_id(job_id, "u1"),
+    "get_jobs_keyset": lambda job_id: StorageService.get_jobs("u1", limit=50, after=("2026-01-01 00:00:00", 10**6)),
+    "get_jobs_keyset_status": lambda job_id: StorageService.get_jobs("u1", limit=50, after=("2026-01-01 00:00:00", 10**6),
+                                                                     status="completed"),
+    "get_batches": lambda job_id: StorageService.get_batches("u1", limit=50, after=("2026-01-01 00:00:00", 10**6)),
+    "get_batch": lambda job_id: StorageService.get_batch(1, "u1"),
+    "get_job_events": lambda job_id: StorageService.get_job_events(0),
+    "get_stats": lambda job_id: StorageService.get_stats("u1"),
+    "count_pending_jobs": lambda job_id: StorageService.count_pending_jobs(),
+    "create_hybrid_job_quota": lambda job_id: StorageService.create_hybrid_job("u1", categoria_text="Cat", zona_text="Z"),
+    "get_tenant_quota": lambda job_id: StorageService.get_tenant_quota("u1"),
+    "requeue_stale_jobs": lambda job_id: StorageService.requeue_stale_jobs(1800),
+    "get_leads_for_job": lambda job_id: StorageService.get_leads_for_job(job_id, "u1"),
+    "get_leads_for_job_keyset": lambda job_id: StorageService.get_leads_for_job(job_id, "u1", limit=50, after=("A", "z"),
+                                                                               min_stars=4),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_consulta_caliente_usa_indices(dbs, name):
+    main_db, leads_db, job_id = dbs
+    plans = _captured_plans([main_db, leads_db], lambda: HOT_QUERIES[name](job_id))
+    assert plans, f"{name} no ejecutó ninguna consulta"
+
+    for sql, details in plans:
+        scans = [d for d in details if d.startswith("SCAN") and d not in ALLOWED_SCANS]
+        assert not scans, f"{name} recorre la tabla completa: {scans}\n{sql}"
+        if "job_queue_owners o" not in sql:
+            # Ordenar en memoria implica leer todas las filas candidatas antes del LIMIT
+            assert not any("TEMP B-TREE" in d for d in details), f"{name} ordena sin índice: {details}\n{sql}"
+
+
+
+def test_get_pending_job_solo_recorre_tenants_con_pendientes(dbs):
+    """Los tenants sin Jobs pendientes no entran al reparto: no se recorren ni se consultan sus colas."""
+    main_db, leads_db, _ = dbs
+    conn = get_connection(main_db)
+    conn.executemany("INSERT INTO job_queue_owners (owner_id) VALUES (?)", [(f"old_{i}",) for i in range(200)])
+    conn.commit()
+    assert conn.execute("SELECT pending_count FROM job_queue_owners WHERE owner_id = 'u1'").fetchone() == (1,)
+
+    plans = _captured_plans([main_db], StorageService.get_pending_job)
+    heads = [details for sql, details in plans if "job_queue_owners o" in sql]
+    assert heads and all("SCAN o USING INDEX idx_job_queue_owners_active" in details for details in heads)
+    assert conn.execute("SELECT pending_count FROM job_queue_owners WHERE owner_id = 'u1'").fetchone() == (0,)
+
+
+CATALOG_READS = [
+    lambda: StorageService.get_countries(),
+    lambda: StorageService.get_states_by_country(1),
+    lambda: StorageService.get_master_cities(limit=100, state_id=1, after=("M", 1)),
+    lambda: StorageService.get_categories(limit=100, after=("D", 1)),
+    lambda: StorageService.get_city_by_name("monterrey"),
+    lambda: StorageService.get_or_create_city("MONTERREY"),
+    lambda: StorageService.get_category_by_name("dentistas"),
+]
+
+
+def test_catalogo_cacheado_no_consulta_sqlite(dbs):
+    """Con el caché caliente las lecturas del catálogo no ejecutan SQL; al invalidar solo se revisa catalog_version por PK."""
+    main_db, leads_db, _ = dbs
+    StorageService.get_countries()  # carga el snapshot
+
+    assert _captured_plans([main_db], lambda: [read() for read in CATALOG_READS]) == []
+
+    from src.infrastructure.database.catalog_cache import catalog_cache
+    catalog_cache.invalidate(main_db)
+    plans = _captured_plans([main_db], lambda: [read() for read in CATALOG_READS])
+    assert len(plans) == 1 and "catalog_version" in plans[0][0]
+    assert not any(d.startswith("SCAN") for d in plans[0][1]), plans
@@ -2,6 +2,7 @@ import sqlite3
 import pytest
 from unittest.mock import patch
 from src.infrastructure.database.storage_service import StorageService
+from src.infrastructure.database.connection import close_all
 
 import os
 import tempfile
@@ -16,6 +17,7 @@ def clean_db():
         from src.infrastructure.database.storage_service import _init_db
         _init_db()  # Recrea esquemas en el archivo vacío
         yield
+        close_all()  # Las conexiones del pool apuntan al archivo temporal
         
     if os.path.exists(temp_path):
         os.remove(temp_path)
@@ -195,3 +197,439 @@ class TestStorageServiceTDD:
             
         health = StorageService.get_worker_health()
         assert health['status'] == 'offline'
+
+    def test_get_pending_job_prioriza_jobs_interactivos(self):
+        """Un Job interactivo (Bot) debe adelantarse a un lote BULK encolado antes."""
+        from src.domain.models import JobPriority
+        StorageService.create_batch_jobs([(None, "Cat", None, f"Zona {i}", "tenant_lote") for i in range(3)])
+        interactive_id = StorageService.create_hybrid_job(
+            owner_id="tenant_bot", categoria_text="Dentistas", zona_text="Monterrey",
+            priority=JobPriority.INTERACTIVE
+        )
+
+        job = StorageService.get_pending_job()
+        assert job['id'] == interactive_id
+        assert job['priority'] == JobPriority.INTERACTIVE
+
+    def test_jobs_guardan_el_trace_id_de_la_peticion(self):
+        """El Worker retoma desde la fila el trace_id de la petición que encoló el Job."""
+        from src.core.tracing import trace
+        with trace("trace-bot-1"):
+            StorageService.create_hybrid_job(owner_id="tenant_bot", categoria_text="Dentistas", zona_text="Monterrey")
+            StorageService.create_batch_jobs([(None, "Cat", None, "Zona", "tenant_bot")])
+        StorageService.create_hybrid_job(owner_id="tenant_bot", categoria_text="Plomeros", zona_text="Saltillo", trace_id="explicit")
+
+        claimed = sorted(StorageService.get_pending_job()['trace_id'] for _ in range(3))
+        assert claimed == ["explicit", "trace-bot-1", "trace-bot-1"]
+
+    def test_get_pending_job_reparte_turnos_entre_tenants(self):
+        """Un tenant con un lote enorme no debe acaparar la cola: los turnos se alternan por owner."""
+        StorageService.create_batch_jobs([(None, "Cat", None, f"Zona {i}", "tenant_a") for i in range(5)])
+        StorageService.create_batch_jobs([(None, "Cat", None, f"Zona {i}", "tenant_b") for i in range(2)])
+
+        owners = [StorageService.get_pending_job()['owner_id'] for _ in range(4)]
+        assert owners == ["tenant_a", "tenant_b", "tenant_a", "tenant_b"]
+
+        # Agotado tenant_b, el resto de la cola de tenant_a continúa en orden FIFO
+        remaining = [StorageService.get_pending_job()['zona_text'] for _ in range(3)]
+        assert remaining == ["Zona 2", "Zona 3", "Zona 4"]
+        assert StorageService.get_pending_job() is None
+
+    def test_progreso_del_job_visible_en_detalle_y_en_bloque(self):
+        """El progreso se guarda por Job y solo es visible para su tenant."""
+        own_id = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="Zona")
+        other_id = StorageService.create_hybrid_job(owner_id="u2", categoria_text="Cat", zona_text="Zona")
+
+        assert StorageService.get_job_by_id(own_id, "u1")['progress'] is None
+
+        StorageService.update_job_progress(own_id, stage="extracting", discovered=40, processed=12, cached=3, skipped=1)
+        StorageService.update_job_progress(own_id, stage="extracting", discovered=40, processed=20, cached=3, skipped=2)
+        StorageService.update_job_progress(other_id, stage="searching")
+
+        progress = StorageService.get_job_by_id(own_id, "u1")['progress']
+        assert progress['stage'] == "extracting"
+        assert (progress['processed'], progress['skipped']) == (20, 2)
+
+        bulk = StorageService.get_jobs_progress("u1", [own_id, other_id])
+        assert [row['job_id'] for row in bulk] == [own_id]
+
+    def test_cancelar_jobs_saca_de_la_cola_y_no_se_sobrescribe(self):
+        """Cancelar deja el Job fuera de la cola y el resultado tardío del worker no lo pisa."""
+        queued = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="A")
+        running = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="B")
+        foreign = StorageService.create_hybrid_job(owner_id="u2", categoria_text="Cat", zona_text="C")
+        from src.infrastructure.database import storage_service
+        with sqlite3.connect(storage_service.DB_PATH) as conn:
+            conn.execute("UPDATE batch_jobs SET status='processing' WHERE id=?", (running,))
+
+        assert StorageService.cancel_jobs("u1", [queued, foreign]) == 1
+        assert StorageService.cancel_jobs("u1") == 1  # todos los activos restantes (el processing)
+        assert StorageService.is_job_cancelled(running) is True
+        assert StorageService.is_job_cancelled(foreign) is False
+
+        StorageService.update_job_status(running, 'completed')
+        assert StorageService.get_job_by_id(running, "u1")['status'] == 'cancelled'
+        assert StorageService.get_pending_job()['id'] == foreign
+
+    def test_jobs_huerfanos_vuelven_a_la_cola_y_liberan_el_slot(self):
+        """Un Job en processing sin avance (Worker caído) vuelve a pending; uno con progreso reciente no."""
+        StorageService.set_tenant_quota("u1", max_processing=1)
+        orphan = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="A")
+        StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="B")
+        alive = StorageService.create_hybrid_job(owner_id="u2", categoria_text="Cat", zona_text="C")
+        assert [StorageService.get_pending_job()['id'] for _ in range(2)] == [orphan, alive]
+        assert StorageService.get_pending_job() is None  # u1 ocupa su único slot
+
+        from src.infrastructure.database import storage_service
+        with sqlite3.connect(storage_service.DB_PATH) as conn:
+            conn.execute("UPDATE batch_jobs SET updated_at = datetime('now', '-2 hours') WHERE id IN (?, ?)", (orphan, alive))
+        StorageService.update_job_progress(alive, stage="extracting", processed=3)
+
+        assert StorageService.requeue_stale_jobs(3600) == 1
+        assert StorageService.get_job_by_id(orphan, "u1")['status'] == 'pending'
+        assert StorageService.get_job_by_id(alive, "u2")['status'] == 'processing'
+        assert StorageService.requeue_stale_jobs(3600) == 0
+        assert StorageService.get_pending_job()['id'] == orphan
+
+    def test_retry_solo_reencola_jobs_terminados_sin_exito_del_tenant(self):
+        """Reintentar no toca Jobs activos (otro Worker lo reclamaría dos veces) ni Jobs ajenos."""
+        failed = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="A")
+        running = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="B")
+        StorageService.update_job_status(failed, 'failed')
+        from src.infrastructure.database import storage_service
+        with sqlite3.connect(storage_service.DB_PATH) as conn:
+            conn.execute("UPDATE batch_jobs SET status='processing' WHERE id=?", (running,))
+
+        assert StorageService.retry_job(failed, "u2") is False
+        assert StorageService.retry_job(running, "u1") is False
+        assert StorageService.retry_job(failed, "u1") is True
+        assert StorageService.retry_job(failed, "u1") is False  # ya está pending
+        assert StorageService.get_job_by_id(running, "u1")['status'] == 'processing'
+
+        StorageService.cancel_jobs("u1", [failed])
+        assert StorageService.retry_job(failed, "u1") is True
+
+    def test_leads_del_job_por_relacion_exacta(self, tmp_path):
+        """job_leads enlaza cada lead con los Jobs que lo encontraron, sin depender del texto de zona."""
+        from src.domain.engine.scrapers.scraper import GoogleMapsScraper
+        leads_db = str(tmp_path / "leads.db")
+        with patch("src.infrastructure.database.storage_service.LEADS_DB_PATH", leads_db):
+            first = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Dentistas", zona_text="Monterrey")
+            second = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Odontólogos", zona_text="MTY")
+
+            lead = {"name": "Dental Sonrisa", "zone": "Dentistas en Monterrey", "phone": "8112345678"}
+            scraper = GoogleMapsScraper(headless_override=True, db_path=leads_db, job_id=first, owner_id="u1")
+            scraper.results = [dict(lead)]
+            scraper.save_to_db()
+            # El segundo Job (otra zona textual) reencuentra el mismo lead desde el caché
+            scraper = GoogleMapsScraper(headless_override=True, db_path=leads_db, job_id=second, owner_id="u1")
+            scraper.results = [dict(lead, _from_cache=True)]
+            scraper.save_to_db()
+
+            assert [l['name'] for l in StorageService.get_leads_for_job(first, "u1")] == ["Dental Sonrisa"]
+            assert [l['name'] for l in StorageService.get_leads_for_job(second, "u1")] == ["Dental Sonrisa"]
+            assert StorageService.get_leads_for_job(first, "u2") == []
+
+    def test_paginacion_keyset_de_jobs_sin_saltos_ni_duplicados(self):
+        """Recorrer con el keyset (created_at, id) entrega cada Job una sola vez, aun con created_at empatado."""
+        ids = [StorageService.create_hybrid_job(owner_id="u1", categoria_text=f"Cat {i}", zona_text="MTY") for i in range(5)]
+        StorageService.update_job_status(ids[0], 'completed')
+
+        seen, after = [], None
+        while True:
+            page = StorageService.get_jobs("u1", limit=2, after=after)
+            seen.extend(job['id'] for job in page)
+            if len(page) < 2:
+                break
+            after = (page[-1]['created_at'], page[-1]['id'])
+        assert seen == sorted(ids, reverse=True)
+        assert [j['id'] for j in StorageService.get_jobs("u1", status="completed")] == [ids[0]]
+
+    def test_leads_del_job_paginados_y_filtrados_en_sql(self, tmp_path):
+        from src.domain.engine.scrapers.scraper import GoogleMapsScraper
+        leads_db = str(tmp_path / "leads.db")
+        with patch("src.infrastructure.database.storage_service.LEADS_DB_PATH", leads_db):
+            job_id = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Dentistas", zona_text="Monterrey")
+            StorageService.get_leads_for_job(job_id, "u1")  # aplica las migraciones de leads.db (columna segment)
+            scraper = GoogleMapsScraper(headless_override=True, db_path=leads_db, job_id=job_id, owner_id="u1")
+            scraper.results = [
+                {"name": "C Dental", "zone": "Dentistas en Monterrey", "stars": 4.9, "reviews": 10},
+                {"name": "A Dental", "zone": "Dentistas en Monterrey", "stars": 3.0, "reviews": 5000},
+                {"name": "B Dental", "zone": "Dentistas en Monterrey", "stars": 4.6, "reviews": 0},
+            ]
+            scraper.save_to_db()
+
+            first = StorageService.get_leads_for_job(job_id, "u1", limit=2)
+            assert [l['name'] for l in first] == ["A Dental", "B Dental"]
+            rest = StorageService.get_leads_for_job(job_id, "u1", limit=2, after=(first[-1]['name'], first[-1]['zone']))
+            assert [l['name'] for l in rest] == ["C Dental"]
+
+            micro = StorageService.get_leads_for_job(job_id, "u1", segment="Micro", min_stars=4.7)
+            assert [l['name'] for l in micro] == ["C Dental"]
+
+    def test_lote_por_estado_y_nacional_se_expande_en_sql(self):
+        """INSERT … SELECT: un Job por ciudad activa del alcance, todos con el mismo batch_id."""
+        country = StorageService.create_country("Mexico")
+        nl = StorageService.create_state("NL", country)
+        coah = StorageService.create_state("Coahuila", country)
+        for name in ("Monterrey", "Apodaca"):
+            StorageService.create_master_city(name, nl)
+        saltillo = StorageService.create_master_city("Saltillo", coah)
+        inactive = StorageService.create_master_city("Ramos", coah)
+        with sqlite3.connect(StorageService.get_db_path()) as conn:
+            conn.execute("UPDATE master_cities SET status=0 WHERE id=?", (inactive,))
+
+        batch_id, count = StorageService.create_batch_for_cities("u1", category_id=1, state_id=nl)
+        assert count == 2
+        national_id, national_count = StorageService.create_batch_for_cities("u1", category_id=1, force_refresh=True)
+        assert national_count == 3 and national_id != batch_id
+
+        with sqlite3.connect(StorageService.get_db_path()) as conn:
+            rows = conn.execute(
+                "SELECT city_id, priority, force_refresh FROM batch_jobs WHERE batch_id=? ORDER BY city_id", (national_id,)
+            ).fetchall()
+            batch = conn.execute("SELECT scope, total_jobs FROM batches WHERE id=?", (national_id,)).fetchone()
+        assert inactive not in [r[0] for r in rows] and saltillo in [r[0] for r in rows]
+        assert {(r[1], r[2]) for r in rows} == {(0, 1)}  # JobPriority.BULK, force_refresh
+        assert batch == ("country", 3)
+
+    def test_lote_sin_ciudades_no_deja_lote_vacio(self):
+        assert StorageService.create_batch_for_cities("u1", category_id=1, state_id=999) == (None, 0)
+        with sqlite3.connect(StorageService.get_db_path()) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0] == 0
+
+    def test_contadores_del_lote_se_mantienen_con_cada_cambio_de_status(self):
+        """Los triggers mueven cada Job entre contadores: leer el avance del lote es una sola fila."""
+        country = StorageService.create_country("Mexico")
+        state = StorageService.create_state("NL", country)
+        for name in ("Monterrey", "Apodaca", "Escobedo", "Juárez"):
+            StorageService.create_master_city(name, state)
+        batch_id, _ = StorageService.create_batch_for_cities("u1", category_id=1, state_id=state)
+        assert StorageService.get_batch(batch_id, "u1")["pending"] == 4
+
+        done = StorageService.get_pending_job()['id']
+        StorageService.set_job_leads_found(done, 12)
+        StorageService.update_job_status(done, 'completed')
+        failed = StorageService.get_pending_job()['id']
+        StorageService.update_job_status(failed, 'failed')
+        StorageService.get_pending_job()  # queda en processing
+        assert StorageService.cancel_jobs("u1", batch_id=batch_id) == 2
+
+        batch = StorageService.get_batch(batch_id, "u1")
+        assert (batch["pending"], batch["processing"], batch["completed"], batch["failed"], batch["cancelled"]) == (0, 0, 1, 1, 2)
+        assert batch["leads_found"] == 12 and batch["total_jobs"] == 4
+        assert StorageService.get_batch(batch_id, "u2") is None
+        assert [b["id"] for b in StorageService.get_batches("u1")] == [batch_id]
+
+    def test_busqueda_de_texto_completo_en_leads_del_tenant(self, tmp_path):
+        """FTS5: prefijos, sin acentos, ranking por nombre, acotada al tenant y paginada por keyset."""
+        from src.domain.engine.scrapers.scraper import GoogleMapsScraper
+        leads_db = str(tmp_path / "leads.db")
+        with patch("src.infrastructure.database.storage_service.LEADS_DB_PATH", leads_db):
+            job_u1 = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Dentistas", zona_text="Monterrey")
+            job_u2 = StorageService.create_hybrid_job(owner_id="u2", categoria_text="Dentistas", zona_text="Saltillo")
+            StorageService.get_leads_for_job(job_u1, "u1")  # aplica las migraciones de leads.db (FTS + triggers)
+
+            scraper = GoogleMapsScraper(headless_override=True, db_path=leads_db, job_id=job_u1, owner_id="u1")
+            scraper.results = [
+                {"name": "Clínica Dental Sonrisa", "zone": "Dentistas en Monterrey", "address": "Av. Constitución 100"},
+                {"name": "Consultorio Pérez", "zone": "Dentistas en Monterrey", "address": "Calle Dental 5", "stars": 4.9},
+                {"name": "Ferretería Centro", "zone": "Dentistas en Monterrey", "website": "ferrecentro.mx"},
+            ]
+            scraper.save_to_db()
+            scraper = GoogleMapsScraper(headless_override=True, db_path=leads_db, job_id=job_u2, owner_id="u2")
+            scraper.results = [{"name": "Dental Saltillo", "zone": "Dentistas en Saltillo"}]
+            scraper.save_to_db()
+
+            results = StorageService.search_leads("u1", "clinica dent")
+            assert [r["name"] for r in results] == ["Clínica Dental Sonrisa"]
+
+            # Coincidencia en el nombre pesa más que en la dirección; u2 no ve leads de u1 ni al revés
+            results = StorageService.search_leads("u1", "dental")
+            assert [r["name"] for r in results] == ["Clínica Dental Sonrisa", "Consultorio Pérez"]
+            page = StorageService.search_leads("u1", "dental", limit=1)
+            rest = StorageService.search_leads("u1", "dental", limit=1, after=(page[0]["rank"], page[0]["lead_rowid"]))
+            assert [r["name"] for r in rest] == ["Consultorio Pérez"]
+            assert [r["name"] for r in StorageService.search_leads("u1", "dental", min_stars=4.5)] == ["Consultorio Pérez"]
+            assert [r["name"] for r in StorageService.search_leads("u2", "dental")] == ["Dental Saltillo"]
+
+            assert [r["name"] for r in StorageService.search_leads("u1", "ferrecentro")] == ["Ferretería Centro"]
+            with sqlite3.connect(leads_db) as conn:
+                conn.execute("UPDATE leads SET website='ferre.com' WHERE name='Ferretería Centro'")
+            assert StorageService.search_leads("u1", "ferrecentro") == []
+
+            with pytest.raises(ValueError):
+                StorageService.search_leads("u1", "  ** ")
+
+    def test_exportacion_de_leads_por_chunks(self, tmp_path):
+        """La exportación lee leads.db por chunks de tamaño fijo; un Job ajeno no se exporta."""
+        from src.domain.engine.scrapers.scraper import GoogleMapsScraper
+        leads_db = str(tmp_path / "leads.db")
+        with patch("src.infrastructure.database.storage_service.LEADS_DB_PATH", leads_db):
+            job_id = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Dentistas", zona_text="Monterrey")
+            StorageService.get_leads_for_job(job_id, "u1")  # aplica las migraciones de leads.db
+            scraper = GoogleMapsScraper(headless_override=True, db_path=leads_db, job_id=job_id, owner_id="u1")
+            scraper.results = [{"name": f"Dental {i}", "zone": "Dentistas en Monterrey", "stars": 4.0 + i / 10} for i in range(5)]
+            scraper.save_to_db()
+
+            chunks = list(StorageService.open_lead_export("u1", job_id=job_id, chunk_size=2))
+            assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+            assert [l["name"] for chunk in chunks for l in chunk] == [f"Dental {i}" for i in range(5)]
+
+            high = [l["name"] for chunk in StorageService.open_lead_export("u1", job_id=job_id, min_stars=4.3) for l in chunk]
+            assert high == ["Dental 3", "Dental 4"]
+            found = [l["name"] for chunk in StorageService.open_lead_export("u1", query="dental 4") for l in chunk]
+            assert found == ["Dental 4"]
+            assert StorageService.open_lead_export("u2", job_id=job_id) is None
+            assert StorageService.open_lead_export("u1", batch_id=999) is None
+
+    def test_triggers_registran_eventos_de_status_y_progreso(self):
+        """El log job_events se llena solo: cambios de status reales y cada escritura de progreso."""
+        job_id = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Dentistas", zona_text="Monterrey")
+        start = StorageService.get_last_job_event_id()
+        StorageService.update_job_status(job_id, 'processing')
+        StorageService.update_job_status(job_id, 'processing')  # sin cambio: sin evento
+        StorageService.update_job_progress(job_id, 'scraping', discovered=10, processed=3)
+        StorageService.update_job_progress(job_id, 'scraping', discovered=10, processed=7)
+
+        events = StorageService.get_job_events(start)
+        assert [(e["type"], e["job_id"], e["owner_id"]) for e in events] == [
+            ("status", job_id, "u1"), ("progress", job_id, "u1"), ("progress", job_id, "u1")]
+        assert events[0]["payload"]["status"] == "processing"
+        assert events[2]["payload"]["processed"] == 7
+        assert StorageService.get_job_events(start, owner_id="u2") == []
+        assert [e["id"] for e in StorageService.get_job_events(events[0]["id"], limit=1)] == [events[1]["id"]]
+
+        assert StorageService.prune_job_events(3600) == 0
+        assert StorageService.prune_job_events(-60) == 3
+
+    def test_estadisticas_incrementales_coinciden_con_el_recalculo(self, tmp_path):
+        """Los triggers mantienen los contadores del Dashboard; rebuild_stats llega al mismo resultado."""
+        from src.domain.engine.scrapers.scraper import GoogleMapsScraper
+        leads_db = str(tmp_path / "leads.db")
+        with patch("src.infrastructure.database.storage_service.LEADS_DB_PATH", leads_db):
+            country = StorageService.create_country("Mexico")
+            city = StorageService.create_master_city("Monterrey", StorageService.create_state("NL", country))
+            first = StorageService.create_hybrid_job(owner_id="u1", category_id=1, city_id=city)
+            second = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Dentistas", zona_text="Saltillo")
+            StorageService.create_hybrid_job(owner_id="u2", categoria_text="Dentistas", zona_text="Saltillo")
+            StorageService.get_leads_for_job(first, "u1")  # aplica las migraciones de leads.db
+
+            StorageService.update_job_status(first, 'completed')
+            StorageService.update_job_status(second, 'failed')
+            StorageService.set_job_leads_found(first, 2)
+            for job_id in (first, second):
+                # El segundo Job reencuentra un lead del primero: por tenant se cuenta una vez
+                scraper = GoogleMapsScraper(headless_override=True, db_path=leads_db, job_id=job_id, owner_id="u1")
+                scraper.results = [{"name": "Dental A", "zone": "Dentistas en Monterrey", "reviews": 5000},
+                                   {"name": f"Dental {job_id}", "zone": "Dentistas en Monterrey"}]
+                scraper.save_to_db()
+
+            stats = StorageService.get_stats("u1")
+            assert stats["jobs_by_status"] == {"completed": 1, "failed": 1}
+            assert stats["leads_by_city"] == {"Monterrey": 2}
+            assert sum(stats["leads_by_segment"].values()) == 3
+            assert StorageService.get_stats()["jobs_by_status"] == {"completed": 1, "failed": 1, "pending": 1}
+            assert StorageService.count_pending_jobs() == 1
+
+            StorageService.rebuild_stats()
+            assert StorageService.get_stats("u1") == stats
+
+    def test_cuota_por_hora_usa_token_bucket_y_sugiere_reintento(self):
+        """Con 2 Jobs/hora el tercero se rechaza sin insertarse; el bucket se recarga con el tiempo."""
+        from src.domain.models import QuotaExceeded
+        StorageService.set_tenant_quota("u1", jobs_per_hour=2)
+        with patch("src.infrastructure.database.storage_service.time.time", return_value=1000.0):
+            StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="A")
+            StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="B")
+            with pytest.raises(QuotaExceeded) as exc:
+                StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="C")
+            StorageService.create_hybrid_job(owner_id="u2", categoria_text="Cat", zona_text="C")  # otro tenant
+
+        assert exc.value.quota == "jobs_per_hour"
+        assert exc.value.retry_after == pytest.approx(1800)
+        assert StorageService.get_stats("u1")["jobs_by_status"] == {"pending": 2}
+
+        with patch("src.infrastructure.database.storage_service.time.time", return_value=1000.0 + 1800):
+            StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="C")
+            quota = StorageService.get_tenant_quota("u1")
+        assert quota["jobs_per_hour"] == 2
+        assert quota["overrides"] == {"jobs_per_hour": 2, "max_pending": None, "max_processing": None}
+        assert quota["usage"]["pending"] == 3
+        assert quota["usage"]["tokens"] == pytest.approx(0)
+
+    def test_retry_cuenta_contra_las_cuotas(self):
+        """Reencolar un Job fallido consume cuota: con el bucket vacío se rechaza y el Job sigue fallido."""
+        from src.domain.models import QuotaExceeded
+        StorageService.set_tenant_quota("u1", jobs_per_hour=1)
+        with patch("src.infrastructure.database.storage_service.time.time", return_value=1000.0):
+            job_id = StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="A")
+            StorageService.update_job_status(job_id, 'failed')
+            with pytest.raises(QuotaExceeded):
+                StorageService.retry_job(job_id, "u1")
+        assert StorageService.get_job_by_id(job_id, "u1")['status'] == 'failed'
+
+        with patch("src.infrastructure.database.storage_service.time.time", return_value=1000.0 + 3600):
+            assert StorageService.retry_job(job_id, "u1") is True
+
+    def test_cuota_de_pendientes_revierte_el_lote_completo(self):
+        """Un lote que no cabe en max_pending no deja lote ni Jobs a medias."""
+        from src.domain.models import QuotaExceeded
+        country = StorageService.create_country("Mexico")
+        state = StorageService.create_state("NL", country)
+        for name in ("Monterrey", "San Pedro", "Apodaca"):
+            StorageService.create_master_city(name, state)
+        StorageService.set_tenant_quota("u1", max_pending=4)
+        StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="A")
+        StorageService.create_batch_jobs([(None, "Cat", None, "B", "u1")])
+
+        with pytest.raises(QuotaExceeded) as exc:
+            StorageService.create_batch_for_cities("u1", category_id=1, state_id=state)
+        assert exc.value.quota == "max_pending"
+        assert exc.value.retry_after is not None
+        assert StorageService.get_batches("u1") == []
+        assert StorageService.get_stats("u1")["jobs_by_status"] == {"pending": 2}
+
+        StorageService.set_tenant_quota("u1", max_pending=2)
+        with pytest.raises(QuotaExceeded) as exc:
+            StorageService.create_batch_for_cities("u1", category_id=1, state_id=state)
+        assert exc.value.retry_after is not None  # Entra cuando el Worker vacíe la cola
+
+        StorageService.set_tenant_quota("u1")
+        assert StorageService.create_batch_for_cities("u1", category_id=1, state_id=state)[1] == 3
+
+    def test_lote_mayor_que_las_cuotas_entra_con_la_cola_vacia_y_deja_deuda(self):
+        """Un lote de 5 ciudades con 3 Jobs/hora y cola de 4: entra completo, el siguiente espera la recarga."""
+        from src.domain.models import QuotaExceeded
+        country = StorageService.create_country("Mexico")
+        state = StorageService.create_state("NL", country)
+        for name in ("Monterrey", "San Pedro", "Apodaca", "Guadalupe", "Escobedo"):
+            StorageService.create_master_city(name, state)
+        StorageService.set_tenant_quota("u1", jobs_per_hour=3, max_pending=4)
+
+        with patch("src.infrastructure.database.storage_service.time.time", return_value=1000.0):
+            assert StorageService.create_batch_for_cities("u1", category_id=1, state_id=state)[1] == 5
+            assert StorageService.get_tenant_quota("u1")["usage"]["tokens"] == pytest.approx(-2)
+
+        for job in StorageService.get_jobs("u1", limit=10):
+            StorageService.update_job_status(job["id"], "completed")
+        # Cola vacía pero bucket en deuda: en 1200 s recargó 1 token (queda en -1) y faltan 2 más
+        with patch("src.infrastructure.database.storage_service.time.time", return_value=1000.0 + 1200):
+            with pytest.raises(QuotaExceeded) as exc:
+                StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="A")
+        assert exc.value.quota == "jobs_per_hour"
+        assert exc.value.retry_after == pytest.approx(2400)
+        with patch("src.infrastructure.database.storage_service.time.time", return_value=1000.0 + 3600):
+            assert StorageService.create_hybrid_job(owner_id="u1", categoria_text="Cat", zona_text="A")
+
+    def test_get_pending_job_respeta_slots_de_procesamiento(self):
+        """Un tenant en su max_processing cede el turno; al terminar un Job vuelve a la rotación."""
+        StorageService.set_tenant_quota("tenant_a", max_processing=1)
+        StorageService.create_batch_jobs([(None, "Cat", None, f"Zona {i}", "tenant_a") for i in range(3)])
+        StorageService.create_batch_jobs([(None, "Cat", None, f"Zona {i}", "tenant_b") for i in range(2)])
+
+        claimed = [StorageService.get_pending_job() for _ in range(4)]
+        assert [job['owner_id'] if job else None for job in claimed] == ["tenant_a", "tenant_b", "tenant_b", None]
+
+        StorageService.update_job_status(claimed[0]['id'], 'completed')
+        assert StorageService.get_pending_job()['owner_id'] == "tenant_a"
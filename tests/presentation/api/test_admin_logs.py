@@ -0,0 +1,68 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from src.presentation.api import admin
+from src.presentation.api.main import app
+from src.presentation.api.auth import get_current_user
+
+client = TestClient(app)
+
+LINES = [
+    "[2026-03-22 10:00:01] [WORKER] 🔄 [Worker] Iniciando Job #1",
+    "[2026-03-22 10:00:02] [WORKER] ❌ [Worker] Error en Job #1",
+    "[2026-03-22 10:00:03] [WORKER] ✅ [Worker] Job #2 completado con éxito.",
+]
+
+@pytest.fixture
+def logs_dir(tmp_path):
+    (tmp_path / "[2026-03-22_10-00-00] [WORKER].log").write_text("\n".join(LINES) + "\n", encoding="utf-8")
+    with patch.object(admin, "LOGS_DIR", str(tmp_path)):
+        yield tmp_path
+
+@pytest.fixture
+def as_role():
+    def set_role(role):
+        app.dependency_overrides[get_current_user] = lambda: {"sub": "u1", "role": role}
+        return client
+    yield set_role
+    app.dependency_overrides.clear()
+
+def test_logs_require_admin(as_role, logs_dir):
+    tenant = as_role("tenant")
+    assert tenant.get("/api/admin/logs").status_code == 403
+    assert tenant.get("/api/admin/logs/files").status_code == 403
+    assert tenant.get("/api/admin/logs/stream").status_code == 403
+
+def test_logs_tail_filters_and_pages(as_role, logs_dir):
+    admin_client = as_role("admin")
+    assert [f["component"] for f in admin_client.get("/api/admin/logs/files").json()] == ["WORKER"]
+
+    body = admin_client.get("/api/admin/logs", params={"limit": 2}).json()
+    assert [e["time"][-2:] for e in body["entries"]] == ["03", "02"]
+    older = admin_client.get("/api/admin/logs", params={"limit": 2, "before": body["next_before"]}).json()
+    assert [e["time"][-2:] for e in older["entries"]] == ["01"]
+    assert older["next_before"] is None
+
+    errors = admin_client.get("/api/admin/logs", params={"level": "ERROR"}).json()["entries"]
+    assert [e["message"] for e in errors] == ["❌ [Worker] Error en Job #1"]
+
+    assert admin_client.get("/api/admin/logs", params={"before": "%%%"}).status_code == 400
+    assert admin_client.get("/api/admin/logs", params={"level": "TRACE"}).status_code == 422
+
+async def test_logs_stream_follows_new_lines(as_role, logs_dir):
+    as_role("admin")
+    with patch.object(admin, "LOG_FOLLOW_POLL_SECONDS", 0.01):
+        response = await admin.stream_logs(component="WORKER", level=None, q=None, current_user={"role": "admin"})
+        stream = response.body_iterator
+        assert (await stream.__anext__()).startswith("retry:")
+
+        with open(logs_dir / "[2026-03-22_10-00-00] [WORKER].log", "a", encoding="utf-8") as f:
+            f.write("[2026-03-22 10:00:04] [WORKER] ⚠️ cola lenta\n")
+        event = await stream.__anext__()
+        await stream.aclose()
+
+    assert event.startswith("event: log\n")
+    payload = json.loads(event.split("data: ", 1)[1])
+    assert payload["level"] == "WARNING"
+    assert payload["message"] == "⚠️ cola lenta"
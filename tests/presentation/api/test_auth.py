@@ -1,28 +1,74 @@
 import pytest
+import time
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock
 from src.presentation.api.main import app
-import datetime
+from src.presentation.api.auth import _otp_hash
+from src.infrastructure.database.storage_service import StorageService
 
 client = TestClient(app)
 
+@pytest.fixture
+def otp_db(tmp_path):
+    """auth_otps en una BD temporal: la misma tabla que comparten todos los procesos de la API."""
+    with patch("src.infrastructure.database.storage_service.DB_PATH", str(tmp_path / "auth.db")):
+        yield
+
+@pytest.fixture
+def telegram_bot():
+    with patch("src.presentation.api.auth.Bot") as bot_class, \
+         patch("src.presentation.api.auth.es_usuario_permitido", return_value=True), \
+         patch("src.core.security.es_admin", return_value=False):
+        bot_class.return_value.send_message = AsyncMock()
+        yield bot_class.return_value
+
+def _sent_code(bot) -> str:
+    text = bot.send_message.call_args.kwargs["text"]
+    return text.split("*")[1]
+
 @patch("src.presentation.api.auth.es_usuario_permitido")
 def test_request_otp_con_chat_id_no_autorizado_retorna_403(mock_es_usuario_permitido):
     mock_es_usuario_permitido.return_value = False
     response = client.post("/api/auth/request-otp", json={"chat_id": "99999"})
     assert response.status_code == 403
 
-def test_verify_otp_con_codigo_invalido_retorna_400():
-    future_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
-    
-    mock_db = {
-        "test_chat": {
-            "code": "1234",
-            "expires_at": future_time
-        }
-    }
-    
+def test_verify_otp_con_codigo_invalido_retorna_400(otp_db):
+    StorageService.save_otp("12345", _otp_hash("12345", "1234"), 300, 30, time.time())
+
     with patch("src.presentation.api.auth.es_usuario_permitido", return_value=True):
-        with patch.dict("src.presentation.api.auth.otp_store", mock_db, clear=True):
-            response = client.post("/api/auth/verify-otp", json={"chat_id": "test_chat", "code": "9999"})
-            assert response.status_code == 400
+        response = client.post("/api/auth/verify-otp", json={"chat_id": "12345", "code": "9999"})
+        assert response.status_code == 400
+
+def test_otp_pedido_y_verificado_se_consume_una_vez(otp_db, telegram_bot):
+    assert client.post("/api/auth/request-otp", json={"chat_id": " 12345 "}).status_code == 200
+    code = _sent_code(telegram_bot)
+
+    response = client.post("/api/auth/verify-otp", json={"chat_id": "12345", "code": code})
+    assert response.status_code == 200
+    assert "token" in response.json()
+    assert client.post("/api/auth/verify-otp", json={"chat_id": "12345", "code": code}).status_code == 400
+
+def test_otp_reenvio_limitado(otp_db, telegram_bot):
+    assert client.post("/api/auth/request-otp", json={"chat_id": "12345"}).status_code == 200
+    response = client.post("/api/auth/request-otp", json={"chat_id": "12345"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+
+def test_otp_se_bloquea_al_agotar_intentos(otp_db, telegram_bot):
+    client.post("/api/auth/request-otp", json={"chat_id": "12345"})
+    code = _sent_code(telegram_bot)
+    wrong = "0000" if code != "0000" else "1111"
+
+    statuses = [client.post("/api/auth/verify-otp", json={"chat_id": "12345", "code": wrong}).status_code for _ in range(5)]
+    assert statuses == [400, 400, 400, 400, 429]
+    # El código correcto ya no sirve: hay que pedir uno nuevo
+    assert client.post("/api/auth/verify-otp", json={"chat_id": "12345", "code": code}).status_code == 400
+
+def test_otp_expira_y_se_purga(otp_db):
+    now = time.time()
+    StorageService.save_otp("a", _otp_hash("a", "1234"), 300, 30, now - 600)
+    assert StorageService.consume_otp("a", _otp_hash("a", "1234"), 5, now) == "expired"
+
+    StorageService.save_otp("b", _otp_hash("b", "1234"), 300, 30, now - 600)
+    StorageService.save_otp("c", _otp_hash("c", "1234"), 300, 30, now)
+    assert StorageService.consume_otp("b", _otp_hash("b", "1234"), 5, now) == "missing"
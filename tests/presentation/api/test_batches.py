@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from src.presentation.api.main import app
+from src.presentation.api.auth import get_current_user
+
+client = TestClient(app)
+
+BATCH = {
+    "id": 3, "owner_id": "tenant_1", "scope": "state", "category_id": 1, "state_id": 19,
+    "total_jobs": 300, "pending": 74, "processing": 0, "completed": 212, "failed": 14, "cancelled": 0,
+    "leads_found": 5120, "created_at": "2026-01-01 10:00:00",
+}
+
+@pytest.fixture(autouse=True)
+def auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "tenant_1", "role": "tenant"}
+    yield
+    app.dependency_overrides.clear()
+
+@patch("src.presentation.api.batches.StorageService")
+def test_get_batch_retorna_contadores(mock_storage):
+    mock_storage.get_batch.return_value = BATCH
+    response = client.get("/api/batches/3")
+    assert response.status_code == 200
+    assert response.json()["completed"] == 212 and response.json()["failed"] == 14
+    mock_storage.get_batch.assert_called_once_with(batch_id=3, owner_id="tenant_1")
+
+@patch("src.presentation.api.batches.StorageService")
+def test_get_batch_ajeno_retorna_404(mock_storage):
+    mock_storage.get_batch.return_value = None
+    assert client.get("/api/batches/3").status_code == 404
+    assert client.patch("/api/batches/3/cancel").status_code == 404
+    mock_storage.cancel_jobs.assert_not_called()
+
+@patch("src.presentation.api.batches.StorageService")
+def test_listado_de_lotes_con_cursor(mock_storage):
+    mock_storage.get_batches.return_value = [BATCH]
+    response = client.get("/api/batches?limit=1")
+    assert response.status_code == 200
+    cursor = response.headers["X-Next-Cursor"]
+
+    client.get(f"/api/batches?limit=1&cursor={cursor}")
+    mock_storage.get_batches.assert_called_with(owner_id="tenant_1", limit=1, after=("2026-01-01 10:00:00", 3))
+
+@patch("src.presentation.api.batches.StorageService")
+def test_cancelar_lote(mock_storage):
+    mock_storage.get_batch.return_value = BATCH
+    mock_storage.cancel_jobs.return_value = 74
+    response = client.patch("/api/batches/3/cancel")
+    assert response.status_code == 200
+    assert response.json()["cancelled"] == 74
+    mock_storage.cancel_jobs.assert_called_once_with(owner_id="tenant_1", batch_id=3)
@@ -67,6 +67,24 @@ def test_retry_job_updates_status_returns_200(mock_storage, auth_client):
     response = auth_client.patch("/api/jobs/1/retry", headers={"Authorization": "Bearer fake_token"})
     assert response.status_code == 200
     assert response.json()["message"] == "Job rescheduled for processing"
+    mock_storage.retry_job.assert_called_once_with(1, "test_chat_123")
+
+@patch("src.presentation.api.jobs.StorageService")
+def test_retry_active_job_returns_409(mock_storage, auth_client):
+    mock_storage.get_job_by_id.return_value = {"id": 1, "status": "processing"}
+    mock_storage.retry_job.return_value = False
+    response = auth_client.patch("/api/jobs/1/retry")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Job is already processing"
+
+@patch("src.presentation.api.jobs.StorageService")
+def test_retry_job_over_quota_returns_429(mock_storage, auth_client):
+    from src.domain.models import QuotaExceeded
+    mock_storage.get_job_by_id.return_value = {"id": 1, "status": "failed"}
+    mock_storage.retry_job.side_effect = QuotaExceeded("max_pending", 10, retry_after=60)
+    response = auth_client.patch("/api/jobs/1/retry")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "60"
 
 @patch("src.presentation.api.jobs.StorageService")
 def test_get_jobs_with_pagination_params(mock_storage, auth_client):
@@ -119,3 +137,122 @@ def test_create_job_requires_minimal_data(mock_storage, auth_client):
     """
     response = auth_client.post("/api/jobs", json={}, headers={"Authorization": "Bearer fake_token"})
     assert response.status_code == 422
+
+@patch("src.presentation.api.jobs.StorageService")
+def test_get_jobs_progress_en_bloque(mock_storage, auth_client):
+    """El endpoint bulk de progreso parsea los ids y devuelve los contadores del tenant."""
+    mock_storage.get_jobs_progress.return_value = [
+        {"job_id": 1, "stage": "extracting", "discovered": 40, "processed": 10, "cached": 2, "skipped": 1, "updated_at": "2026-03-22 20:00:00"}
+    ]
+    response = auth_client.get("/api/jobs/progress?ids=1,2", headers={"Authorization": "Bearer fake_token"})
+    assert response.status_code == 200
+    assert response.json()[0]["processed"] == 10
+    mock_storage.get_jobs_progress.assert_called_with(owner_id="test_chat_123", job_ids=[1, 2])
+
+    response = auth_client.get("/api/jobs/progress?ids=1,abc", headers={"Authorization": "Bearer fake_token"})
+    assert response.status_code == 400
+
+@patch("src.presentation.api.jobs.StorageService")
+def test_get_job_by_id_incluye_progreso(mock_storage, auth_client):
+    mock_storage.get_job_by_id.return_value = {
+        "id": 1, "owner_id": "test_chat_123", "status": "processing", "categoria_text": "Dentistas", "zona_text": "Monterrey",
+        "progress": {"job_id": 1, "stage": "scrolling", "discovered": 0, "processed": 0, "cached": 0, "skipped": 0}
+    }
+    response = auth_client.get("/api/jobs/1", headers={"Authorization": "Bearer fake_token"})
+    assert response.status_code == 200
+    assert response.json()["progress"]["stage"] == "scrolling"
+
+@patch("src.presentation.api.jobs.StorageService")
+def test_cancel_job_activo_y_terminado(mock_storage, auth_client):
+    """Cancelar un Job activo responde 200; uno ya terminado responde 409."""
+    mock_storage.get_job_by_id.return_value = {"id": 1, "owner_id": "test_chat_123", "status": "processing"}
+    mock_storage.cancel_jobs.return_value = 1
+    response = auth_client.patch("/api/jobs/1/cancel", headers={"Authorization": "Bearer fake_token"})
+    assert response.status_code == 200
+    mock_storage.cancel_jobs.assert_called_with(owner_id="test_chat_123", job_ids=[1])
+
+    mock_storage.get_job_by_id.return_value = {"id": 1, "owner_id": "test_chat_123", "status": "completed"}
+    mock_storage.cancel_jobs.return_value = 0
+    response = auth_client.patch("/api/jobs/1/cancel", headers={"Authorization": "Bearer fake_token"})
+    assert response.status_code == 409
+
+@patch("src.presentation.api.jobs.StorageService")
+def test_cancel_jobs_en_bloque(mock_storage, auth_client):
+    mock_storage.cancel_jobs.return_value = 120
+    response = auth_client.patch("/api/jobs/cancel", json={"all_active": True}, headers={"Authorization": "Bearer fake_token"})
+    assert response.status_code == 200
+    assert response.json()["cancelled"] == 120
+    mock_storage.cancel_jobs.assert_called_with(owner_id="test_chat_123", job_ids=None)
+
+    response = auth_client.patch("/api/jobs/cancel", json={}, headers={"Authorization": "Bearer fake_token"})
+    assert response.status_code == 422
+
+@patch("src.presentation.api.jobs.StorageService")
+def test_create_batch_retorna_batch_id_y_total(mock_storage, auth_client):
+    mock_storage.create_batch_for_cities.return_value = (12, 2450)
+    response = auth_client.post("/api/jobs/batch", json={"category_id": 3, "all_cities": True},
+                                headers={"Authorization": "Bearer fake_token"})
+    assert response.status_code == 201
+    assert response.json()["batch_id"] == 12 and response.json()["count"] == 2450
+    mock_storage.create_batch_for_cities.assert_called_once_with(
+        owner_id="test_chat_123", category_id=3, state_id=None, city_id=None, force_refresh=False
+    )
+    mock_storage.get_master_cities.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_stream_job_events_filters_by_job_and_formats_sse():
+    """The SSE endpoint forwards the tenant's events for the requested job in text/event-stream format."""
+    import asyncio
+    from contextlib import asynccontextmanager
+    from src.presentation.api.jobs import stream_job_events
+
+    queue = asyncio.Queue()
+    queue.put_nowait({"id": 7, "job_id": 2, "owner_id": "test_chat_123", "type": "status", "payload": {"status": "failed"}})
+    queue.put_nowait({"id": 8, "job_id": 1, "owner_id": "test_chat_123", "type": "progress",
+                      "payload": {"stage": "scraping", "processed": 3}, "created_at": "2026-01-01 10:00:00"})
+    queue.put_nowait(None)
+
+    subscriptions = []
+
+    @asynccontextmanager
+    async def subscribe(owner_id, last_event_id=None):
+        subscriptions.append((owner_id, last_event_id))
+        yield queue
+
+    with patch("src.presentation.api.jobs.job_event_broker.subscribe", subscribe):
+        response = await stream_job_events(job_id=1, last_event_id=5, current_user={"sub": "test_chat_123"})
+        assert response.media_type == "text/event-stream"
+        chunks = [chunk async for chunk in response.body_iterator]
+
+    assert subscriptions == [("test_chat_123", 5)]
+    assert chunks[0].startswith("retry:")
+    assert chunks[1] == ('id: 8\nevent: progress\ndata: {"job_id": 1, "stage": "scraping", "processed": 3, '
+                         '"at": "2026-01-01 10:00:00"}\n\n')
+    assert chunks[2].startswith("event: reset")
+
+@patch("src.presentation.api.jobs.StorageService")
+def test_create_job_over_quota_returns_429_with_retry_after(mock_storage, auth_client):
+    from src.domain.models import QuotaExceeded
+    mock_storage.create_hybrid_job.side_effect = QuotaExceeded("jobs_per_hour", 100, retry_after=35.2)
+    response = auth_client.post("/api/jobs", json={"category_id": 1, "city_id": 1})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "36"
+    assert "jobs_per_hour" in response.json()["detail"]
+
+@patch("src.presentation.api.jobs.StorageService")
+def test_quota_without_retry_estimate_returns_429_without_retry_after(mock_storage, auth_client):
+    from src.domain.models import QuotaExceeded
+    mock_storage.create_batch_for_cities.side_effect = QuotaExceeded("max_pending", 500)
+    response = auth_client.post("/api/jobs/batch", json={"category_id": 1, "all_cities": True})
+    assert response.status_code == 429
+    assert "Retry-After" not in response.headers
+
+@patch("src.presentation.api.admin.StorageService")
+def test_admin_sets_tenant_quota(mock_storage, auth_client):
+    mock_storage.get_tenant_quota.return_value = {"owner_id": "t1", "jobs_per_hour": 10}
+    response = auth_client.put("/api/admin/quotas/t1", json={"jobs_per_hour": 10})
+    assert response.status_code == 200
+    mock_storage.set_tenant_quota.assert_called_once_with("t1", jobs_per_hour=10, max_pending=None, max_processing=None)
+
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "u1", "role": "user"}
+    assert auth_client.get("/api/admin/quotas/t1").status_code == 403
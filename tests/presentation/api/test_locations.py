@@ -188,3 +188,27 @@ def test_delete_state_requires_admin_and_returns_204():
         mock_delete.assert_called_once_with(5)
         assert res.status_code == 204
     app.dependency_overrides.clear()
+
+
+# ---------------------------------------------------------------------------
+# Revalidación HTTP del catálogo (ETag / 304)
+# ---------------------------------------------------------------------------
+def test_catalogo_responde_etag_y_304_si_no_cambio():
+    mock_data = [{"id": 1, "name": "Mexico"}]
+    with patch("src.presentation.api.locations.StorageService.get_catalog_version", return_value=7), \
+         patch("src.presentation.api.locations.StorageService.get_countries", return_value=mock_data) as mock_get:
+        res = client.get("/api/countries")
+        assert res.status_code == 200
+        etag = res.headers["ETag"]
+        assert "no-cache" in res.headers["Cache-Control"]
+
+        res = client.get("/api/countries", headers={"If-None-Match": etag})
+        assert res.status_code == 304
+        assert res.headers["ETag"] == etag
+        assert mock_get.call_count == 1  # el 304 no arma la lista
+
+    with patch("src.presentation.api.locations.StorageService.get_catalog_version", return_value=8), \
+         patch("src.presentation.api.locations.StorageService.get_countries", return_value=mock_data):
+        res = client.get("/api/countries", headers={"If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["ETag"] != etag
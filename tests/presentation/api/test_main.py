@@ -0,0 +1,36 @@
+import io
+import logging
+
+from fastapi.testclient import TestClient
+
+from src.core import logging_config
+from src.presentation.api.main import app
+
+
+def test_lifespan_configura_el_logging_y_lo_vacia_al_apagar(monkeypatch):
+    """
+    uvicorn importa `app` (no ejecuta main.py), así que el logging se configura en el arranque
+    del lifespan y la cola se vacía al apagar: ningún log del cierre se pierde.
+    """
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    stream = io.StringIO()
+    monkeypatch.setattr("sys.stdout", stream)
+    try:
+        with TestClient(app) as client:
+            assert logging_config._listener is not None
+            client.get("/health")
+            logging.getLogger("test").info("apagando")
+
+        assert logging_config._listener is None
+        assert "] [API] apagando" in stream.getvalue()
+        # Tras el apagado se escribe directo, sin hilo de por medio
+        logging.getLogger("test").info("tras el cierre")
+        assert "] [API] tras el cierre" in stream.getvalue()
+    finally:
+        logging_config._stop_listener()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
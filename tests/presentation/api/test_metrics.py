@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from src.presentation.api.main import app
+from src.presentation.api.metrics import REQUEST_LATENCY
+
+client = TestClient(app)
+TOKEN = "scrape-token"
+
+def test_metrics_exposes_route_templates_and_queue_depth():
+    client.get("/api/jobs/no-such-job")
+    client.get("/no/such/path")
+
+    with patch("src.infrastructure.database.storage_service.StorageService.count_pending_jobs", return_value=7), \
+            patch("src.presentation.api.metrics.METRICS_TOKEN", TOKEN):
+        response = client.get("/metrics", headers={"Authorization": f"Bearer {TOKEN}"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    # Path templates, never raw IDs
+    assert 'route="/api/jobs/{job_id}"' in body
+    assert "no-such-job" not in body
+    assert REQUEST_LATENCY.count(method="GET", route="unmatched", status=404) >= 1
+    assert "jobs_queue_depth 7" in body
+    assert "http_requests_in_flight" in body
+
+def test_metrics_requires_the_configured_token():
+    with patch("src.presentation.api.metrics.METRICS_TOKEN", TOKEN):
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        assert client.get("/metrics", headers={"Authorization": TOKEN}).status_code == 401
+
+def test_metrics_disabled_without_token():
+    with patch("src.presentation.api.metrics.METRICS_TOKEN", ""):
+        assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 404
@@ -23,7 +23,8 @@ def test_get_categories_with_dynamic_pagination(auth_client):
         for limit in [10, 20, 30, 50, 100]:
             response = auth_client.get(f"/api/categories?limit={limit}&offset=0")
             assert response.status_code == 200
-            mock_get.assert_called_with()
+            # La paginación se resuelve en SQL, no recortando el catálogo completo en memoria
+            mock_get.assert_called_with(limit=limit, offset=0)
 
 def test_get_cities_with_dynamic_pagination(auth_client):
     """Verifica que el endpoint de ciudades acepte limit dinámico (10, 20, 50, 100)."""
@@ -44,3 +45,94 @@ def test_get_jobs_with_various_limits(auth_client):
             response = auth_client.get(f"/api/jobs?limit={limit}&offset=0")
             assert response.status_code == 200
             mock_get.assert_called_with(owner_id="test_user", limit=limit, offset=0)
+
+def test_get_jobs_full_page_exposes_next_cursor_and_round_trips(auth_client):
+    """Una página llena expone X-Next-Cursor; al reenviarlo llega a Storage como keyset (created_at, id)."""
+    rows = [
+        {"id": 9, "owner_id": "test_user", "status": "pending", "created_at": "2026-01-02 10:00:00"},
+        {"id": 7, "owner_id": "test_user", "status": "pending", "created_at": "2026-01-01 10:00:00"},
+    ]
+    with patch("src.infrastructure.database.storage_service.StorageService.get_jobs", return_value=rows) as mock_get:
+        response = auth_client.get("/api/jobs?limit=2")
+        assert response.status_code == 200
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = auth_client.get(f"/api/jobs?limit=2&cursor={cursor}&status=pending")
+        assert response.status_code == 200
+        mock_get.assert_called_with(owner_id="test_user", limit=2, offset=0,
+                                    after=("2026-01-01 10:00:00", 7), status="pending")
+
+def test_partial_page_has_no_next_cursor(auth_client):
+    with patch("src.infrastructure.database.storage_service.StorageService.get_master_cities",
+               return_value=[{"id": 1, "name": "Monterrey", "state_id": 1}]):
+        response = auth_client.get("/api/cities?limit=10")
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+
+def test_invalid_cursor_returns_400(auth_client):
+    with patch("src.infrastructure.database.storage_service.StorageService.get_categories", return_value=[]):
+        assert auth_client.get("/api/categories?cursor=not-a-cursor").status_code == 400
+
+def test_get_leads_pushes_filters_and_cursor_to_storage(auth_client):
+    rows = [{"name": "Dental A", "zone": "Dentistas en Monterrey", "stars": 4.8, "reviews": 3, "segment": "Micro"}]
+    with patch("src.infrastructure.database.storage_service.StorageService.get_leads_for_job", return_value=rows) as mock_get:
+        response = auth_client.get("/api/leads/5?limit=1&segment=Micro&min_stars=4.5")
+        assert response.status_code == 200
+        assert response.json()[0]["segment"] == "Micro"
+        mock_get.assert_called_with(5, "test_user", limit=1, segment="Micro", min_stars=4.5)
+
+        cursor = response.headers["X-Next-Cursor"]
+        auth_client.get(f"/api/leads/5?limit=1&cursor={cursor}")
+        mock_get.assert_called_with(5, "test_user", after=("Dental A", "Dentistas en Monterrey"), limit=1)
+
+        # Sin limit se conserva la respuesta completa de clientes anteriores
+        auth_client.get("/api/leads/5")
+        mock_get.assert_called_with(5, "test_user")
+
+def test_search_leads_ranked_with_cursor(auth_client):
+    rows = [{"name": "Dental A", "zone": "Dentistas en Monterrey", "stars": 4.8, "reviews": 3, "rank": -3.5, "lead_rowid": 42}]
+    with patch("src.infrastructure.database.storage_service.StorageService.search_leads", return_value=rows) as mock_search:
+        response = auth_client.get("/api/leads/search?q=dental&limit=1&segment=Micro")
+        assert response.status_code == 200
+        assert response.json()[0]["zone"] == "Dentistas en Monterrey"
+        cursor = response.headers["X-Next-Cursor"]
+
+        auth_client.get(f"/api/leads/search?q=dental&limit=1&cursor={cursor}")
+        mock_search.assert_called_with(owner_id="test_user", query="dental", limit=1, after=(-3.5, 42),
+                                       segment=None, min_stars=None, job_id=None)
+
+    with patch("src.infrastructure.database.storage_service.StorageService.search_leads", side_effect=ValueError("vacía")):
+        assert auth_client.get("/api/leads/search?q=**").status_code == 400
+
+def test_export_leads_streams_csv_from_storage_chunks(auth_client):
+    chunks = iter([[{"name": "Dental A", "zone": "Dentistas en Monterrey"}], [{"name": "Dental B"}]])
+    with patch("src.infrastructure.database.storage_service.StorageService.open_lead_export", return_value=chunks) as mock_export:
+        response = auth_client.get("/api/leads/export?job_id=5&format=csv&min_stars=4")
+        assert response.status_code == 200
+        assert 'filename="leads_job_5.csv"' in response.headers["content-disposition"]
+        assert response.text.lstrip("\ufeff").splitlines()[1:] == [
+            "Dental A,,,,,,Dentistas en Monterrey,,,,", "Dental B,,,,,,,,,,"]
+        mock_export.assert_called_with(owner_id="test_user", job_id=5, batch_id=None, query=None,
+                                       segment=None, min_stars=4.0)
+
+def test_export_leads_requires_scope_and_ownership(auth_client):
+    assert auth_client.get("/api/leads/export").status_code == 400
+    assert auth_client.get("/api/leads/export?job_id=5&format=pdf").status_code == 422
+    with patch("src.infrastructure.database.storage_service.StorageService.open_lead_export", return_value=None):
+        assert auth_client.get("/api/leads/export?batch_id=3").status_code == 404
+
+def test_large_leads_payload_is_bulk_serialized_and_gzipped(auth_client):
+    rows = [{"name": f"Dental {i}", "zone": "Dentistas en Monterrey", "phone": None, "stars": 4.5, "reviews": i,
+             "email": "x@example.com"} for i in range(500)]
+    with patch("src.infrastructure.database.storage_service.StorageService.get_leads_for_job", return_value=rows):
+        response = auth_client.get("/api/leads/5", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        body = response.json()
+        assert len(body) == 500
+        # Solo los campos de LeadView, con sus defaults, igual que con response_model
+        assert body[1] == {"name": "Dental 1", "phone": None, "address": "N/A", "website": "N/A", "stars": 4.5,
+                           "reviews": 1, "map_url": None, "segment": None}
+
+    with patch("src.infrastructure.database.storage_service.StorageService.get_leads_for_job", return_value=rows[:1]):
+        assert "content-encoding" not in auth_client.get("/api/leads/5", headers={"Accept-Encoding": "gzip"}).headers
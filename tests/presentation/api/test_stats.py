@@ -0,0 +1,34 @@
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from src.presentation.api.main import app
+from src.presentation.api.auth import get_current_user
+
+client = TestClient(app)
+
+@pytest.fixture
+def tenant_client():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "test_user", "role": "tenant"}
+    yield client
+    app.dependency_overrides.clear()
+
+STATS = {
+    "jobs_by_status": {"completed": 3, "failed": 1, "pending": 2},
+    "leads_by_city": {"Monterrey": 40, "Saltillo": 10},
+    "leads_by_segment": {"Micro": 30, "Corporate": 12},
+}
+
+def test_stats_reads_counters_and_derives_rates(tenant_client):
+    with patch("src.infrastructure.database.storage_service.StorageService.get_stats", return_value=STATS) as mock_stats:
+        response = tenant_client.get("/api/stats")
+        assert response.status_code == 200
+        mock_stats.assert_called_with("test_user")
+
+    body = response.json()
+    assert body["total_jobs"] == 6
+    assert body["success_rate"] == 0.75
+    assert body["leads_found"] == 50
+    assert body["leads_by_segment"]["Micro"] == 30
+
+def test_global_stats_require_admin(tenant_client):
+    assert tenant_client.get("/api/stats?scope=global").status_code == 403
@@ -0,0 +1,15 @@
+from fastapi.testclient import TestClient
+from src.presentation.api.main import app
+
+client = TestClient(app)
+
+def test_request_id_is_echoed_or_generated():
+    response = client.get("/health", headers={"X-Request-ID": "req-42.a_b"})
+    assert response.headers["x-request-id"] == "req-42.a_b"
+
+    generated = client.get("/health").headers["x-request-id"]
+    assert len(generated) == 16
+
+    # Untrusted values are not propagated into logs
+    unsafe = client.get("/health", headers={"X-Request-ID": "x" * 65}).headers["x-request-id"]
+    assert unsafe != "x" * 65